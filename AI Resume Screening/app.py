@@ -1,30 +1,54 @@
+import hashlib
+import os
+import sys
 import streamlit as st
-import json
-import numpy as np
+import pandas as pd
 import faiss
-from utils.text_processing import extract_text_from_pdf
-from utils.embedding import get_embeddings
-from models.gap_analysis import analyze_gap, adaptive_matching
+from utils.embedding import get_embeddings, get_batch_embeddings
+from models.gap_analysis import analyze_gap, rank_jobs, pick_best_match
+from models.job_index import JobIndex
 from streamlit_pdf_viewer import pdf_viewer
 from streamlit_extras.add_vertical_space import add_vertical_space
 from langchain_text_splitters import RecursiveCharacterTextSplitter
 from langchain_ollama import ChatOllama
 from langchain_core.prompts import ChatPromptTemplate
 from langchain_core.output_parsers import StrOutputParser
-from langchain_core.documents import Document
 from langchain_core.runnables import RunnablePassthrough
 
-# fungsi untuk membaca daftar pekerjaan dari JSON
-def load_available_jobs():
-    with open('data/available_jobs.json', 'r') as file:
-        jobs = json.load(file)
-    return jobs
+# registry model dan ekstraksi PDF dipakai bersama app lain, ada di paket shared/ di root repo
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from shared import model_registry
+from shared.pdf_extraction import extract_text
+
+# index embeddings daftar pekerjaan dari JSON, dibuat sekali dan dipakai ulang antar rerun
+@st.cache_resource
+def load_job_index():
+    return JobIndex('data/available_jobs.json')
+
+# index FAISS per CV, dibangun sekali per isi CV (hash) dan dipakai ulang antar rerun maupun session
+@st.cache_resource(max_entries=32)
+def load_cv_index(cv_hash, _cv_text):
+    text_splitter = RecursiveCharacterTextSplitter(chunk_size=1000, chunk_overlap=100)
+    doc_texts = text_splitter.split_text(_cv_text)
+    if not doc_texts:
+        return None, doc_texts
+
+    # semua chunk di-encode dalam satu batch, vektor float32 ternormalisasi
+    doc_embeddings = get_batch_embeddings(doc_texts)
+    index = faiss.IndexFlatIP(doc_embeddings.shape[1])
+    index.add(doc_embeddings)
+    return index, doc_texts
+
+# mulai memuat model embeddings di background selagi UI dirender
+model_registry.warm_up('embedding')
 
 # inisialisasi session state untuk menyimpan hasil analisis dan riwayat chat
 if "gap_score" not in st.session_state:
     st.session_state.gap_score = None
 if "best_match" not in st.session_state:
     st.session_state.best_match = None
+if "top_jobs" not in st.session_state:
+    st.session_state.top_jobs = []
 if "chat_history" not in st.session_state:
     st.session_state.chat_history = []
 
@@ -37,6 +61,7 @@ with st.sidebar:
     st.header('Upload CV dan Job Description')
     uploaded_cv = st.file_uploader('Upload CV (PDF)', type=['pdf'])
     uploaded_jd = st.text_area('Job Description')
+    top_k = st.slider('Jumlah rekomendasi job', min_value=1, max_value=20, value=5)
 
     if uploaded_cv:
         # preview CV di sidebar
@@ -44,21 +69,27 @@ with st.sidebar:
         pdf_viewer(input=binary_data, width=700)
 
     analyze_button = st.button('Analyze')
+    if model_registry.is_loaded('embedding'):
+        st.caption(f"Model embeddings dimuat dalam {model_registry.load_time('embedding'):.1f} detik")
+    else:
+        st.caption("Memuat model embeddings...")
     add_vertical_space(12)
     st.write('Made with ❤️ by [Naufal Faiz](www.linkedin.com/in/naufal-faiz-nugraha-867534292)')
 
 # jika tombol analyze ditekan akan menyimpan ke session state
 if analyze_button and uploaded_cv and uploaded_jd:
-    cv_text = extract_text_from_pdf(uploaded_cv)
+    cv_text = extract_text(uploaded_cv, engine='pdfplumber')
     cv_embeddings = get_embeddings(cv_text)
     jd_embeddings = get_embeddings(uploaded_jd)
 
     st.session_state.gap_score = analyze_gap(cv_embeddings, jd_embeddings)
-    available_jobs = load_available_jobs()
-    st.session_state.best_match = adaptive_matching(cv_text, available_jobs)
+    job_index = load_job_index()
+    st.session_state.top_jobs = rank_jobs(cv_embeddings, job_index, top_k=top_k, cv_text=cv_text)
+    st.session_state.best_match = pick_best_match(st.session_state.top_jobs)
 
     # simpan teks CV ke session_state agar bisa dipakai chatbot
     st.session_state.cv_text = cv_text
+    st.session_state.cv_hash = hashlib.sha256(cv_text.encode('utf-8')).hexdigest()
 
 # menampilkan hasil analisis jika sudah tersedia
 if st.session_state.gap_score is not None and st.session_state.best_match is not None:
@@ -66,19 +97,24 @@ if st.session_state.gap_score is not None and st.session_state.best_match is not
     st.markdown(f"<h6 style='text-align: center;'>Gap Score: {st.session_state.gap_score}&nbsp;&nbsp;&nbsp;&nbsp;&nbsp;&nbsp;&nbsp;&nbsp; \
         |&nbsp;&nbsp;&nbsp;&nbsp;&nbsp;&nbsp;&nbsp;&nbsp;Best Match: {st.session_state.best_match['title']}</h6>", unsafe_allow_html=True)
 
+    # shortlist top-k job beserta rincian skor
+    st.subheader('Rekomendasi Job')
+    st.dataframe(
+        pd.DataFrame(st.session_state.top_jobs).set_index('rank'),
+        column_config={
+            'score': st.column_config.ProgressColumn('score', min_value=0.0, max_value=1.0, format='%.3f'),
+            'skill_coverage': st.column_config.ProgressColumn('skill_coverage', min_value=0.0, max_value=1.0),
+        },
+        use_container_width=True
+    )
+
 # chatbot Setup
 st.markdown("---")
 
 # jika file CV sudah ada, proses untuk chatbot
 if "cv_text" in st.session_state:
-    text_splitter = RecursiveCharacterTextSplitter(chunk_size=1000, chunk_overlap=100)
-    chunks = [Document(page_content=chunk) for chunk in text_splitter.split_text(st.session_state.cv_text)]
-
     # FAISS Index setup
-    doc_texts = [doc.page_content for doc in chunks]
-    doc_embeddings = np.array([get_embeddings(text) for text in doc_texts]).astype('float64')
-    index = faiss.IndexFlatL2(doc_embeddings.shape[1])
-    index.add(doc_embeddings)
+    index, doc_texts = load_cv_index(st.session_state.cv_hash, st.session_state.cv_text)
 
     # inisialisasi LLM Ollama
     local_model = "mistral"
@@ -88,9 +124,9 @@ if "cv_text" in st.session_state:
     user_input = st.chat_input("Ask a question about the CV...")
 
     # jika ada input, cari jawaban model llm dan FAISS
-    if user_input:
-        user_embedding = np.array(get_embeddings(user_input)).astype('float64').reshape(1, -1)
-        _, I = index.search(user_embedding, k=3)
+    if user_input and index is not None:
+        user_embedding = get_batch_embeddings([user_input])
+        _, I = index.search(user_embedding, k=min(3, len(doc_texts)))
 
         retrieved_docs = [doc_texts[i] for i in I[0]]
         context = "\n\n".join(retrieved_docs)
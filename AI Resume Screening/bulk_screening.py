@@ -0,0 +1,132 @@
+import argparse
+import csv
+import os
+import sys
+import time
+import zipfile
+
+# ekstraksi PDF dipakai bersama app lain, ada di paket shared/ di root repo
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from shared import pdf_extraction
+
+# model embeddings dan index job di-import di dalam fungsi agar worker process pool
+# (yang meng-import ulang modul ini pada start method spawn) tidak ikut memuat model
+
+RESULT_FIELDS = ['filename', 'gap_score', 'best_match', 'best_score', 'top_matches', 'error']
+
+# kumpulkan PDF dari folder (rekursif) atau file zip sebagai list (nama, path atau bytes)
+def collect_pdfs(source):
+    items = []
+    if os.path.isdir(source):
+        for root, _, files in os.walk(source):
+            for filename in sorted(files):
+                if filename.lower().endswith('.pdf'):
+                    path = os.path.join(root, filename)
+                    items.append((os.path.relpath(path, source), path))
+    elif zipfile.is_zipfile(source):
+        items.extend(read_zip(source))
+    else:
+        raise ValueError(f"{source} bukan folder atau file zip")
+    return items
+
+# baca semua PDF di dalam zip (path atau file-like object)
+def read_zip(zip_file):
+    with zipfile.ZipFile(zip_file) as archive:
+        return [
+            (info.filename, archive.read(info))
+            for info in archive.infolist()
+            if not info.is_dir() and info.filename.lower().endswith('.pdf')
+        ]
+
+# screening banyak CV sekaligus, hasil di-yield per CV segera setelah batch-nya selesai
+def screen_cvs(items, job_index, jd_text=None, top_k=3, batch_size=32):
+    from utils.embedding import get_batch_embeddings
+    from models.gap_analysis import rank_jobs, pick_best_match
+
+    jd_embeddings = get_batch_embeddings([jd_text])[0] if jd_text else None
+
+    def score_batch(batch):
+        embeddings = get_batch_embeddings([text for _, text in batch], batch_size=batch_size)
+        for (name, _), cv_embeddings in zip(batch, embeddings):
+            ranking = rank_jobs(cv_embeddings, job_index, top_k=top_k)
+            best = pick_best_match(ranking)
+            yield {
+                'filename': name,
+                'gap_score': round(float(cv_embeddings @ jd_embeddings), 4) if jd_embeddings is not None else None,
+                'best_match': best['title'] if best else None,
+                'best_score': round(best['score'], 4) if best else None,
+                'top_matches': '; '.join(f"{job['title']} ({job['score']:.3f})" for job in ranking),
+                'error': None,
+            }
+
+    # teks diekstrak di process pool bersama (dibuat sekali per proses), CV diproses sesuai urutan selesai
+    batch = []
+    for name, text, error in pdf_extraction.extract_many(items, engine='pdfplumber'):
+        if error or not text.strip():
+            yield {'filename': name, 'error': error or 'PDF tidak berisi teks'}
+            continue
+        batch.append((name, text))
+        if len(batch) >= batch_size:
+            yield from score_batch(batch)
+            batch = []
+    if batch:
+        yield from score_batch(batch)
+
+# tulis hasil ke CSV secara streaming atau ke Parquet di akhir, sambil melaporkan throughput
+def run(source, output, jobs_path='data/available_jobs.json', jd_text=None, top_k=3, batch_size=32):
+    from models.job_index import JobIndex
+
+    items = collect_pdfs(source)
+    job_index = JobIndex(jobs_path)
+    start = time.perf_counter()
+    rows = []
+
+    to_parquet = output.lower().endswith('.parquet')
+    csv_file = None if to_parquet else open(output, 'w', newline='', encoding='utf-8')
+    try:
+        writer = None if to_parquet else csv.DictWriter(csv_file, fieldnames=RESULT_FIELDS)
+        if writer:
+            writer.writeheader()
+        for done, row in enumerate(screen_cvs(items, job_index, jd_text, top_k, batch_size), start=1):
+            if writer:
+                writer.writerow(row)
+                csv_file.flush()
+            else:
+                rows.append(row)
+            elapsed = time.perf_counter() - start
+            print(f"[{done}/{len(items)}] {row['filename']} ({done / elapsed:.2f} CV/s)", file=sys.stderr)
+    finally:
+        if csv_file:
+            csv_file.close()
+
+    if to_parquet:
+        import pandas as pd
+        pd.DataFrame(rows, columns=RESULT_FIELDS).to_parquet(output, index=False)
+
+    elapsed = time.perf_counter() - start
+    print(f"Selesai: {len(items)} CV dalam {elapsed:.1f} detik ({len(items) / max(elapsed, 1e-9):.2f} CV/s) -> {output}", file=sys.stderr)
+
+def main():
+    parser = argparse.ArgumentParser(description='Bulk screening CV (PDF) terhadap daftar job.')
+    parser.add_argument('source', help='folder berisi PDF atau file zip')
+    parser.add_argument('-o', '--output', default='screening_results.csv', help='file hasil (.csv atau .parquet)')
+    parser.add_argument('--jd', help='job description (teks atau path file .txt) untuk gap score')
+    parser.add_argument('--jobs', default='data/available_jobs.json', help='file JSON daftar job')
+    parser.add_argument('--top-k', type=int, default=3)
+    parser.add_argument('--batch-size', type=int, default=32)
+    parser.add_argument('--workers', type=int, default=None, help='jumlah process untuk ekstraksi PDF')
+    args = parser.parse_args()
+
+    jd_text = args.jd
+    if jd_text and os.path.isfile(jd_text):
+        with open(jd_text, 'r', encoding='utf-8') as file:
+            jd_text = file.read()
+
+    if args.workers:
+        # dibaca saat process pool ekstraksi dibuat pertama kali
+        pdf_extraction.PDF_WORKERS = args.workers
+
+    run(args.source, args.output, args.jobs, jd_text, args.top_k, args.batch_size)
+
+if __name__ == '__main__':
+    main()
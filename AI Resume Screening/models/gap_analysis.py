@@ -1,20 +1,48 @@
+import re
 from sklearn.metrics.pairwise import cosine_similarity
-from utils.embedding import get_embeddings
 
 # menghitung similarity antara CV dan JD
 def analyze_gap(cv_embeddings, jd_embeddings):
     similarity = cosine_similarity([cv_embeddings], [jd_embeddings])
     return similarity[0][0]
 
-# mencari job yang paling sesuai dengan CV
-def adaptive_matching(cv_text, available_jobs):
-    best_match = None
-    highest_score = 0
-    for job in available_jobs:
-        job_embeddings = get_embeddings(job['description'])
-        cv_embeddings = get_embeddings(cv_text)
-        score = analyze_gap(cv_embeddings, job_embeddings)
-        if score > highest_score:
-            highest_score = score
-            best_match = job
-    return best_match
+# ambil daftar skill dari deskripsi job, contoh: "Experience in Python, SQL" -> ["Python", "SQL"]
+def extract_skills(description):
+    parts = [part.strip() for part in description.split(',')]
+    parts[0] = re.sub(r'^.*?\b(?:in|with|of)\s+', '', parts[0], count=1, flags=re.IGNORECASE)
+    return [part for part in parts if part]
+
+# rincian skor: skill dari deskripsi job yang muncul di CV
+def skill_breakdown(cv_text, description):
+    cv_lower = cv_text.lower()
+    skills = extract_skills(description)
+    matched = [skill for skill in skills if re.search(r'(?<!\w)' + re.escape(skill.lower()) + r'(?!\w)', cv_lower)]
+    missing = [skill for skill in skills if skill not in matched]
+    coverage = len(matched) / len(skills) if skills else 0.0
+    return matched, missing, coverage
+
+# ranking top-k job untuk CV dalam satu pass vektor, lengkap dengan rincian skor
+def rank_jobs(cv_embeddings, job_index, top_k=5, cv_text=None):
+    job_index.refresh()
+    ids, scores = job_index.search(cv_embeddings, top_k)
+    ranking = []
+    for rank, (i, score) in enumerate(zip(ids, scores), start=1):
+        job = job_index.jobs[int(i)]
+        result = {'rank': rank, 'title': job['title'], 'description': job['description'], 'score': float(score)}
+        if cv_text is not None:
+            matched, missing, coverage = skill_breakdown(cv_text, job['description'])
+            result['matched_skills'] = ', '.join(matched)
+            result['missing_skills'] = ', '.join(missing)
+            result['skill_coverage'] = round(coverage, 2)
+        ranking.append(result)
+    return ranking
+
+# job teratas dari ranking, None jika skornya tidak positif (tidak ada job yang cocok)
+def pick_best_match(ranking):
+    if not ranking or ranking[0]['score'] <= 0:
+        return None
+    return ranking[0]
+
+# mencari job yang paling sesuai dengan CV menggunakan index embeddings job
+def adaptive_matching(cv_embeddings, job_index):
+    return pick_best_match(rank_jobs(cv_embeddings, job_index, top_k=1))
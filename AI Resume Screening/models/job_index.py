@@ -0,0 +1,140 @@
+import hashlib
+import json
+import os
+import numpy as np
+import faiss
+from utils.embedding import MODEL_NAME, get_batch_embeddings
+
+CACHE_DIR = os.path.join('data', 'cache')
+# di atas jumlah job ini pencarian top-k memakai index FAISS inner product
+FAISS_THRESHOLD = 5000
+
+def _sha256(data):
+    if isinstance(data, str):
+        data = data.encode('utf-8')
+    return hashlib.sha256(data).hexdigest()
+
+# index embeddings seluruh job description, disimpan di disk sebagai matriks float32 ternormalisasi
+class JobIndex:
+    def __init__(self, jobs_path='data/available_jobs.json', cache_dir=CACHE_DIR, model_name=MODEL_NAME,
+                 faiss_threshold=FAISS_THRESHOLD):
+        self.jobs_path = jobs_path
+        self.cache_dir = cache_dir
+        self.model_name = model_name
+        self.faiss_threshold = faiss_threshold
+        self.jobs = []
+        self.matrix = None
+        self.faiss_index = None
+        self.index_hash = None
+        self._mtime = None
+        self.refresh()
+
+    def __len__(self):
+        return len(self.jobs)
+
+    def _cache_paths(self):
+        name = os.path.splitext(os.path.basename(self.jobs_path))[0]
+        prefix = os.path.join(self.cache_dir, f"{name}.{_sha256(self.model_name)[:12]}")
+        return prefix + '.npy', prefix + '.json'
+
+    def _load_cache(self):
+        matrix_path, meta_path = self._cache_paths()
+        if not (os.path.exists(matrix_path) and os.path.exists(meta_path)):
+            return None, None
+        try:
+            with open(meta_path, 'r') as file:
+                meta = json.load(file)
+            matrix = np.load(matrix_path)
+        except (OSError, ValueError):
+            return None, None
+        if meta.get('model_name') != self.model_name or len(meta.get('rows', [])) != len(matrix):
+            return None, None
+        return meta, matrix
+
+    def _save_cache(self, row_hashes):
+        matrix_path, meta_path = self._cache_paths()
+        os.makedirs(self.cache_dir, exist_ok=True)
+        # tulis ke file sementara lalu replace agar cache tidak pernah setengah jadi
+        np.save(matrix_path + '.tmp.npy', self.matrix)
+        os.replace(matrix_path + '.tmp.npy', matrix_path)
+        with open(meta_path + '.tmp', 'w') as file:
+            json.dump({'model_name': self.model_name, 'index_hash': self.index_hash, 'rows': row_hashes}, file)
+        os.replace(meta_path + '.tmp', meta_path)
+
+    # muat ulang index hanya jika file job berubah, dan encode hanya deskripsi yang baru
+    def refresh(self):
+        mtime = os.stat(self.jobs_path).st_mtime_ns
+        if self.matrix is not None and mtime == self._mtime:
+            return False
+
+        with open(self.jobs_path, 'rb') as file:
+            raw = file.read()
+        index_hash = _sha256(raw + self.model_name.encode('utf-8'))
+        self._mtime = mtime
+        if index_hash == self.index_hash:
+            return False
+
+        jobs = json.loads(raw)
+        row_hashes = [_sha256(job['description']) for job in jobs]
+        meta, cached = self._load_cache()
+
+        if meta is not None and meta.get('index_hash') == index_hash:
+            matrix = cached
+            changed = False
+        else:
+            known = {} if meta is None else {h: i for i, h in enumerate(meta['rows'])}
+            missing = [i for i, h in enumerate(row_hashes) if h not in known]
+            new_embeddings = None
+            if missing:
+                new_embeddings = get_batch_embeddings([jobs[i]['description'] for i in missing])
+
+            dim = new_embeddings.shape[1] if new_embeddings is not None else (cached.shape[1] if cached is not None else 0)
+            matrix = np.empty((len(jobs), dim), dtype='float32')
+            for i, h in enumerate(row_hashes):
+                if h in known:
+                    matrix[i] = cached[known[h]]
+            if missing:
+                matrix[missing] = new_embeddings
+            changed = True
+
+        self.jobs = jobs
+        self.matrix = np.ascontiguousarray(matrix, dtype='float32')
+        self.index_hash = index_hash
+        self.faiss_index = None
+        if len(jobs) > self.faiss_threshold:
+            self.faiss_index = faiss.IndexFlatIP(self.matrix.shape[1])
+            self.faiss_index.add(self.matrix)
+        if changed:
+            self._save_cache(row_hashes)
+        return True
+
+    @staticmethod
+    def _normalize(cv_embeddings):
+        query = np.asarray(cv_embeddings, dtype='float32').reshape(-1)
+        norm = np.linalg.norm(query)
+        if norm > 0:
+            query = query / norm
+        return query
+
+    # skor cosine similarity CV terhadap semua job dengan satu perkalian matriks-vektor
+    def score(self, cv_embeddings):
+        return self.matrix @ self._normalize(cv_embeddings)
+
+    # top-k job (index, skor) terurut dari skor tertinggi
+    def search(self, cv_embeddings, top_k=5):
+        top_k = min(top_k, len(self.jobs))
+        if top_k <= 0:
+            return np.empty(0, dtype='int64'), np.empty(0, dtype='float32')
+
+        query = self._normalize(cv_embeddings)
+        if self.faiss_index is not None:
+            scores, ids = self.faiss_index.search(query.reshape(1, -1), top_k)
+            return ids[0], scores[0]
+
+        scores = self.matrix @ query
+        if top_k < len(scores):
+            ids = np.argpartition(-scores, top_k - 1)[:top_k]
+        else:
+            ids = np.arange(len(scores))
+        ids = ids[np.argsort(-scores[ids], kind='stable')]
+        return ids, scores[ids]
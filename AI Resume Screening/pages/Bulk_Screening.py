@@ -0,0 +1,62 @@
+import time
+import zipfile
+import zlib
+import pandas as pd
+import streamlit as st
+from bulk_screening import RESULT_FIELDS, read_zip, screen_cvs
+from models.job_index import JobIndex
+
+# index embeddings daftar pekerjaan, dipakai ulang antar rerun
+@st.cache_resource
+def load_job_index():
+    return JobIndex('data/available_jobs.json')
+
+st.markdown("<h1 style='text-align: center;'>Bulk CV Screening</h1>", unsafe_allow_html=True)
+st.caption("Screening banyak CV sekaligus terhadap daftar pekerjaan yang tersedia.")
+
+with st.sidebar:
+    st.header('Upload CV')
+    uploaded_files = st.file_uploader('Upload CV (PDF) atau file zip', type=['pdf', 'zip'], accept_multiple_files=True)
+    uploaded_jd = st.text_area('Job Description (opsional)')
+    top_k = st.slider('Jumlah rekomendasi job per CV', min_value=1, max_value=10, value=3)
+    batch_size = st.number_input('Batch size embeddings', min_value=1, max_value=256, value=32)
+    screen_button = st.button('Screen')
+
+if screen_button and uploaded_files:
+    items = []
+    for uploaded_file in uploaded_files:
+        if uploaded_file.name.lower().endswith('.zip'):
+            try:
+                items.extend(read_zip(uploaded_file))
+            except (zipfile.BadZipFile, zlib.error):
+                # zip rusak dilewati, file lain tetap diproses
+                st.error(f'{uploaded_file.name} bukan file zip yang valid atau rusak.')
+        else:
+            items.append((uploaded_file.name, uploaded_file.getvalue()))
+    if not items:
+        st.error('Tidak ada CV (PDF) yang bisa diproses.')
+        st.stop()
+
+    progress = st.progress(0.0)
+    status = st.empty()
+    table = st.empty()
+    rows = []
+    start = time.perf_counter()
+
+    # tampilkan hasil secara bertahap setiap kali satu CV selesai
+    for row in screen_cvs(items, load_job_index(), uploaded_jd or None, top_k, int(batch_size)):
+        rows.append(row)
+        elapsed = time.perf_counter() - start
+        progress.progress(len(rows) / len(items))
+        status.write(f"{len(rows)}/{len(items)} CV diproses ({len(rows) / elapsed:.2f} CV/s)")
+        table.dataframe(pd.DataFrame(rows, columns=RESULT_FIELDS), use_container_width=True)
+
+    st.session_state.bulk_results = pd.DataFrame(rows, columns=RESULT_FIELDS)
+
+if "bulk_results" in st.session_state:
+    st.download_button(
+        'Download CSV',
+        st.session_state.bulk_results.to_csv(index=False).encode('utf-8'),
+        file_name='screening_results.csv',
+        mime='text/csv'
+    )
@@ -1,8 +1,146 @@
-from sentence_transformers import SentenceTransformer
+import hashlib
+import os
+import sqlite3
+import sys
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+import numpy as np
 
-# load model untuk embeddings
-model = SentenceTransformer('all-MiniLM-L6-v2')
+# registry model dipakai bersama app lain, ada di paket shared/ di root repo
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+from shared import model_registry
+
+MODEL_NAME = 'all-MiniLM-L6-v2'
+
+# service embeddings: batching, cache LRU di memori berdasarkan (model, sha256(teks)),
+# cache opsional di disk (SQLite), dan penggabungan request tunggal yang datang bersamaan
+class EmbeddingService:
+    def __init__(self, model_name=MODEL_NAME, cache_size=10000, cache_path=None, batch_size=64, max_wait=0.005):
+        # import di sini karena sentence_transformers (dan torch) lambat di-import
+        from sentence_transformers import SentenceTransformer
+
+        self.model_name = model_name
+        self.model = SentenceTransformer(model_name)
+        self.cache_size = cache_size
+        self.batch_size = batch_size
+        self.max_wait = max_wait
+        self.hits = 0
+        self.misses = 0
+        self.disk_hits = 0
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+        self._pending = []
+        self._pending_lock = threading.Lock()
+        self._db = None
+        if cache_path:
+            os.makedirs(os.path.dirname(cache_path) or '.', exist_ok=True)
+            self._db = sqlite3.connect(cache_path, check_same_thread=False)
+            self._db.execute('CREATE TABLE IF NOT EXISTS embeddings (key TEXT PRIMARY KEY, vector BLOB)')
+            self._db.commit()
+
+    def _key(self, text):
+        return self.model_name + ':' + hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+    def _get(self, key):
+        vector = self._cache.get(key)
+        if vector is not None:
+            self._cache.move_to_end(key)
+            return vector
+        if self._db is not None:
+            row = self._db.execute('SELECT vector FROM embeddings WHERE key = ?', (key,)).fetchone()
+            if row is not None:
+                self.disk_hits += 1
+                vector = np.frombuffer(row[0], dtype='float32')
+                self._put(key, vector, persist=False)
+                return vector
+        return None
+
+    def _put(self, key, vector, persist=True):
+        self._cache[key] = vector
+        self._cache.move_to_end(key)
+        while len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+        if persist and self._db is not None:
+            self._db.execute('INSERT OR REPLACE INTO embeddings VALUES (?, ?)', (key, vector.tobytes()))
+
+    # encode banyak teks sekaligus, hanya teks yang belum ada di cache yang masuk ke model
+    def encode(self, texts, batch_size=None):
+        texts = list(texts)
+        keys = [self._key(text) for text in texts]
+        vectors = [None] * len(texts)
+        missing = {}
+        with self._lock:
+            for i, key in enumerate(keys):
+                vectors[i] = self._get(key)
+                if vectors[i] is None:
+                    missing.setdefault(key, []).append(i)
+            self.hits += len(texts) - len(missing)
+            self.misses += len(missing)
+
+        if missing:
+            new_texts = [texts[ids[0]] for ids in missing.values()]
+            embeddings = self.model.encode(
+                new_texts,
+                batch_size=batch_size or self.batch_size,
+                convert_to_numpy=True,
+                normalize_embeddings=True
+            ).astype('float32')
+            with self._lock:
+                for (key, ids), vector in zip(missing.items(), embeddings):
+                    self._put(key, vector)
+                    for i in ids:
+                        vectors[i] = vector
+                if self._db is not None:
+                    self._db.commit()
+
+        if not vectors:
+            return np.empty((0, self.model.get_sentence_embedding_dimension()), dtype='float32')
+        return np.stack(vectors)
+
+    # encode satu teks; request yang datang bersamaan digabung menjadi satu micro-batch
+    def embed(self, text):
+        future = Future()
+        with self._pending_lock:
+            self._pending.append((text, future))
+            leader = len(self._pending) == 1
+
+        if leader:
+            # thread pertama menunggu sebentar agar request lain ikut masuk batch yang sama
+            time.sleep(self.max_wait)
+            with self._pending_lock:
+                batch, self._pending = self._pending, []
+            try:
+                embeddings = self.encode([text for text, _ in batch])
+                for (_, pending), vector in zip(batch, embeddings):
+                    pending.set_result(vector)
+            except Exception as e:
+                for _, pending in batch:
+                    pending.set_exception(e)
+
+        return future.result()
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'disk_hits': self.disk_hits,
+            'hit_rate': self.hits / total if total else 0.0,
+            'cached': len(self._cache),
+        }
+
+# service global dimuat saat pertama dipakai, cache di disk aktif jika EMBEDDING_CACHE_PATH diset
+model_registry.register('embedding', lambda: EmbeddingService(cache_path=os.getenv('EMBEDDING_CACHE_PATH')))
+
+def get_service():
+    return model_registry.get('embedding')
 
 # fungsi untuk mendapatkan embeddings dari teks
 def get_embeddings(text):
-    return model.encode(text)
\ No newline at end of file
+    return get_service().embed(text)
+
+# fungsi untuk mendapatkan embeddings ternormalisasi (float32) dari banyak teks sekaligus
+def get_batch_embeddings(texts, batch_size=64):
+    return get_service().encode(texts, batch_size=batch_size)
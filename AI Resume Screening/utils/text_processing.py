@@ -1,9 +0,0 @@
-import pdfplumber
-
-# fungsi ekstrak teks dari file pdf
-def extract_text_from_pdf(pdf_path):
-    with pdfplumber.open(pdf_path) as pdf:
-        text = ""
-        for page in pdf.pages:
-            text += page.extract_text()
-    return text
\ No newline at end of file
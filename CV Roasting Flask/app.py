@@ -1,39 +1,140 @@
-from flask import Flask, render_template, request, jsonify, flash, redirect, url_for
+from flask import Flask, Request, render_template, request, jsonify, flash, redirect, url_for, Response, stream_with_context
 import os
-from langchain_ollama.llms import OllamaLLM
+import sys
+import io
+import json
+import hashlib
+import zipfile
+from defusedxml import DefusedXmlException
+from defusedxml.ElementTree import iterparse, ParseError
 from langchain_core.prompts import ChatPromptTemplate
-from docx import Document
+from werkzeug.exceptions import RequestEntityTooLarge
 from werkzeug.utils import secure_filename
-import tempfile
+
+# The Ollama gateway and the job queue are shared with the other apps and live in the shared/
+# package at the repo root
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from shared.llm_gateway import gateway, GatewayBusy
+from shared.job_queue import job_queue, QueueFull, JOB_WEBHOOKS, JOB_SLOT_TIMEOUT
+from shared.llm_flow import Invoke, Stream, StreamTimer, run, events
+from health import HealthChecker
+
+# Uploads are kept in memory and refused as soon as they pass this size
+MAX_UPLOAD_BYTES = int(os.getenv('CV_MAX_UPLOAD_BYTES', str(5 * 1024 * 1024)))
+# A cover letter is a page or two; text past this point is not read at all
+MAX_CONTENT_CHARS = int(os.getenv('CV_MAX_CONTENT_CHARS', '20000'))
+# Limit on the uncompressed word/document.xml of a .docx upload (a zip can expand far past MAX_UPLOAD_BYTES)
+MAX_DOCX_XML_BYTES = int(os.getenv('CV_MAX_DOCX_XML_BYTES', str(20 * 1024 * 1024)))
+
+WORD_NS = '{http://schemas.openxmlformats.org/wordprocessingml/2006/main}'
+# Element paths whose text belongs to a body paragraph, the same text python-docx's doc.paragraphs
+# returns (tables, text boxes, headers and footnotes are left out)
+DOCX_TEXT_PARENTS = (
+    [WORD_NS + 'document', WORD_NS + 'body', WORD_NS + 'p', WORD_NS + 'r'],
+    [WORD_NS + 'document', WORD_NS + 'body', WORD_NS + 'p', WORD_NS + 'hyperlink', WORD_NS + 'r'],
+)
+
+class DocxTooLarge(Exception):
+    """The uncompressed document part of a .docx upload is over MAX_DOCX_XML_BYTES"""
+
+class LimitedReader:
+    """File wrapper that raises DocxTooLarge once more than limit bytes have been read"""
+
+    def __init__(self, file, limit):
+        self.file = file
+        self.limit = limit
+        self.read_bytes = 0
+
+    def read(self, size=-1):
+        data = self.file.read(size)
+        self.read_bytes += len(data)
+        if self.read_bytes > self.limit:
+            raise DocxTooLarge()
+        return data
+
+class LimitedBytesIO(io.BytesIO):
+    """In-memory upload buffer that raises 413 while the upload is still being received"""
+
+    def __init__(self, limit):
+        super().__init__()
+        self.limit = limit
+
+    def write(self, data):
+        if self.tell() + len(data) > self.limit:
+            raise RequestEntityTooLarge(f'File is too large, the limit is {round(self.limit / (1024 * 1024), 1):g}MB.')
+        return super().write(data)
+
+class InMemoryRequest(Request):
+    """Parse uploaded files into memory instead of werkzeug's spooled temp files"""
+
+    def _get_file_stream(self, total_content_length, content_type, filename=None, content_length=None):
+        return LimitedBytesIO(MAX_UPLOAD_BYTES)
 
 app = Flask(__name__)
-app.config['MAX_CONTENT_LENGTH'] = 16 * 1024 * 1024  # 16MB max file size
+app.request_class = InMemoryRequest
+app.config['MAX_CONTENT_LENGTH'] = 16 * 1024 * 1024  # 16MB max request size
+
+MODEL_NAME = "llama3:latest"
+
+health = HealthChecker(MODEL_NAME)
+health.start_deep_checks()
 
 # Initialize Ollama LLM with Llama3
 def get_llm():
-    """Initialize the Ollama LLM with Llama3"""
-    return OllamaLLM(
-        model="llama3:latest",
-        base_url="http://localhost:11434",
+    """Return the shared Ollama LLM (created once, its HTTP connections are reused)"""
+    return gateway.llm(
+        model=MODEL_NAME,
         temperature=0.8,
         num_predict=1000
     )
 
-def read_txt_file(file_path):
-    """Read text file content"""
-    with open(file_path, 'r', encoding='utf-8') as file:
-        return file.read()
+def read_txt_file(stream, max_chars=MAX_CONTENT_CHARS):
+    """Read up to max_chars characters of a text stream"""
+    reader = io.TextIOWrapper(stream, encoding='utf-8', errors='replace')
+    try:
+        return reader.read(max_chars)
+    finally:
+        # Leave the underlying upload stream open, werkzeug closes it
+        reader.detach()
 
-def read_docx_file(file_path):
-    """Read docx file content"""
-    doc = Document(file_path)
-    return '\n'.join([para.text for para in doc.paragraphs])
+def read_docx_file(stream, max_chars=MAX_CONTENT_CHARS, max_xml_bytes=MAX_DOCX_XML_BYTES):
+    """Read the body paragraphs of a docx stream, stopping once max_chars characters are collected"""
+    paragraphs = []
+    total = 0
+    with zipfile.ZipFile(stream) as archive:
+        if archive.getinfo('word/document.xml').file_size > max_xml_bytes:
+            raise DocxTooLarge()
+        with archive.open('word/document.xml') as document:
+            # iterparse decompresses and parses incrementally, so the rest of a huge document is never
+            # read; defusedxml refuses DTDs with entities and external references in the uploaded XML
+            path = []
+            parts = []
+            for event, element in iterparse(LimitedReader(document, max_xml_bytes), events=('start', 'end')):
+                if event == 'start':
+                    path.append(element.tag)
+                    continue
+                path.pop()
+                if path in DOCX_TEXT_PARENTS:
+                    if element.tag == WORD_NS + 't':
+                        parts.append(element.text or '')
+                    elif element.tag in (WORD_NS + 'tab', WORD_NS + 'ptab'):
+                        parts.append('\t')
+                    elif element.tag == WORD_NS + 'cr' or (
+                            element.tag == WORD_NS + 'br' and element.get(WORD_NS + 'type', 'textWrapping') == 'textWrapping'):
+                        parts.append('\n')
+                elif element.tag == WORD_NS + 'p' and len(path) == 2:
+                    paragraph = ''.join(parts)
+                    parts = []
+                    paragraphs.append(paragraph)
+                    total += len(paragraph) + 1
+                    if total >= max_chars:
+                        break
+                if len(path) <= 2:
+                    # finished body-level elements (paragraphs, tables) are not kept in memory
+                    element.clear()
+    return '\n'.join(paragraphs)[:max_chars]
 
-def generate_roasting_with_ollama(content):
-    """Generate roasting using Ollama with LangChain"""
-    llm = get_llm()
-    
-    roast_prompt = ChatPromptTemplate.from_template("""
+roast_prompt = ChatPromptTemplate.from_template("""
     Instruksi: Berikan roast sarkastik terhadap cover letter berikut. Gunakan metafora dan perumpamaan yang tajam untuk mengkritik kekurangan dan kekurangan dalam surat lamaran. Buat dalam bentuk paragraf dan tambahkan beberapa saran untuk cover letter tersebut.
 
     Cover Letter:
@@ -41,35 +142,96 @@ def generate_roasting_with_ollama(content):
     
     Berikan roasting yang membangun dengan gaya sarkastik yang cerdas dan humoris.
     """)
+
+def get_roast_chain():
+    """Build the roasting chain"""
+    return roast_prompt | get_llm()
+
+def sse(event, data):
+    """Format one Server-Sent Event"""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+def busy_response(error):
+    """Reply 429/503 with Retry-After when the model or job queue is full or the wait timed out"""
+    response = jsonify({'error': str(error)})
+    response.headers['Retry-After'] = str(error.retry_after)
+    return response, error.status
+
+def read_file_content(stream, filename):
+    """Read uploaded file content based on its extension"""
+    file_type = filename.split('.')[-1].lower()
+    
+    if file_type == 'txt':
+        content = read_txt_file(stream)
+    elif file_type == 'docx':
+        try:
+            content = read_docx_file(stream)
+        except (zipfile.BadZipFile, KeyError, ParseError, DefusedXmlException):
+            return None, "Invalid .docx file. Please upload a valid Word document."
+        except DocxTooLarge:
+            return None, "The .docx document is too large. Please upload a shorter cover letter."
+    else:
+        return None, "Unsupported file type. Please upload .txt or .docx files only."
     
-    roast_chain = roast_prompt | llm
+    if not content.strip():
+        return None, "File is empty. Please upload a file with content."
     
+    return content, None
+
+def read_roast_input(file):
+    """Validate an uploaded file and read its text, returning ((filename, content), None) or (None, (body, status))"""
+    if file is None or file.filename == '':
+        return None, ({'error': 'No file selected'}, 400)
+    
+    filename = secure_filename(file.filename)
+    if filename.split('.')[-1].lower() not in ['txt', 'docx']:
+        return None, ({'error': 'Only .txt and .docx files are allowed'}, 400)
+    
+    # The upload is already in memory, read it straight from the stream
     try:
-        response = roast_chain.invoke({"content": content})
-        return response.strip()
+        content, error = read_file_content(file.stream, filename)
     except Exception as e:
-        raise Exception(f"Gagal menghasilkan roasting: {str(e)}")
+        return None, ({'error': f"Error processing file: {str(e)}"}, 400)
+    if error:
+        return None, ({'error': error}, 400)
+    return (filename, content), None
 
-def process_file(file_path, filename):
-    """Process uploaded file and generate roasting"""
-    file_type = filename.split('.')[-1].lower()
+# The request logic below is written once and driven both by the Flask routes in this file and by
+# the async routes in asgi.py (see shared/llm_flow.py)
+def roast_flow(filename, content):
+    """Generate the roasting for /upload, returning (body, status)"""
+    try:
+        roasting = yield Invoke(get_roast_chain(), {"content": content})
+    except GatewayBusy:
+        raise
+    except Exception as e:
+        return {'error': f"Error processing file: Gagal menghasilkan roasting: {str(e)}"}, 400
+    
+    return {'success': True, 'roasting': roasting.strip(), 'filename': filename}, 200
+
+def roast_stream_flow(filename, content):
+    """Stream the roasting for /upload/stream as Server-Sent Events"""
+    timer = StreamTimer()
+    
+    def on_chunk(chunk):
+        timer.token()
+        return sse('token', {'text': chunk})
     
     try:
-        if file_type == 'txt':
-            content = read_txt_file(file_path)
-        elif file_type == 'docx':
-            content = read_docx_file(file_path)
-        else:
-            return None, "Unsupported file type. Please upload .txt or .docx files only."
-        
-        if not content.strip():
-            return None, "File is empty. Please upload a file with content."
-        
-        roasting = generate_roasting_with_ollama(content)
-        return roasting, None
-        
+        yield Stream(get_roast_chain(), {"content": content}, on_chunk)
+        yield sse('done', {
+            'success': True,
+            'filename': filename,
+            'first_token_ms': timer.first_token_ms,
+            'total_ms': timer.elapsed_ms()
+        })
     except Exception as e:
-        return None, f"Error processing file: {str(e)}"
+        yield sse('error', {'error': f"Gagal menghasilkan roasting: {str(e)}"})
+
+@app.errorhandler(RequestEntityTooLarge)
+def file_too_large(error):
+    """Return upload size errors as JSON for the page's fetch calls"""
+    return jsonify({'error': error.description}), 413
 
 @app.route('/')
 def index():
@@ -79,55 +241,143 @@ def index():
 @app.route('/upload', methods=['POST'])
 def upload_file():
     """Handle file upload and processing"""
-    if 'file' not in request.files:
-        return jsonify({'error': 'No file selected'}), 400
-    
-    file = request.files['file']
-    if file.filename == '':
-        return jsonify({'error': 'No file selected'}), 400
-    
-    if file:
-        filename = secure_filename(file.filename)
-        file_ext = filename.split('.')[-1].lower()
-        
-        if file_ext not in ['txt', 'docx']:
-            return jsonify({'error': 'Only .txt and .docx files are allowed'}), 400
-        
-        # Save file temporarily
-        with tempfile.NamedTemporaryFile(delete=False, suffix=f'.{file_ext}') as tmp_file:
-            file.save(tmp_file.name)
-            tmp_file_path = tmp_file.name
-        
-        try:
-            roasting, error = process_file(tmp_file_path, filename)
-            
-            # Clean up temp file
-            os.unlink(tmp_file_path)
-            
-            if error:
-                return jsonify({'error': error}), 400
-            
-            return jsonify({
-                'success': True,
-                'roasting': roasting,
-                'filename': filename
-            })
-            
-        except Exception as e:
-            # Clean up temp file
-            os.unlink(tmp_file_path)
-            return jsonify({'error': f'Processing error: {str(e)}'}), 500
+    roast_input, error = read_roast_input(request.files.get('file'))
+    if error:
+        return jsonify(error[0]), error[1]
+    
+    try:
+        body, status = run(roast_flow(*roast_input))
+        return jsonify(body), status
+    except GatewayBusy as e:
+        return busy_response(e)
+    except Exception as e:
+        return jsonify({'error': f'Processing error: {str(e)}'}), 500
+
+@app.route('/upload/stream', methods=['POST'])
+def upload_file_stream():
+    """Handle file upload and stream the roasting as Server-Sent Events"""
+    # The content is read from the in-memory upload before streaming starts
+    roast_input, error = read_roast_input(request.files.get('file'))
+    if error:
+        return jsonify(error[0]), error[1]
+    
+    # Take the model slot before the response starts, so a full queue is still answered with 429/503
+    try:
+        reservation = gateway.reserve()
+    except GatewayBusy as e:
+        return busy_response(e)
+    
+    # A client disconnect closes the generator, which also stops the Ollama stream; the slot is
+    # released when the response is closed, even if the generator never ran
+    response = Response(
+        stream_with_context(events(roast_stream_flow(*roast_input), reservation)),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+    response.call_on_close(reservation.release)
+    return response
+
+@app.route('/jobs', methods=['POST'])
+def submit_roast_job():
+    """Queue a roasting job for the uploaded file and return its ID right away"""
+    webhook = request.form.get('webhook')
+    if webhook and not (JOB_WEBHOOKS and webhook.startswith(('http://', 'https://'))):
+        return jsonify({'error': 'Webhooks are disabled or the URL is invalid'}), 400
+    
+    roast_input, error = read_roast_input(request.files.get('file'))
+    if error:
+        return jsonify(error[0]), error[1]
+    filename, content = roast_input
+    
+    try:
+        # The same cover letter submitted again while it is still being roasted shares one job; the
+        # worker waits for a model slot up to JOB_SLOT_TIMEOUT, not the interactive queue timeout
+        job, created = job_queue.submit(
+            'roast',
+            {'content_sha256': hashlib.sha256(content.encode('utf-8')).hexdigest()},
+            lambda: gateway.stream(get_roast_chain(), {"content": content}, queue_timeout=JOB_SLOT_TIMEOUT),
+            finish=str.strip,
+            meta={'filename': filename},
+            webhook=webhook
+        )
+    except QueueFull as e:
+        return busy_response(e)
+    
+    return jsonify({
+        **job.to_dict(),
+        'deduplicated': not created,
+        'status_url': f'/jobs/{job.id}',
+        'events_url': f'/jobs/{job.id}/events'
+    }), 202
+
+@app.route('/jobs/<job_id>')
+def get_job(job_id):
+    """Job status and result, ?wait=<seconds> long-polls until the job finishes"""
+    job = job_queue.get(job_id)
+    if job is None:
+        return jsonify({'error': 'Job not found or expired'}), 404
+    
+    wait = min(request.args.get('wait', 0, type=float), 30)
+    if wait > 0:
+        job.wait(wait)
+    return jsonify(job.to_dict()), 200 if job.done else 202
+
+@app.route('/jobs/<job_id>/events')
+def job_events(job_id):
+    """Subscribe to a job's tokens and result as Server-Sent Events"""
+    job = job_queue.get(job_id)
+    if job is None:
+        return jsonify({'error': 'Job not found or expired'}), 404
+    
+    def events():
+        for event, data in job.events():
+            yield ': keep-alive\n\n' if event == 'ping' else sse(event, data)
+    
+    # Disconnecting only ends the subscription, the job keeps running
+    return Response(
+        stream_with_context(events()),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+
+@app.route('/jobs/stats')
+def jobs_stats():
+    """Job queue counters"""
+    return jsonify(job_queue.stats())
 
 @app.route('/health')
 def health_check():
-    """Health check endpoint"""
-    try:
-        # Test Ollama connection
-        llm = get_llm()
-        test_response = llm.invoke("Test")
-        return jsonify({'status': 'healthy', 'ollama': 'connected'})
-    except Exception as e:
-        return jsonify({'status': 'unhealthy', 'error': str(e)}), 500
+    """Health summary based on the cached readiness check (no generation)"""
+    ready = health.readiness()
+    body = {
+        'status': 'healthy' if ready['ready'] else 'unhealthy',
+        **ready,
+        'deep': health.deep(),
+        'llm': gateway.stats()
+    }
+    return jsonify(body), 200 if ready['ready'] else 503
+
+@app.route('/health/live')
+def health_live():
+    """Liveness probe, never calls Ollama"""
+    return jsonify(health.liveness())
+
+@app.route('/health/ready')
+def health_ready():
+    """Readiness probe, checks Ollama's model list at most once per TTL"""
+    ready = health.readiness()
+    return jsonify(ready), 200 if ready['ready'] else 503
+
+@app.route('/health/deep')
+def health_deep():
+    """Result of the last background generation check"""
+    deep = health.deep()
+    return jsonify(deep), 503 if deep.get('status') == 'failed' else 200
+
+@app.route('/llm/stats')
+def llm_stats():
+    """Queue depth, wait times and request counters of the LLM gateway"""
+    return jsonify(gateway.stats())
 
 if __name__ == '__main__':
     app.run(debug=True, host='0.0.0.0', port=5000)
\ No newline at end of file
@@ -0,0 +1,74 @@
+import io
+from a2wsgi import WSGIMiddleware
+from starlette.applications import Starlette
+from starlette.responses import JSONResponse
+from starlette.routing import Mount, Route
+from werkzeug.exceptions import RequestEntityTooLarge
+# app.py puts the repo root on sys.path, so it is imported before the shared package
+from app import app as flask_app, InMemoryRequest, read_roast_input, roast_flow, roast_stream_flow
+from shared.asgi import ReservedStreamingResponse, busy_response
+from shared.llm_flow import arun, aevents
+from shared.llm_gateway import gateway, GatewayBusy
+
+# Optional ASGI mode: the roasting routes await the model with ainvoke/astream, so one worker can hold
+# hundreds of waiting requests without a thread each. The gateway still bounds how many generations
+# reach Ollama (OLLAMA_MAX_CONCURRENCY/OLLAMA_MAX_QUEUE). Validation and responses are the Flask
+# routes' own (read_roast_input, roast_flow in app.py); only the waiting is async here. Every other
+# route is served by the Flask app.
+#   uvicorn asgi:app --workers 1
+
+async def read_upload(request):
+    """Receive the multipart body without blocking the loop and parse it with the Flask app's in-memory request class"""
+    limit = flask_app.config['MAX_CONTENT_LENGTH']
+    body = bytearray()
+    async for chunk in request.stream():
+        body += chunk
+        if len(body) > limit:
+            raise RequestEntityTooLarge()
+    parsed = InMemoryRequest({
+        'REQUEST_METHOD': 'POST',
+        'CONTENT_TYPE': request.headers.get('content-type', ''),
+        'CONTENT_LENGTH': str(len(body)),
+        'wsgi.input': io.BytesIO(body),
+    })
+    return read_roast_input(parsed.files.get('file'))
+
+async def upload_file(request):
+    """Handle file upload and processing"""
+    try:
+        roast_input, error = await read_upload(request)
+        if error:
+            return JSONResponse(error[0], status_code=error[1])
+
+        body, status = await arun(roast_flow(*roast_input))
+        return JSONResponse(body, status_code=status)
+
+    except RequestEntityTooLarge as e:
+        return JSONResponse({'error': e.description}, status_code=413)
+    except GatewayBusy as e:
+        return busy_response(e)
+    except Exception as e:
+        return JSONResponse({'error': f'Processing error: {str(e)}'}, status_code=500)
+
+async def upload_file_stream(request):
+    """Handle file upload and stream the roasting as Server-Sent Events"""
+    try:
+        roast_input, error = await read_upload(request)
+    except RequestEntityTooLarge as e:
+        return JSONResponse({'error': e.description}, status_code=413)
+    if error:
+        return JSONResponse(error[0], status_code=error[1])
+
+    try:
+        reservation = await gateway.areserve()
+    except GatewayBusy as e:
+        return busy_response(e)
+
+    # A client disconnect cancels the generator, which releases the gateway slot and the Ollama stream
+    return ReservedStreamingResponse(aevents(roast_stream_flow(*roast_input), reservation), reservation)
+
+app = Starlette(routes=[
+    Route('/upload', upload_file, methods=['POST']),
+    Route('/upload/stream', upload_file_stream, methods=['POST']),
+    Mount('/', app=WSGIMiddleware(flask_app)),
+])
@@ -0,0 +1,91 @@
+import os
+import threading
+import time
+import httpx
+from shared.llm_gateway import gateway, GatewayBusy
+
+READY_TTL = float(os.getenv('HEALTH_READY_TTL', '10'))
+READY_TIMEOUT = float(os.getenv('HEALTH_READY_TIMEOUT', '2'))
+# Deep checks run a one-token generation in the background; 0 disables them
+DEEP_INTERVAL = float(os.getenv('HEALTH_DEEP_INTERVAL', '0'))
+
+def elapsed_ms(start):
+    return round((time.perf_counter() - start) * 1000, 1)
+
+class HealthChecker:
+    """Tiered health checks: liveness (no backend call), cached readiness and a slow deep check"""
+
+    def __init__(self, model, ready_ttl=READY_TTL, ready_timeout=READY_TIMEOUT, deep_interval=DEEP_INTERVAL):
+        self.model = model
+        self.ready_ttl = ready_ttl
+        self.deep_interval = deep_interval
+        self.started = time.time()
+        self._client = httpx.Client(base_url=gateway.base_url, timeout=ready_timeout)
+        self._lock = threading.Lock()
+        self._ready = None
+        self._ready_at = 0.0
+        self._deep = None
+        self._deep_thread = None
+
+    def liveness(self):
+        """The process is up and serving requests"""
+        return {'status': 'alive', 'uptime_s': round(time.time() - self.started, 1)}
+
+    def readiness(self):
+        """Ollama answers its model list and has our model, result cached for ready_ttl seconds"""
+        with self._lock:
+            age = time.monotonic() - self._ready_at
+            if self._ready is None or age > self.ready_ttl:
+                self._ready = self._check_ready()
+                self._ready_at = time.monotonic()
+                age = 0.0
+            return {**self._ready, 'cached': age > 0, 'age_s': round(age, 1)}
+
+    def _check_ready(self):
+        start = time.perf_counter()
+        try:
+            response = self._client.get('/api/tags')
+            response.raise_for_status()
+            models = {model.get('name') for model in response.json().get('models', [])}
+        except Exception as e:
+            return {'ready': False, 'ollama': 'disconnected', 'error': str(e), 'latency_ms': elapsed_ms(start)}
+
+        has_model = self.model in models or f'{self.model}:latest' in models
+        return {
+            'ready': has_model,
+            'ollama': 'connected',
+            'model': self.model,
+            'model_available': has_model,
+            'latency_ms': elapsed_ms(start),
+        }
+
+    def deep(self):
+        """Last background generation result, never triggers a generation itself"""
+        if self.deep_interval <= 0:
+            return {'enabled': False}
+        return {'enabled': True, 'interval_s': self.deep_interval, **(self._deep or {'status': 'pending'})}
+
+    def _check_deep(self):
+        start = time.perf_counter()
+        try:
+            # Goes through the gateway so the probe waits its turn instead of overloading Ollama
+            gateway.invoke(gateway.llm(model=self.model, temperature=0, num_predict=1), "ping")
+            status, error = 'ok', None
+        except GatewayBusy as e:
+            status, error = 'skipped', str(e)
+        except Exception as e:
+            status, error = 'failed', str(e)
+        return {'status': status, 'error': error, 'latency_ms': elapsed_ms(start), 'checked_at': time.time()}
+
+    def start_deep_checks(self):
+        """Start the deep check loop once, if enabled"""
+        if self.deep_interval <= 0 or self._deep_thread is not None:
+            return
+
+        def run():
+            while True:
+                self._deep = self._check_deep()
+                time.sleep(self.deep_interval)
+
+        self._deep_thread = threading.Thread(target=run, name='health-deep-check', daemon=True)
+        self._deep_thread.start()
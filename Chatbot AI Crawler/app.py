@@ -1,13 +1,36 @@
 from flask import Flask, render_template, request, jsonify, session
 import os
+import sys
 from langchain_community.document_loaders import SeleniumURLLoader
 from langchain_text_splitters import RecursiveCharacterTextSplitter
-from langchain_core.vectorstores import InMemoryVectorStore
-from langchain_ollama import OllamaEmbeddings
 from langchain_core.prompts import ChatPromptTemplate
-from langchain_ollama.llms import OllamaLLM
+
+# gateway Ollama dipakai bersama app lain, ada di paket shared/ di root repo
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from shared.llm_gateway import gateway, GatewayBusy
+from shared.llm_flow import Call, Invoke, run
+from session_store import SessionStore
+from vector_index import VectorIndex
+from url_cache import UrlCache
+from crawler import SiteCrawler, BrowserPool
+from dedup import BoilerplateFilter, ChunkDeduplicator
+from conversation_store import ConversationStore, CHAT_PAGE_SIZE
+from context_builder import build_context, CONTEXT_CANDIDATES
 
 app = Flask(__name__)
+# Session ID disimpan di cookie yang ditandatangani, tanpa secret key session Flask tidak bisa dipakai.
+# Isi FLASK_SECRET_KEY dengan nilai acak yang tetap (misalnya python -c "import secrets; print(secrets.token_hex(32))")
+# dan sama untuk semua worker. Tanpa itu dipakai key acak per proses: cookie session tidak berlaku lagi
+# setelah restart, dan dengan lebih dari satu worker (gunicorn/uvicorn --workers N) request yang jatuh
+# ke worker lain kehilangan session-nya.
+app.secret_key = os.getenv('FLASK_SECRET_KEY')
+if not app.secret_key:
+    app.secret_key = os.urandom(24)
+    app.logger.warning('FLASK_SECRET_KEY tidak diisi, memakai key acak: session hilang setelah restart '
+                       'dan tidak berlaku di worker lain')
+
+# Riwayat chat dan URL aktif per session disimpan di server (lihat conversation_store.py)
+conversations = ConversationStore()
 
 template = """
 You are an assistant for question-answering tasks. Use the following pieces of retrieved context to answer the question. If you don't know the answer, just say that you don't know. Use three sentences maximum and keep the answer concise.
@@ -19,15 +42,19 @@ Answer:
 model_name = "llama3"
 embeddings_model_name = "nomic-embed-text"
 
-# Global variables
-vector_stores = {}
-models = {}
-
+# Model dan embeddings dibuat sekali oleh gateway, koneksi HTTP ke Ollama dipakai ulang.
+# Setiap panggilan embed (crawl, dedup, retriever) memegang slot gateway seperti generate.
 def get_embeddings():
-    return OllamaEmbeddings(model=embeddings_model_name)
+    return gateway.embeddings(model=embeddings_model_name)
 
 def get_model():
-    return OllamaLLM(model=model_name)
+    return gateway.llm(model=model_name)
+
+# Vector store per session dengan eviction LRU/TTL idle dan batas memori (lihat session_store.py)
+vector_stores = SessionStore(
+    factory=lambda: VectorIndex(get_embeddings()),
+    loader=lambda directory: VectorIndex.load(directory, get_embeddings())
+)
 
 def load_page(url):
     loader = SeleniumURLLoader(urls=[url])
@@ -42,22 +69,112 @@ def split_text(documents):
     )
     return text_splitter.split_documents(documents)
 
-def index_docs(session_id, documents):
-    if session_id not in vector_stores:
-        embeddings = get_embeddings()
-        vector_stores[session_id] = InMemoryVectorStore(embeddings)
-    vector_stores[session_id].add_documents(documents)
+def embed_texts(texts):
+    return get_embeddings().embed_documents(texts)
+
+# Sebelum embeddings: boilerplate antar halaman dibuang, chunk duplikat tidak di-embed ulang (lihat dedup.py)
+boilerplate = BoilerplateFilter()
+chunk_dedup = ChunkDeduplicator(embed_texts)
+
+def prepare_chunks(documents):
+    return chunk_dedup.unique(split_text(boilerplate.strip(documents)))
+
+# Crawl, split dan embeddings per URL dipakai bersama semua session (lihat url_cache.py)
+url_cache = UrlCache(load=load_page, split=prepare_chunks, embed=chunk_dedup.embed)
+
+# Halaman yang dimuat sebelum bloknya dikenali sebagai boilerplate di-split dan di-embed ulang di
+# url_cache, lalu diganti di vector store session ini (session lain tetap memakai versi lama
+# sampai memuat URL-nya lagi)
+def restrip_boilerplate(vector_store):
+    replaced = url_cache.restrip(boilerplate.pop_stale())
+    for old_page, new_page in replaced:
+        vector_store.replace_page(old_page, new_page)
+    return len(replaced)
+
+def index_page(session_id, url):
+    page, status = url_cache.get(url)
+    vector_store = vector_stores.get(session_id, create=True)
+    count = vector_store.add_page(page)
+    restrip_boilerplate(vector_store)
+    vector_stores.updated(session_id)
+    return count, status
+
+# Browser headless dipakai ulang antar crawl, hanya untuk halaman yang butuh JavaScript
+browser_pool = BrowserPool()
+
+def crawl_site(session_id, url, max_pages=None, max_depth=None):
+    vector_store = vector_stores.get(session_id, create=True)
+
+    # dipanggil crawler untuk setiap halaman begitu selesai diambil
+    def process(page_url, documents, **fetched):
+        page, status = url_cache.put(page_url, documents, **fetched)
+        return vector_store.add_page(page), status
 
+    stats = SiteCrawler(process, browsers=browser_pool).run(url, max_pages, max_depth)
+    # blok yang baru dikenali sebagai boilerplate di tengah crawl juga dibuang dari halaman-halaman awal
+    stats['restripped'] = restrip_boilerplate(vector_store)
+    vector_stores.updated(session_id)
+    return stats
+
+# dokumen beserta skornya; kandidat lebih banyak dari yang muat di prompt, dipilih ulang oleh build_context
 def retrieve_docs(session_id, query):
-    if session_id in vector_stores:
-        return vector_stores[session_id].similarity_search(query)
-    return []
+    vector_store = vector_stores.get(session_id)
+    if vector_store is None:
+        return None
+    return vector_store.similarity_search_with_score(query, k=CONTEXT_CANDIDATES)
 
-def answer_question(question, context):
+def get_answer_chain():
     model = get_model()
     prompt = ChatPromptTemplate.from_template(template)
-    chain = prompt | model
-    return chain.invoke({"question": question, "context": context})
+    return prompt | model
+
+# Logika /ask ditulis sekali di bawah ini dan dipakai route Flask di file ini maupun route async
+# di asgi.py (lihat shared/llm_flow.py); retrieval dan SQLite bersifat blocking, jadi lewat Call
+def prepare_question(session_id, question):
+    if not conversations.current_url(session_id):
+        return None, 'Please load a URL first'
+    # Retrieve relevant documents
+    retrieved_docs = retrieve_docs(session_id, question)
+    if retrieved_docs is None:
+        # Store session sudah dibuang karena lama tidak dipakai; URL dilepas agar /get_messages tidak
+        # lagi melaporkan documents_loaded dan pertanyaan berikutnya diminta memuat URL lagi
+        conversations.expire(session_id)
+        return None, 'Session expired, please load the URL again'
+    # Rerank dan batasi konteks sesuai budget token prompt
+    return build_context(question, retrieved_docs), None
+
+def save_answer(session_id, question, answer):
+    conversations.append(
+        session_id,
+        {'role': 'user', 'content': question},
+        {'role': 'assistant', 'content': answer}
+    )
+    return conversations.count(session_id)
+
+def ask_flow(data, session_id):
+    question = data.get('question') if isinstance(data, dict) else None
+    if not question:
+        return {'success': False, 'message': 'Question is required'}
+    if not session_id:
+        return {'success': False, 'message': 'Please load a URL first'}
+
+    prepared, message = yield Call(prepare_question, session_id, question)
+    if prepared is None:
+        return {'success': False, 'message': message}
+    context, context_tokens = prepared
+
+    # Generate answer
+    answer = yield Invoke(get_answer_chain(), {"question": question, "context": context})
+
+    # Update chat history
+    message_count = yield Call(save_answer, session_id, question, answer)
+
+    return {
+        'success': True,
+        'answer': answer,
+        'context_tokens': context_tokens,
+        'message_count': message_count
+    }
 
 @app.route('/')
 def index():
@@ -78,78 +195,113 @@ def load_url():
         
         session_id = session['session_id']
         
-        # Load and process documents
-        documents = load_page(url)
-        chunked_documents = split_text(documents)
-        index_docs(session_id, chunked_documents)
+        # Load and process documents, halaman yang sudah pernah dimuat diambil dari cache
+        chunk_count, cache_status = index_page(session_id, url)
         
         # Initialize chat history
-        session['messages'] = []
-        session['documents_loaded'] = True
-        session['current_url'] = url
+        conversations.start(session_id, url)
         
         return jsonify({
             'success': True, 
-            'message': f'Successfully loaded and processed {len(chunked_documents)} document chunks'
+            'message': f'Successfully loaded and processed {chunk_count} document chunks',
+            'cache': cache_status
         })
     
     except Exception as e:
         return jsonify({'success': False, 'message': f'Error loading URL: {str(e)}'})
 
-@app.route('/ask', methods=['POST'])
-def ask_question():
+@app.route('/crawl', methods=['POST'])
+def crawl():
     try:
         data = request.get_json()
-        question = data.get('question')
-        
-        if not question:
-            return jsonify({'success': False, 'message': 'Question is required'})
-        
-        if 'session_id' not in session or not session.get('documents_loaded'):
-            return jsonify({'success': False, 'message': 'Please load a URL first'})
-        
-        session_id = session['session_id']
+        url = data.get('url')
         
-        # Retrieve relevant documents
-        retrieved_docs = retrieve_docs(session_id, question)
-        context = "\n\n".join([doc.page_content for doc in retrieved_docs])
+        if not url:
+            return jsonify({'success': False, 'message': 'URL is required'})
         
-        # Generate answer
-        answer = answer_question(question, context)
+        if 'session_id' not in session:
+            session['session_id'] = os.urandom(16).hex()
         
-        # Update chat history
-        if 'messages' not in session:
-            session['messages'] = []
+        # Crawl halaman lain di domain yang sama, batas dari request tidak bisa melewati CRAWL_MAX_*
+        max_pages = int(data['max_pages']) if data.get('max_pages') else None
+        max_depth = int(data['max_depth']) if data.get('max_depth') is not None else None
+        stats = crawl_site(session['session_id'], url, max_pages, max_depth)
+        if not stats['pages']:
+            return jsonify({'success': False, 'message': 'No pages could be crawled from this URL', 'crawl': stats})
         
-        session['messages'].append({'role': 'user', 'content': question})
-        session['messages'].append({'role': 'assistant', 'content': answer})
-        session.modified = True
+        conversations.start(session['session_id'], url)
         
         return jsonify({
             'success': True,
-            'answer': answer,
-            'messages': session['messages']
+            'message': f"Successfully crawled {stats['pages']} pages into {stats['chunks']} document chunks",
+            'crawl': stats
         })
     
+    except Exception as e:
+        return jsonify({'success': False, 'message': f'Error crawling URL: {str(e)}'})
+
+@app.route('/ask', methods=['POST'])
+def ask_question():
+    try:
+        return jsonify(run(ask_flow(request.get_json(silent=True), session.get('session_id'))))
+    
+    except GatewayBusy as e:
+        response = jsonify({'success': False, 'message': str(e)})
+        response.headers['Retry-After'] = str(e.retry_after)
+        return response, e.status
     except Exception as e:
         return jsonify({'success': False, 'message': f'Error generating answer: {str(e)}'})
 
+@app.route('/sessions/stats')
+def sessions_stats():
+    return jsonify(vector_stores.stats())
+
+@app.route('/url_cache/stats')
+def url_cache_stats():
+    return jsonify(url_cache.stats())
+
+@app.route('/dedup/stats')
+def dedup_stats():
+    return jsonify({**chunk_dedup.stats(), 'boilerplate_blocks_stripped': boilerplate.stripped_blocks})
+
+@app.route('/llm/stats')
+def llm_stats():
+    return jsonify(gateway.stats())
+
+# riwayat per halaman: ?limit=N (default CHAT_PAGE_SIZE) dan ?before=<next_before dari halaman sebelumnya>
 @app.route('/get_messages')
 def get_messages():
-    messages = session.get('messages', [])
-    return jsonify({'messages': messages})
+    session_id = session.get('session_id')
+    if not session_id:
+        return jsonify({'messages': [], 'next_before': None, 'documents_loaded': False})
+    messages, next_before = conversations.page(
+        session_id,
+        before=request.args.get('before', type=int),
+        limit=request.args.get('limit', CHAT_PAGE_SIZE, type=int)
+    )
+    documents_loaded = conversations.current_url(session_id) is not None
+    if documents_loaded and not vector_stores.has(session_id):
+        conversations.expire(session_id)
+        documents_loaded = False
+    return jsonify({
+        'messages': messages,
+        'next_before': next_before,
+        'documents_loaded': documents_loaded
+    })
 
 @app.route('/clear_chat', methods=['POST'])
 def clear_chat():
-    session['messages'] = []
-    session.modified = True
+    session_id = session.get('session_id')
+    if session_id:
+        conversations.clear(session_id)
     return jsonify({'success': True, 'message': 'Chat history cleared'})
 
 @app.route('/reset_session', methods=['POST'])
 def reset_session():
     session_id = session.get('session_id')
-    if session_id and session_id in vector_stores:
-        del vector_stores[session_id]
+    if session_id:
+        vector_stores.delete(session_id)
+        conversations.delete(session_id)
     
     session.clear()
     return jsonify({'success': True, 'message': 'Session reset successfully'})
@@ -0,0 +1,43 @@
+from a2wsgi import WSGIMiddleware
+from starlette.applications import Starlette
+from starlette.responses import JSONResponse
+from starlette.routing import Mount, Route
+# app.py menambahkan root repo ke sys.path, jadi diimpor sebelum paket shared
+from app import app as flask_app, ask_flow
+from shared.asgi import read_json
+from shared.llm_flow import arun
+from shared.llm_gateway import GatewayBusy
+
+# Mode ASGI (opsional): /ask menunggu jawaban model dengan ainvoke, sehingga ratusan pertanyaan
+# yang menunggu Ollama cukup dilayani satu worker tanpa satu thread per request.
+# Jumlah generate ke Ollama tetap dibatasi gateway (OLLAMA_MAX_CONCURRENCY/OLLAMA_MAX_QUEUE).
+# Isi jawaban sama dengan route Flask (ask_flow di app.py), di sini hanya cara menunggunya yang
+# async. Route lain (load_url, crawl, riwayat chat) diteruskan ke app Flask di app.py.
+#   uvicorn asgi:app --workers 1
+
+# session ID dibaca dari cookie session Flask yang sama (ditandatangani dengan FLASK_SECRET_KEY)
+session_serializer = flask_app.session_interface.get_signing_serializer(flask_app)
+
+def get_session_id(request):
+    cookie = request.cookies.get(flask_app.config['SESSION_COOKIE_NAME'])
+    if not cookie:
+        return None
+    try:
+        return session_serializer.loads(cookie).get('session_id')
+    except Exception:
+        return None
+
+async def ask_question(request):
+    try:
+        return JSONResponse(await arun(ask_flow(await read_json(request), get_session_id(request))))
+
+    except GatewayBusy as e:
+        return JSONResponse({'success': False, 'message': str(e)}, status_code=e.status,
+                            headers={'Retry-After': str(e.retry_after)})
+    except Exception as e:
+        return JSONResponse({'success': False, 'message': f'Error generating answer: {str(e)}'})
+
+app = Starlette(routes=[
+    Route('/ask', ask_question, methods=['POST']),
+    Mount('/', app=WSGIMiddleware(flask_app)),
+])
@@ -0,0 +1,89 @@
+import argparse
+import hashlib
+import time
+import numpy as np
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
+from langchain_core.vectorstores import InMemoryVectorStore
+from vector_index import VectorIndex
+
+# benchmark latency query retriever terhadap jumlah chunk: InMemoryVectorStore (LangChain),
+# VectorIndex exact (matmul), VectorIndex FAISS HNSW, dan VectorIndex hybrid BM25.
+# Embeddings dibuat acak dari hash teks agar benchmark tidak bergantung pada server Ollama.
+
+WORDS = ['crawler', 'index', 'vector', 'python', 'flask', 'session', 'cache', 'query', 'model', 'token',
+         'document', 'search', 'embedding', 'server', 'page', 'link', 'chunk', 'score', 'memory', 'disk']
+
+class HashEmbeddings(Embeddings):
+    def __init__(self, dim):
+        self.dim = dim
+
+    def _vector(self, text):
+        seed = int.from_bytes(hashlib.sha256(text.encode('utf-8')).digest()[:8], 'little')
+        return np.random.default_rng(seed).standard_normal(self.dim).astype('float32')
+
+    def embed_documents(self, texts):
+        return [self._vector(text).tolist() for text in texts]
+
+    def embed_query(self, text):
+        return self._vector(text).tolist()
+
+def make_documents(count, rng):
+    return [
+        Document(page_content=' '.join(rng.choice(WORDS, size=40)) + f' chunk{i}', metadata={'source': f'page{i // 20}'})
+        for i in range(count)
+    ]
+
+def time_queries(search, queries):
+    latencies = []
+    for query in queries:
+        start = time.perf_counter()
+        search(query)
+        latencies.append(time.perf_counter() - start)
+    latencies.sort()
+    return latencies[len(latencies) // 2] * 1000, latencies[int(len(latencies) * 0.95)] * 1000
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark retriever query latency vs number of chunks.')
+    parser.add_argument('--sizes', nargs='+', type=int, default=[1000, 5000, 20000, 100000])
+    parser.add_argument('--dim', type=int, default=768, help='768 = dimensi nomic-embed-text')
+    parser.add_argument('--queries', type=int, default=50)
+    parser.add_argument('--k', type=int, default=4)
+    parser.add_argument('--max-in-memory', type=int, default=20000, help='lewati InMemoryVectorStore di atas ukuran ini')
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    embedding = HashEmbeddings(args.dim)
+    queries = [' '.join(rng.choice(WORDS, size=6)) for _ in range(args.queries)]
+
+    print(f"{'chunks':>8} {'retriever':<16} {'p50_ms':>8} {'p95_ms':>8}")
+    for size in args.sizes:
+        documents = make_documents(size, rng)
+        vectors = embedding.embed_documents([document.page_content for document in documents])
+
+        results = []
+        if size <= args.max_in_memory:
+            store = InMemoryVectorStore(embedding)
+            store.add_documents(documents)
+            results.append(('in-memory', time_queries(lambda q: store.similarity_search(q, k=args.k), queries)))
+
+        exact = VectorIndex(embedding, k=args.k, ann_min_vectors=size + 1)
+        exact.add_vectors(vectors, documents)
+        exact.similarity_search('warm up')
+        exact.similarity_search('warm up', hybrid=True)
+        results.append(('exact-matmul', time_queries(lambda q: exact.similarity_search(q), queries)))
+        results.append(('hybrid-bm25', time_queries(lambda q: exact.similarity_search(q, hybrid=True), queries)))
+
+        ann = VectorIndex(embedding, k=args.k, ann_min_vectors=0)
+        ann.add_vectors(vectors, documents)
+        start = time.perf_counter()
+        ann.similarity_search('warm up')
+        ann.wait_for_ann()
+        build_ms = (time.perf_counter() - start) * 1000
+        results.append((f'hnsw(+{build_ms:.0f}ms)', time_queries(lambda q: ann.similarity_search(q), queries)))
+
+        for name, (p50, p95) in results:
+            print(f"{size:>8} {name:<16} {p50:>8.2f} {p95:>8.2f}")
+
+if __name__ == '__main__':
+    main()
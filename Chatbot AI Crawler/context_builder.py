@@ -0,0 +1,82 @@
+import math
+import os
+import re
+from vector_index import tokenize
+
+# batas token untuk konteks di prompt (sekitar 3 chunk 1000 karakter), jauh di bawah num_ctx
+# default Ollama (2048) agar tersisa ruang untuk template, pertanyaan dan jawaban
+CONTEXT_TOKEN_BUDGET = int(os.getenv('CONTEXT_TOKEN_BUDGET', '768'))
+# jumlah chunk kandidat yang diambil retriever sebelum di-rerank
+CONTEXT_CANDIDATES = int(os.getenv('CONTEXT_CANDIDATES', '12'))
+# perkiraan karakter per token untuk tokenizer llama3 (teks Inggris/Indonesia)
+CHARS_PER_TOKEN = float(os.getenv('CONTEXT_CHARS_PER_TOKEN', '4'))
+# bobot kecocokan kata kunci pertanyaan terhadap skor retriever saat rerank
+KEYWORD_WEIGHT = float(os.getenv('CONTEXT_KEYWORD_WEIGHT', '0.3'))
+# penalti chunk yang isinya mirip dengan chunk yang sudah dipilih (MMR)
+REDUNDANCY_WEIGHT = float(os.getenv('CONTEXT_REDUNDANCY_WEIGHT', '0.5'))
+SEPARATOR = "\n\n"
+
+def estimate_tokens(text):
+    return math.ceil(len(text) / CHARS_PER_TOKEN)
+
+def jaccard(a, b):
+    return len(a & b) / len(a | b) if a and b else 0.0
+
+def truncate(text, tokens):
+    # potong di akhir kalimat terakhir yang masih muat, atau di akhir kata jika kalimatnya terlalu panjang
+    limit = int(tokens * CHARS_PER_TOKEN)
+    if len(text) <= limit:
+        return text
+    cut = text[:limit]
+    sentence_ends = [match.end() for match in re.finditer(r'[.!?]\s', cut)]
+    if sentence_ends and sentence_ends[-1] > limit // 2:
+        return cut[:sentence_ends[-1]].rstrip()
+    space = cut.rfind(' ')
+    return cut[:space] if space > 0 else cut
+
+# Rerank chunk hasil retriever lalu susun ke dalam batas token:
+# - skor = skor retriever (dinormalisasi) + bobot * porsi kata pertanyaan yang ada di chunk
+# - pemilihan bertahap ala MMR: chunk yang mirip dengan chunk terpilih mendapat penalti
+# - chunk dimasukkan selama muat di budget, chunk pertama dipotong jika sendirian sudah melebihi budget
+def rerank(question, scored_documents, keyword_weight=KEYWORD_WEIGHT, redundancy_weight=REDUNDANCY_WEIGHT):
+    if not scored_documents:
+        return []
+    query_terms = set(tokenize(question))
+    # normalisasi min-max ke 0..1: skor bisa negatif (cosine) sehingga score / max membalik urutan
+    low = min(score for _, score in scored_documents)
+    high = max(score for _, score in scored_documents)
+    candidates = []
+    for document, score in scored_documents:
+        terms = set(tokenize(document.page_content))
+        coverage = len(query_terms & terms) / len(query_terms) if query_terms else 0.0
+        relevance = (score - low) / (high - low) if high > low else 1.0
+        candidates.append((document, terms, relevance + keyword_weight * coverage))
+
+    ranked = []
+    while candidates:
+        best = max(
+            range(len(candidates)),
+            key=lambda i: candidates[i][2] - redundancy_weight * max(
+                (jaccard(candidates[i][1], terms) for _, terms in ranked), default=0.0)
+        )
+        document, terms, _ = candidates.pop(best)
+        ranked.append((document, terms))
+    return [document for document, _ in ranked]
+
+def pack(documents, token_budget=CONTEXT_TOKEN_BUDGET):
+    parts = []
+    used = 0
+    separator_tokens = estimate_tokens(SEPARATOR)
+    for document in documents:
+        text = document.page_content.strip()
+        cost = estimate_tokens(text) + (separator_tokens if parts else 0)
+        if used + cost <= token_budget:
+            parts.append(text)
+            used += cost
+        elif not parts:
+            parts.append(truncate(text, token_budget))
+            used = estimate_tokens(parts[0])
+    return SEPARATOR.join(parts), used
+
+def build_context(question, scored_documents, token_budget=CONTEXT_TOKEN_BUDGET):
+    return pack(rerank(question, scored_documents), token_budget)
@@ -0,0 +1,122 @@
+import os
+import sqlite3
+import threading
+import time
+
+# riwayat chat disimpan di SQLite di server, cookie Flask hanya berisi session ID
+CHAT_DB_PATH = os.getenv('CHAT_DB_PATH') or os.path.join(os.path.dirname(os.path.abspath(__file__)), 'chat_history.db')
+# percakapan yang tidak dipakai selama ini dihapus
+CHAT_HISTORY_TTL = int(os.getenv('CHAT_HISTORY_TTL', str(7 * 24 * 3600)))
+CHAT_PAGE_SIZE = int(os.getenv('CHAT_PAGE_SIZE', '50'))
+CHAT_MAX_PAGE_SIZE = 200
+PURGE_INTERVAL = 300
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS conversations (
+    session_id TEXT PRIMARY KEY,
+    current_url TEXT,
+    updated_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS messages (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    session_id TEXT NOT NULL,
+    role TEXT NOT NULL,
+    content TEXT NOT NULL,
+    created_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS messages_session ON messages (session_id, id);
+"""
+
+# Satu koneksi SQLite per thread (mode WAL agar baca dan tulis tidak saling menunggu)
+class ConversationStore:
+    def __init__(self, path=CHAT_DB_PATH, ttl=CHAT_HISTORY_TTL):
+        self.path = path
+        self.ttl = ttl
+        self._local = threading.local()
+        self._last_purge = 0.0
+        self._db().executescript(SCHEMA)
+
+    def _db(self):
+        db = getattr(self._local, 'db', None)
+        if db is None:
+            db = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            db.execute('PRAGMA journal_mode=WAL')
+            db.execute('PRAGMA synchronous=NORMAL')
+            self._local.db = db
+        return db
+
+    def _touch(self, db, session_id, now):
+        db.execute(
+            'INSERT INTO conversations (session_id, updated_at) VALUES (?, ?) '
+            'ON CONFLICT(session_id) DO UPDATE SET updated_at = excluded.updated_at',
+            (session_id, now)
+        )
+
+    def _purge(self, db, now):
+        # hapus percakapan yang sudah lewat TTL, paling sering sekali per PURGE_INTERVAL
+        if now - self._last_purge < PURGE_INTERVAL:
+            return
+        self._last_purge = now
+        cutoff = now - self.ttl
+        db.execute('DELETE FROM messages WHERE session_id IN (SELECT session_id FROM conversations WHERE updated_at < ?)', (cutoff,))
+        db.execute('DELETE FROM conversations WHERE updated_at < ?', (cutoff,))
+
+    # URL baru dimuat: riwayat chat dimulai dari awal
+    def start(self, session_id, url):
+        now = time.time()
+        db = self._db()
+        with db:
+            db.execute('BEGIN')
+            db.execute('DELETE FROM messages WHERE session_id = ?', (session_id,))
+            self._touch(db, session_id, now)
+            db.execute('UPDATE conversations SET current_url = ? WHERE session_id = ?', (url, session_id))
+        self._purge(db, now)
+
+    def current_url(self, session_id):
+        row = self._db().execute('SELECT current_url FROM conversations WHERE session_id = ?', (session_id,)).fetchone()
+        return row[0] if row else None
+
+    # store dokumen session sudah dibuang (idle/batas memori): URL dilepas agar client diminta memuat
+    # URL lagi, riwayat chat tetap disimpan
+    def expire(self, session_id):
+        self._db().execute('UPDATE conversations SET current_url = NULL WHERE session_id = ?', (session_id,))
+
+    def append(self, session_id, *messages):
+        now = time.time()
+        db = self._db()
+        with db:
+            db.execute('BEGIN')
+            db.executemany(
+                'INSERT INTO messages (session_id, role, content, created_at) VALUES (?, ?, ?, ?)',
+                [(session_id, message['role'], message['content'], now) for message in messages]
+            )
+            self._touch(db, session_id, now)
+        self._purge(db, now)
+
+    # satu halaman riwayat, urut dari pesan lama ke baru; 'before' adalah id pesan tertua di halaman
+    # sebelumnya (None untuk halaman terbaru)
+    def page(self, session_id, before=None, limit=CHAT_PAGE_SIZE):
+        limit = max(1, min(limit, CHAT_MAX_PAGE_SIZE))
+        query = 'SELECT id, role, content, created_at FROM messages WHERE session_id = ?'
+        params = [session_id]
+        if before is not None:
+            query += ' AND id < ?'
+            params.append(before)
+        rows = self._db().execute(query + ' ORDER BY id DESC LIMIT ?', params + [limit + 1]).fetchall()
+        has_more = len(rows) > limit
+        rows = rows[:limit][::-1]
+        messages = [{'id': row[0], 'role': row[1], 'content': row[2], 'created_at': row[3]} for row in rows]
+        return messages, (rows[0][0] if has_more else None)
+
+    def count(self, session_id):
+        return self._db().execute('SELECT COUNT(*) FROM messages WHERE session_id = ?', (session_id,)).fetchone()[0]
+
+    def clear(self, session_id):
+        self._db().execute('DELETE FROM messages WHERE session_id = ?', (session_id,))
+
+    def delete(self, session_id):
+        db = self._db()
+        with db:
+            db.execute('BEGIN')
+            db.execute('DELETE FROM messages WHERE session_id = ?', (session_id,))
+            db.execute('DELETE FROM conversations WHERE session_id = ?', (session_id,))
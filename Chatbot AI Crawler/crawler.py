@@ -0,0 +1,364 @@
+import asyncio
+import atexit
+import hashlib
+import os
+import queue
+import threading
+import time
+from contextlib import contextmanager
+from html.parser import HTMLParser
+from urllib.parse import urljoin, urldefrag, urlparse
+from urllib.robotparser import RobotFileParser
+import httpx
+from langchain_core.documents import Document
+
+CRAWL_MAX_PAGES = int(os.getenv('CRAWL_MAX_PAGES', '50'))
+CRAWL_MAX_DEPTH = int(os.getenv('CRAWL_MAX_DEPTH', '2'))
+# jumlah request HTTP bersamaan dalam satu crawl
+CRAWL_CONCURRENCY = int(os.getenv('CRAWL_CONCURRENCY', '8'))
+# request per detik per host, Crawl-delay dari robots.txt dipakai jika lebih lambat
+CRAWL_RATE = float(os.getenv('CRAWL_RATE', '4'))
+CRAWL_TIMEOUT = float(os.getenv('CRAWL_TIMEOUT', '15'))
+CRAWL_USER_AGENT = os.getenv('CRAWL_USER_AGENT', 'AICrawlerBot/1.0')
+# halaman HTML dengan teks lebih sedikit dari ini (dan ada <script>) dianggap butuh JavaScript
+CRAWL_MIN_TEXT_CHARS = int(os.getenv('CRAWL_MIN_TEXT_CHARS', '200'))
+# jumlah browser Selenium headless yang dipakai ulang untuk halaman JavaScript, 0 berarti tanpa fallback
+CRAWL_BROWSERS = int(os.getenv('CRAWL_BROWSERS', '2'))
+
+SKIP_TAGS = {'script', 'style', 'noscript', 'template', 'svg', 'head'}
+BLOCK_TAGS = {
+    'p', 'div', 'br', 'li', 'ul', 'ol', 'tr', 'table', 'section', 'article', 'header', 'footer', 'nav',
+    'aside', 'main', 'h1', 'h2', 'h3', 'h4', 'h5', 'h6', 'pre', 'blockquote', 'dd', 'dt', 'form',
+}
+
+# Ekstraksi teks, judul dan link dari HTML dengan parser bawaan Python
+class PageParser(HTMLParser):
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.parts = []
+        self.links = []
+        self.title = ''
+        self.base = None
+        self.nofollow = False
+        self.has_script = False
+        self._skip = 0
+        self._in_title = False
+
+    def handle_starttag(self, tag, attrs):
+        attrs = dict(attrs)
+        if tag == 'script':
+            self.has_script = True
+        if tag == 'title':
+            self._in_title = True
+        elif tag in SKIP_TAGS:
+            self._skip += 1
+        elif tag == 'a' and attrs.get('href') and 'nofollow' not in (attrs.get('rel') or ''):
+            self.links.append(attrs['href'])
+        elif tag == 'base' and attrs.get('href'):
+            self.base = attrs['href']
+        elif tag == 'meta' and (attrs.get('name') or '').lower() == 'robots':
+            self.nofollow = 'nofollow' in (attrs.get('content') or '').lower()
+        if tag in BLOCK_TAGS:
+            self.parts.append('\n')
+
+    def handle_startendtag(self, tag, attrs):
+        self.handle_starttag(tag, attrs)
+
+    def handle_endtag(self, tag):
+        if tag == 'title':
+            self._in_title = False
+        elif tag in SKIP_TAGS and self._skip:
+            self._skip -= 1
+        if tag in BLOCK_TAGS:
+            self.parts.append('\n')
+
+    def handle_data(self, data):
+        if self._in_title:
+            self.title += data
+        elif not self._skip:
+            self.parts.append(data)
+
+    def text(self):
+        lines = (' '.join(line.split()) for line in ''.join(self.parts).splitlines())
+        return '\n\n'.join(line for line in lines if line)
+
+# URL relatif digabung dengan base; None jika salah satunya tidak valid (misalnya http://[::1/x)
+def join_url(base, link):
+    try:
+        return urljoin(base, link)
+    except ValueError:
+        return None
+
+def parse_html(html, url):
+    parser = PageParser()
+    parser.feed(html)
+    parser.close()
+    base = (join_url(url, parser.base) or url) if parser.base else url
+    links = [] if parser.nofollow else [link for link in (join_url(base, link) for link in parser.links) if link]
+    return parser.text(), ' '.join(parser.title.split()), links, parser.has_script
+
+def normalize_url(url):
+    url, _ = urldefrag(url)
+    try:
+        parsed = urlparse(url)
+    except ValueError:
+        return None
+    if parsed.scheme not in ('http', 'https') or not parsed.netloc:
+        return None
+    return parsed._replace(netloc=parsed.netloc.lower(), path=parsed.path or '/').geturl()
+
+# host situs untuk membandingkan domain: example.com dan www.example.com dianggap situs yang sama
+def site_host(url):
+    return urlparse(url).netloc.removeprefix('www.')
+
+# Browser Selenium headless yang dibuat sekali lalu dipakai ulang, hanya untuk halaman yang
+# kontennya dirender oleh JavaScript. Browser yang gagal (crash, timeout) ditutup dan tidak
+# dikembalikan ke pool; slot-nya ditandai None di antrian idle dan diisi browser baru oleh
+# pemakai berikutnya.
+class BrowserPool:
+    def __init__(self, size=CRAWL_BROWSERS, timeout=CRAWL_TIMEOUT):
+        self.size = size
+        self.timeout = timeout
+        self._idle = queue.LifoQueue()
+        self._drivers = []
+        self._lock = threading.Lock()
+        atexit.register(self.close)
+
+    def _create(self):
+        from selenium import webdriver
+        options = webdriver.ChromeOptions()
+        options.add_argument('--headless=new')
+        options.add_argument('--no-sandbox')
+        options.add_argument('--disable-dev-shm-usage')
+        driver = webdriver.Chrome(options=options)
+        driver.set_page_load_timeout(self.timeout)
+        return driver
+
+    @contextmanager
+    def driver(self):
+        try:
+            driver = self._idle.get_nowait()
+        except queue.Empty:
+            with self._lock:
+                create = len(self._drivers) < self.size
+                if create:
+                    self._drivers.append(None)
+            driver = None if create else self._idle.get()
+        if driver is None:
+            try:
+                driver = self._create()
+            except Exception:
+                # slot tetap ada agar pemakai yang sedang menunggu bisa mencoba membuat browser lagi
+                self._idle.put(None)
+                raise
+            with self._lock:
+                self._drivers[self._drivers.index(None)] = driver
+        try:
+            yield driver
+        except Exception:
+            self._discard(driver)
+            raise
+        self._idle.put(driver)
+
+    def _discard(self, driver):
+        with self._lock:
+            self._drivers[self._drivers.index(driver)] = None
+        self._idle.put(None)
+        try:
+            driver.quit()
+        except Exception:
+            pass
+
+    # (URL akhir setelah redirect di browser, HTML hasil render)
+    def page_source(self, url):
+        with self.driver() as driver:
+            driver.get(url)
+            return driver.current_url, driver.page_source
+
+    def close(self):
+        with self._lock:
+            drivers, self._drivers = [driver for driver in self._drivers if driver is not None], []
+        for driver in drivers:
+            try:
+                driver.quit()
+            except Exception:
+                pass
+
+# Jeda minimal antar request ke host yang sama
+class RateLimiter:
+    def __init__(self, interval):
+        self.interval = interval
+        self._next = 0.0
+        self._lock = asyncio.Lock()
+
+    async def wait(self):
+        async with self._lock:
+            now = time.monotonic()
+            delay = self._next - now
+            self._next = max(now, self._next) + self.interval
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+# Crawl satu situs: mengikuti link di domain yang sama sampai max_depth/max_pages (halaman yang
+# di-redirect ke domain lain dilewati), halaman diambil
+# bersamaan dengan satu httpx.AsyncClient (koneksi dipakai ulang), robots.txt dan rate limit dipatuhi.
+# Setiap halaman langsung diteruskan ke process(url, documents, body_hash, etag, last_modified)
+# di thread terpisah, sehingga split + embeddings berjalan selagi halaman lain masih diambil.
+class SiteCrawler:
+    def __init__(self, process, browsers=None, max_pages=CRAWL_MAX_PAGES, max_depth=CRAWL_MAX_DEPTH,
+                 concurrency=CRAWL_CONCURRENCY, rate=CRAWL_RATE, user_agent=CRAWL_USER_AGENT,
+                 min_text_chars=CRAWL_MIN_TEXT_CHARS):
+        self.process = process
+        self.browsers = browsers
+        self.max_pages = max_pages
+        self.max_depth = max_depth
+        self.concurrency = concurrency
+        self.rate = rate
+        self.user_agent = user_agent
+        self.min_text_chars = min_text_chars
+
+    async def _robots(self, client, url):
+        parsed = urlparse(url)
+        robots = RobotFileParser(f'{parsed.scheme}://{parsed.netloc}/robots.txt')
+        try:
+            response = await client.get(robots.url)
+        except httpx.HTTPError:
+            robots.allow_all = True
+            return robots
+        if response.status_code in (401, 403):
+            robots.disallow_all = True
+        elif response.status_code >= 400:
+            robots.allow_all = True
+        else:
+            robots.parse(response.text.splitlines())
+        return robots
+
+    async def _get(self, client, limiter, url):
+        for _ in range(3):
+            await limiter.wait()
+            response = await client.get(url)
+            if response.status_code not in (429, 503):
+                return response
+            # server minta pelan-pelan, ikuti Retry-After sebelum mencoba lagi
+            retry_after = response.headers.get('retry-after', '')
+            await asyncio.sleep(min(float(retry_after), 30) if retry_after.isdigit() else limiter.interval * 4)
+        return response
+
+    async def _fetch(self, client, limiter, url, stats):
+        response = await self._get(client, limiter, url)
+        if response.status_code != 200:
+            stats['errors'] += 1
+            return None
+        content_type = response.headers.get('content-type', '')
+        final_url = normalize_url(str(response.url)) or url
+        body_hash = hashlib.sha256(response.content).hexdigest()
+        meta = {'body_hash': body_hash, 'etag': response.headers.get('etag'),
+                'last_modified': response.headers.get('last-modified')}
+        if 'html' not in content_type:
+            if content_type.startswith('text/'):
+                return final_url, response.text, '', [], meta
+            stats['skipped'] += 1
+            return None
+
+        text, title, links, has_script = parse_html(response.text, final_url)
+        if len(text) < self.min_text_chars and has_script and self.browsers is not None and self.browsers.size:
+            try:
+                rendered_url, html = await asyncio.to_thread(self.browsers.page_source, final_url)
+            except Exception:
+                stats['errors'] += 1
+            else:
+                rendered_url = normalize_url(rendered_url)
+                if rendered_url is None or site_host(rendered_url) != site_host(final_url):
+                    # JavaScript membawa browser ke situs lain, hasil render tidak dipakai
+                    stats['offsite'] += 1
+                else:
+                    text, title, rendered_links, _ = parse_html(html, rendered_url)
+                    links = links + rendered_links
+                    stats['rendered'] += 1
+        return final_url, text, title, links, meta
+
+    async def crawl(self, start_url, max_pages=None, max_depth=None):
+        max_pages = min(max_pages or self.max_pages, self.max_pages)
+        max_depth = self.max_depth if max_depth is None else min(max_depth, self.max_depth)
+        start_url = normalize_url(start_url)
+        if start_url is None:
+            raise ValueError('Only http(s) URLs can be crawled')
+        host = site_host(start_url)
+        stats = {'pages': 0, 'chunks': 0, 'rendered': 0, 'robots_blocked': 0, 'skipped': 0, 'offsite': 0,
+                 'errors': 0, 'cache': {}}
+        started = time.perf_counter()
+
+        limits = httpx.Limits(max_connections=self.concurrency, max_keepalive_connections=self.concurrency)
+        async with httpx.AsyncClient(timeout=CRAWL_TIMEOUT, follow_redirects=True, limits=limits,
+                                     headers={'User-Agent': self.user_agent}) as client:
+            robots = await self._robots(client, start_url)
+            crawl_delay = robots.crawl_delay(self.user_agent) or 0
+            limiter = RateLimiter(max(1 / self.rate if self.rate > 0 else 0, float(crawl_delay)))
+
+            frontier = asyncio.Queue()
+            pages = asyncio.Queue()
+            seen = {start_url}
+            frontier.put_nowait((start_url, 0))
+
+            async def fetch_worker():
+                while True:
+                    url, depth = await frontier.get()
+                    try:
+                        if not robots.can_fetch(self.user_agent, url):
+                            stats['robots_blocked'] += 1
+                            continue
+                        result = await self._fetch(client, limiter, url, stats)
+                        if result is None:
+                            continue
+                        final_url, text, title, links, meta = result
+                        if site_host(final_url) != host:
+                            # redirect ke situs lain tidak diindeks dan link-nya tidak diikuti
+                            stats['offsite'] += 1
+                            continue
+                        if text:
+                            stats['pages'] += 1
+                            metadata = {'source': final_url, 'title': title}
+                            await pages.put((final_url, [Document(page_content=text, metadata=metadata)], meta))
+                        if depth >= max_depth:
+                            continue
+                        for link in links:
+                            link = normalize_url(link)
+                            if link is None or link in seen or site_host(link) != host or len(seen) >= max_pages:
+                                continue
+                            seen.add(link)
+                            frontier.put_nowait((link, depth + 1))
+                    except Exception:
+                        # satu URL yang gagal (HTTP, URL tidak valid, HTML rusak) tidak boleh menghentikan
+                        # worker, karena frontier.join() akan menunggu selamanya
+                        stats['errors'] += 1
+                    finally:
+                        frontier.task_done()
+
+            async def process_worker():
+                # satu consumer: embeddings ke Ollama diproses berurutan selagi fetch tetap berjalan
+                while True:
+                    url, documents, meta = await pages.get()
+                    try:
+                        chunks, status = await asyncio.to_thread(self.process, url, documents, **meta)
+                        stats['chunks'] += chunks
+                        stats['cache'][status] = stats['cache'].get(status, 0) + 1
+                    except Exception:
+                        stats['errors'] += 1
+                    finally:
+                        pages.task_done()
+
+            workers = [asyncio.create_task(fetch_worker()) for _ in range(self.concurrency)]
+            processor = asyncio.create_task(process_worker())
+            try:
+                await frontier.join()
+                await pages.join()
+            finally:
+                for task in workers + [processor]:
+                    task.cancel()
+                await asyncio.gather(*workers, processor, return_exceptions=True)
+
+        stats['seconds'] = round(time.perf_counter() - started, 3)
+        return stats
+
+    def run(self, start_url, max_pages=None, max_depth=None):
+        return asyncio.run(self.crawl(start_url, max_pages, max_depth))
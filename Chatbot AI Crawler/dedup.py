@@ -0,0 +1,233 @@
+import hashlib
+import os
+import re
+import threading
+from collections import Counter, OrderedDict
+from urllib.parse import urlparse
+import numpy as np
+from langchain_core.documents import Document
+
+# blok teks (dipisah baris kosong) yang muncul di sebanyak ini halaman dari host yang sama dianggap
+# boilerplate (navigasi, footer, cookie banner) dan dibuang sebelum split
+BOILERPLATE_MIN_PAGES = int(os.getenv('BOILERPLATE_MIN_PAGES', '3'))
+BOILERPLATE_MAX_HOSTS = int(os.getenv('BOILERPLATE_MAX_HOSTS', '100'))
+# jumlah halaman terakhir per host yang dihitung; blok dari halaman yang lebih lama dilupakan
+BOILERPLATE_MAX_PAGES = int(os.getenv('BOILERPLATE_MAX_PAGES', '1000'))
+# jarak Hamming SimHash (64 bit) maksimal agar dua chunk dianggap hampir sama
+DEDUP_MAX_DISTANCE = int(os.getenv('DEDUP_MAX_DISTANCE', '3'))
+# jumlah embeddings chunk yang disimpan untuk dipakai ulang
+DEDUP_MAX_ENTRIES = int(os.getenv('DEDUP_MAX_ENTRIES', '20000'))
+SIMHASH_BANDS = 4
+
+def normalize_text(text):
+    return ' '.join(re.findall(r'\w+', text.lower()))
+
+def text_key(text):
+    return hashlib.sha256(normalize_text(text).encode('utf-8')).hexdigest()[:32]
+
+def simhash(text, shingle=3):
+    words = normalize_text(text).split()
+    grams = [' '.join(words[i:i + shingle]) for i in range(max(len(words) - shingle + 1, 1))]
+    counts = Counter(grams)
+    values = np.array([int.from_bytes(hashlib.blake2b(gram.encode('utf-8'), digest_size=8).digest(), 'little')
+                       for gram in counts], dtype='uint64')
+    bits = ((values[:, None] >> np.arange(64, dtype='uint64')) & np.uint64(1)).astype('int64')
+    weights = np.array(list(counts.values()), dtype='int64') @ (2 * bits - 1)
+    return int(sum(1 << i for i in range(64) if weights[i] > 0))
+
+def hamming(a, b):
+    return bin(a ^ b).count('1')
+
+# Index SimHash: signature dibagi 4 band 16 bit, dua signature dengan jarak <= 3 pasti punya
+# minimal satu band yang sama, jadi hanya kandidat di band yang sama yang dibandingkan
+class SimHashIndex:
+    def __init__(self, max_distance=DEDUP_MAX_DISTANCE):
+        self.max_distance = max_distance
+        self._bands = [{} for _ in range(SIMHASH_BANDS)]
+
+    def _band_values(self, signature):
+        width = 64 // SIMHASH_BANDS
+        return [(signature >> (i * width)) & ((1 << width) - 1) for i in range(SIMHASH_BANDS)]
+
+    def find(self, signature):
+        for band, value in zip(self._bands, self._band_values(signature)):
+            for other, key in band.get(value, {}).items():
+                if hamming(signature, other) <= self.max_distance:
+                    return key
+        return None
+
+    def add(self, signature, key):
+        for band, value in zip(self._bands, self._band_values(signature)):
+            band.setdefault(value, {})[signature] = key
+
+    def remove(self, signature):
+        for band, value in zip(self._bands, self._band_values(signature)):
+            bucket = band.get(value)
+            if bucket is not None:
+                bucket.pop(signature, None)
+                if not bucket:
+                    del band[value]
+
+# Buang blok yang berulang di banyak halaman dari host yang sama. Frekuensi blok dihitung per
+# halaman (URL) unik, sehingga halaman yang dimuat ulang tidak menambah hitungan.
+# Halaman yang diproses sebelum sebuah blok mencapai min_pages masih berisi blok itu; URL-nya
+# dicatat dan diambil dengan pop_stale() agar halaman tersebut di-strip ulang (lihat UrlCache.restrip).
+# Memori dibatasi: max_hosts host terakhir dan max_pages halaman terakhir per host. Halaman yang
+# dilupakan mengurangi hitungan bloknya; blok boilerplate tetap dianggap boilerplate selama masih
+# ada halaman tersimpan yang memuatnya.
+class BoilerplateFilter:
+    def __init__(self, min_pages=BOILERPLATE_MIN_PAGES, max_hosts=BOILERPLATE_MAX_HOSTS,
+                 max_pages=BOILERPLATE_MAX_PAGES):
+        self.min_pages = min_pages
+        self.max_hosts = max_hosts
+        self.max_pages = max_pages
+        self._hosts = OrderedDict()
+        self._stale = set()
+        self._lock = threading.Lock()
+        self.stripped_blocks = 0
+
+    def _host(self, url):
+        host = urlparse(url).netloc
+        entry = self._hosts.get(host)
+        if entry is None:
+            # pages: URL -> key blok halaman itu (urutan LRU), block_pages: halaman yang memuat blok
+            # yang belum mencapai min_pages, boilerplate: blok yang sudah mencapai min_pages
+            entry = self._hosts[host] = {'pages': OrderedDict(), 'blocks': Counter(), 'block_pages': {},
+                                         'boilerplate': set()}
+            while len(self._hosts) > self.max_hosts:
+                self._hosts.popitem(last=False)
+        self._hosts.move_to_end(host)
+        return entry
+
+    def strip(self, documents):
+        result = []
+        for document in documents:
+            blocks = [block for block in document.page_content.split('\n\n') if block.strip()]
+            keys = [text_key(block) for block in blocks]
+            with self._lock:
+                entry = self._host(document.metadata.get('source', ''))
+                url = document.metadata.get('source')
+                if url not in entry['pages']:
+                    entry['pages'][url] = frozenset(keys)
+                    for key in entry['pages'][url]:
+                        entry['blocks'][key] += 1
+                        if key in entry['boilerplate']:
+                            continue
+                        if entry['blocks'][key] < self.min_pages:
+                            entry['block_pages'].setdefault(key, set()).add(url)
+                        else:
+                            # blok baru saja menjadi boilerplate: halaman sebelumnya perlu di-strip ulang
+                            entry['boilerplate'].add(key)
+                            self._stale |= entry['block_pages'].pop(key, set())
+                    while len(entry['pages']) > self.max_pages:
+                        self._forget(entry, *entry['pages'].popitem(last=False))
+                else:
+                    entry['pages'].move_to_end(url)
+                keep = [block for block, key in zip(blocks, keys) if key not in entry['boilerplate']]
+                self.stripped_blocks += len(blocks) - len(keep)
+            result.append(Document(page_content='\n\n'.join(keep), metadata=document.metadata))
+        return result
+
+    # halaman terlama dikeluarkan dari hitungan, blok yang tidak dimuat halaman lain ikut dihapus
+    def _forget(self, entry, url, keys):
+        for key in keys:
+            entry['blocks'][key] -= 1
+            pages = entry['block_pages'].get(key)
+            if pages is not None:
+                pages.discard(url)
+            if entry['blocks'][key] <= 0:
+                del entry['blocks'][key]
+                entry['block_pages'].pop(key, None)
+                entry['boilerplate'].discard(key)
+
+    # URL halaman yang diproses sebelum salah satu bloknya dikenali sebagai boilerplate
+    def pop_stale(self):
+        with self._lock:
+            stale, self._stale = self._stale, set()
+        return stale
+
+# Dedup chunk sebelum embeddings:
+# - unique(): chunk yang sama persis atau hampir sama (SimHash) dalam satu halaman dibuang, chunk
+#   yang tersisa diberi metadata 'chunk_key' (key chunk kanonik jika pernah di-embed dari halaman lain)
+# - embed(): embeddings chunk yang sama/hampir sama dengan chunk sebelumnya dipakai ulang, hanya
+#   chunk baru yang dikirim ke model embeddings
+class ChunkDeduplicator:
+    def __init__(self, embed, max_distance=DEDUP_MAX_DISTANCE, max_entries=DEDUP_MAX_ENTRIES):
+        self._embed = embed
+        self.max_entries = max_entries
+        self._index = SimHashIndex(max_distance)
+        self._vectors = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = {'chunks': 0, 'exact_duplicates': 0, 'near_duplicates': 0, 'embedded': 0, 'reused': 0}
+
+    def _canonical(self, key, signature):
+        # key chunk yang embeddings-nya sudah ada (persis atau hampir sama), None jika belum ada
+        if key in self._vectors:
+            return key
+        return self._index.find(signature)
+
+    def unique(self, chunks):
+        seen = SimHashIndex(self._index.max_distance)
+        keys = set()
+        result = []
+        for chunk in chunks:
+            key = text_key(chunk.page_content)
+            signature = simhash(chunk.page_content)
+            if key in keys:
+                self._count('exact_duplicates')
+                continue
+            if seen.find(signature) is not None:
+                self._count('near_duplicates')
+                continue
+            keys.add(key)
+            seen.add(signature, key)
+            with self._lock:
+                canonical = self._canonical(key, signature)
+            chunk.metadata['chunk_key'] = canonical or key
+            result.append(chunk)
+        return result
+
+    def embed(self, texts):
+        entries = [(text_key(text), simhash(text)) for text in texts]
+        vectors = [None] * len(texts)
+        missing = []
+        with self._lock:
+            self._stats['chunks'] += len(texts)
+            for i, (key, signature) in enumerate(entries):
+                canonical = self._canonical(key, signature)
+                if canonical is not None:
+                    vectors[i] = self._vectors[canonical][1]
+                    self._vectors.move_to_end(canonical)
+                    self._stats['reused'] += 1
+                else:
+                    missing.append(i)
+        if missing:
+            embedded = self._embed([texts[i] for i in missing])
+            with self._lock:
+                self._stats['embedded'] += len(missing)
+                for i, vector in zip(missing, embedded):
+                    vectors[i] = np.asarray(vector, dtype='float32')
+                    self._put(*entries[i], vectors[i])
+        return vectors
+
+    def _put(self, key, signature, vector):
+        if key in self._vectors:
+            return
+        self._vectors[key] = (signature, vector)
+        self._index.add(signature, key)
+        while len(self._vectors) > self.max_entries:
+            _, (old_signature, _) = self._vectors.popitem(last=False)
+            self._index.remove(old_signature)
+
+    def _count(self, name):
+        with self._lock:
+            self._stats[name] += 1
+
+    def stats(self):
+        with self._lock:
+            return {
+                **self._stats,
+                # duplikat yang dibuang ditambah embeddings yang dipakai ulang = panggilan embeddings yang dihemat
+                'embeddings_saved': self._stats['exact_duplicates'] + self._stats['near_duplicates'] + self._stats['reused'],
+                'cached_vectors': len(self._vectors),
+            }
@@ -2,10 +2,14 @@ import streamlit as st
 
 from langchain_community.document_loaders import SeleniumURLLoader
 from langchain_text_splitters import RecursiveCharacterTextSplitter
-from langchain_core.vectorstores import InMemoryVectorStore
 from langchain_ollama import OllamaEmbeddings
 from langchain_core.prompts import ChatPromptTemplate
 from langchain_ollama.llms import OllamaLLM
+from vector_index import VectorIndex
+from url_cache import UrlCache
+from crawler import SiteCrawler, BrowserPool
+from dedup import BoilerplateFilter, ChunkDeduplicator
+from context_builder import build_context, CONTEXT_CANDIDATES
 
 template = """
 You are an assistant for question-answering tasks. Use the following pieces of retrieved context to answer the question. If you don't know the answer, just say that you don't know. Use three sentences maximum and keep the answer concise.
@@ -22,7 +26,7 @@ if "messages" not in st.session_state:
 
 if "vector_store" not in st.session_state:
     embeddings = OllamaEmbeddings(model=embeddings_model_name)
-    st.session_state.vector_store = InMemoryVectorStore(embeddings)
+    st.session_state.vector_store = VectorIndex(embeddings)
 
 if "documents_loaded" not in st.session_state:
     st.session_state.documents_loaded = False
@@ -45,11 +49,56 @@ def split_text(documents):
     data = text_splitter.split_documents(documents)
     return data
 
-def index_docs(documents):
-    st.session_state.vector_store.add_documents(documents)
+# boilerplate antar halaman dibuang sebelum split, dipakai bersama semua session Streamlit di proses ini
+@st.cache_resource
+def get_boilerplate_filter():
+    return BoilerplateFilter()
+
+# cache crawl + embeddings per URL, dipakai bersama semua session Streamlit di proses ini
+@st.cache_resource
+def get_url_cache():
+    embeddings = OllamaEmbeddings(model=embeddings_model_name)
+    # chunk duplikat tidak di-embed ulang sebelum masuk cache
+    boilerplate = get_boilerplate_filter()
+    chunk_dedup = ChunkDeduplicator(embeddings.embed_documents)
+    return UrlCache(
+        load=load_page,
+        split=lambda documents: chunk_dedup.unique(split_text(boilerplate.strip(documents))),
+        embed=chunk_dedup.embed
+    )
+
+# halaman yang dimuat sebelum bloknya dikenali sebagai boilerplate di-split ulang dan diganti di vector store
+def restrip_boilerplate():
+    replaced = get_url_cache().restrip(get_boilerplate_filter().pop_stale())
+    for old_page, new_page in replaced:
+        st.session_state.vector_store.replace_page(old_page, new_page)
+    return len(replaced)
+
+def index_page(url):
+    page, _ = get_url_cache().get(url)
+    count = st.session_state.vector_store.add_page(page)
+    restrip_boilerplate()
+    return count
+
+# browser headless untuk halaman JavaScript, dipakai ulang oleh semua crawl di proses ini
+@st.cache_resource
+def get_browser_pool():
+    return BrowserPool()
+
+def crawl_site(url):
+    url_cache = get_url_cache()
+    vector_store = st.session_state.vector_store
+
+    def process(page_url, documents, **fetched):
+        page, status = url_cache.put(page_url, documents, **fetched)
+        return vector_store.add_page(page), status
+
+    stats = SiteCrawler(process, browsers=get_browser_pool()).run(url)
+    stats['restripped'] = restrip_boilerplate()
+    return stats
 
 def retrieve_docs(query):
-    return st.session_state.vector_store.similarity_search(query)
+    return st.session_state.vector_store.similarity_search_with_score(query, k=CONTEXT_CANDIDATES)
 
 def answer_question(question, context):
     prompt = ChatPromptTemplate.from_template(template)
@@ -60,15 +109,19 @@ st.title("AI Crawler")
 
 # URL input dan load documents
 url = st.text_input("Enter URL:")
+crawl = st.checkbox("Also crawl linked pages on the same site")
 
 if url and not st.session_state.documents_loaded:
     with st.spinner("Loading and processing documents..."):
         try:
-            documents = load_page(url)
-            chunked_documents = split_text(documents)
-            index_docs(chunked_documents)
-            st.session_state.documents_loaded = True
-            st.success("Documents loaded successfully!")
+            if crawl:
+                stats = crawl_site(url)
+                st.session_state.documents_loaded = stats['pages'] > 0
+                st.success(f"Crawled {stats['pages']} pages into {stats['chunks']} document chunks")
+            else:
+                index_page(url)
+                st.session_state.documents_loaded = True
+                st.success("Documents loaded successfully!")
         except Exception as e:
             st.error(f"Error loading documents: {str(e)}")
 
@@ -85,7 +138,7 @@ with col2:
         st.session_state.messages = []
         # Reset vector store
         embeddings = OllamaEmbeddings(model=embeddings_model_name)
-        st.session_state.vector_store = InMemoryVectorStore(embeddings)
+        st.session_state.vector_store = VectorIndex(embeddings)
         st.rerun()
 
 # Display chat history
@@ -109,7 +162,8 @@ if question and st.session_state.documents_loaded:
         with st.spinner("Thinking..."):
             try:
                 retrieve_documents = retrieve_docs(question)
-                context = "\n\n".join([doc.page_content for doc in retrieve_documents])
+                # Rerank dan batasi konteks sesuai budget token prompt
+                context, _ = build_context(question, retrieve_documents)
                 answer = answer_question(question, context)
                 st.write(answer)
                 
@@ -0,0 +1,161 @@
+import hashlib
+import os
+import shutil
+import threading
+import time
+import uuid
+from collections import OrderedDict
+
+SESSION_MAX_STORES = int(os.getenv('SESSION_MAX_STORES', '100'))
+SESSION_IDLE_TTL = int(os.getenv('SESSION_IDLE_TTL', '3600'))
+SESSION_MEMORY_BUDGET = int(os.getenv('SESSION_MEMORY_BUDGET_MB', '512')) * 1024 * 1024
+# folder untuk menyimpan store yang jarang dipakai ke disk, kosong berarti store langsung dibuang
+SESSION_SPILL_DIR = os.getenv('SESSION_SPILL_DIR') or None
+
+# Store per session dengan eviction LRU, TTL idle, dan batas memori global.
+# Store yang melewati batas dipindah ke disk (jika spill_dir diisi) dan dimuat lagi saat diakses.
+# Penulisan ke disk dilakukan setelah lock dilepas agar session lain tidak ikut menunggu; selama
+# ditulis store tetap bisa diambil kembali dari memori.
+# Store harus punya nbytes() dan save(folder); loader(folder) memuatnya kembali.
+class SessionStore:
+    def __init__(self, factory, loader, max_stores=SESSION_MAX_STORES, idle_ttl=SESSION_IDLE_TTL,
+                 memory_budget=SESSION_MEMORY_BUDGET, spill_dir=SESSION_SPILL_DIR):
+        self.factory = factory
+        self.loader = loader
+        self.max_stores = max_stores
+        self.idle_ttl = idle_ttl
+        self.memory_budget = memory_budget
+        self.spill_dir = spill_dir
+        self._resident = OrderedDict()
+        self._spilled = {}
+        self._spilling = {}
+        self._lock = threading.Lock()
+        self._stats = {'created': 0, 'expired': 0, 'evicted': 0, 'spilled': 0, 'reloaded': 0}
+
+    def _path(self, session_id):
+        # nama folder dari hash agar session ID tidak pernah dipakai langsung sebagai path, ditambah
+        # akhiran acak agar dua penulisan untuk session yang sama tidak memakai folder yang sama
+        name = hashlib.sha256(session_id.encode('utf-8')).hexdigest()[:32]
+        return os.path.join(self.spill_dir, f'{name}-{uuid.uuid4().hex[:8]}')
+
+    def _resident_bytes(self):
+        return sum(entry['nbytes'] for entry in self._resident.values())
+
+    def _drop_spilled(self, session_id):
+        entry = self._spilled.pop(session_id, None)
+        if entry is not None:
+            shutil.rmtree(entry['path'], ignore_errors=True)
+
+    # dipanggil dengan self._lock; mengembalikan store yang harus ditulis ke disk oleh _spill
+    def _evict(self, now, keep=None):
+        pending = []
+        for session_id in [sid for sid, entry in self._resident.items() if now - entry['last_used'] > self.idle_ttl]:
+            del self._resident[session_id]
+            self._stats['expired'] += 1
+        for session_id in [sid for sid, entry in self._spilled.items() if now - entry['last_used'] > self.idle_ttl]:
+            self._drop_spilled(session_id)
+            self._stats['expired'] += 1
+
+        while self._resident and (len(self._resident) > self.max_stores or self._resident_bytes() > self.memory_budget):
+            session_id = next(iter(self._resident))
+            if session_id == keep:
+                # store yang sedang dipakai tidak di-evict, walaupun sendirian sudah melewati batas
+                if len(self._resident) == 1:
+                    break
+                self._resident.move_to_end(session_id)
+                continue
+            entry = self._resident.pop(session_id)
+            if self.spill_dir:
+                self._spilling[session_id] = entry
+                pending.append((session_id, entry))
+            else:
+                self._stats['evicted'] += 1
+        return pending
+
+    # tulis store hasil _evict ke disk tanpa memegang self._lock; baru dicatat di _spilled setelah
+    # selesai ditulis, kecuali session sudah diambil kembali atau dihapus selama penulisan
+    def _spill(self, pending):
+        for session_id, entry in pending:
+            path = self._path(session_id)
+            try:
+                entry['store'].save(path)
+                saved = True
+            except OSError:
+                # disk penuh/tidak bisa ditulis: store dibuang seperti tanpa spill_dir
+                saved = False
+            with self._lock:
+                if self._spilling.get(session_id) is entry:
+                    del self._spilling[session_id]
+                    if saved:
+                        self._drop_spilled(session_id)
+                        self._spilled[session_id] = {'last_used': entry['last_used'], 'nbytes': entry['nbytes'], 'path': path}
+                        self._stats['spilled'] += 1
+                        path = None
+                    else:
+                        self._stats['evicted'] += 1
+            if path is not None:
+                shutil.rmtree(path, ignore_errors=True)
+
+    def get(self, session_id, create=False):
+        now = time.time()
+        with self._lock:
+            pending = self._evict(now, keep=session_id)
+            entry = self._resident.get(session_id)
+            if entry is None and session_id in self._spilling:
+                # masih ditulis ke disk: store di memori langsung dipakai lagi
+                entry = self._spilling.pop(session_id)
+                self._resident[session_id] = entry
+            elif entry is None and session_id in self._spilled:
+                spilled = self._spilled[session_id]
+                entry = {'store': self.loader(spilled['path']), 'nbytes': spilled['nbytes']}
+                self._drop_spilled(session_id)
+                self._resident[session_id] = entry
+                self._stats['reloaded'] += 1
+            elif entry is None and create:
+                entry = {'store': self.factory(), 'nbytes': 0}
+                self._resident[session_id] = entry
+                self._stats['created'] += 1
+            if entry is not None:
+                entry['last_used'] = now
+                self._resident.move_to_end(session_id)
+                pending += self._evict(now, keep=session_id)
+        self._spill(pending)
+        return entry['store'] if entry is not None else None
+
+    # apakah store session masih ada (di memori atau di disk), tanpa memuatnya dari disk
+    def has(self, session_id):
+        with self._lock:
+            pending = self._evict(time.time(), keep=session_id)
+            found = session_id in self._resident or session_id in self._spilling or session_id in self._spilled
+        self._spill(pending)
+        return found
+
+    # dipanggil setelah dokumen ditambahkan agar ukuran store dihitung ulang terhadap batas memori
+    def updated(self, session_id):
+        pending = []
+        with self._lock:
+            entry = self._resident.get(session_id)
+            if entry is not None:
+                entry['nbytes'] = entry['store'].nbytes()
+                pending = self._evict(time.time(), keep=session_id)
+        self._spill(pending)
+
+    def delete(self, session_id):
+        with self._lock:
+            self._resident.pop(session_id, None)
+            self._spilling.pop(session_id, None)
+            self._drop_spilled(session_id)
+
+    def stats(self):
+        with self._lock:
+            return {
+                **self._stats,
+                'resident_stores': len(self._resident),
+                'resident_bytes': self._resident_bytes(),
+                'spilling_stores': len(self._spilling),
+                'spilled_stores': len(self._spilled),
+                'spilled_bytes': sum(entry['nbytes'] for entry in self._spilled.values()),
+                'memory_budget_bytes': self.memory_budget,
+                'max_stores': self.max_stores,
+                'idle_ttl': self.idle_ttl,
+            }
@@ -0,0 +1,133 @@
+import asyncio
+import threading
+import unittest
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from crawler import SiteCrawler, BrowserPool, parse_html, normalize_url
+
+# Regression test: satu link yang tidak valid tidak boleh mematikan worker crawl, redirect ke situs
+# lain tidak diindeks, dan browser yang gagal tidak dipakai lagi
+#   python -m unittest test_crawler
+
+BAD_LINK = 'http://[::1/x'
+
+PAGES = {
+    '/': '<a href="/a">a</a><a href="/keluar">keluar</a><a href="%s">rusak</a><p>%s</p>' % (BAD_LINK, 'halaman utama ' * 30),
+    '/a': '<a href="/">kembali</a><p>%s</p>' % ('halaman a ' * 30),
+}
+
+class Handler(BaseHTTPRequestHandler):
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        if self.path == '/keluar':
+            # host lain untuk server yang sama
+            self.send_response(302)
+            self.send_header('Location', f'http://localhost:{self.server.server_address[1]}/a')
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+            return
+        page = PAGES.get(self.path)
+        if page is None:
+            self.send_response(404)
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+            return
+        body = f'<html><body>{page}</body></html>'.encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/html')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+class CrawlerTest(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        threading.Thread(target=cls.server.serve_forever, daemon=True).start()
+        cls.base_url = f'http://127.0.0.1:{cls.server.server_address[1]}'
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+
+    def crawl(self, crawler=None):
+        crawler = crawler or SiteCrawler(lambda url, documents, **meta: (1, 'miss'), concurrency=2, rate=0)
+        # tanpa perbaikan, worker yang mati membuat frontier.join() menunggu selamanya
+        return asyncio.run(asyncio.wait_for(crawler.crawl(self.base_url + '/'), 10))
+
+    def test_invalid_links_are_skipped(self):
+        _, _, links, _ = parse_html(PAGES['/'], self.base_url + '/')
+        self.assertEqual(links, [self.base_url + '/a', self.base_url + '/keluar'])
+        self.assertIsNone(normalize_url(BAD_LINK))
+
+    def test_invalid_base_falls_back_to_page_url(self):
+        # link digabung dengan URL halaman itu sendiri jika <base> tidak valid
+        _, _, links, _ = parse_html('<base href="%s"><a href="/a">a</a>' % BAD_LINK, self.base_url + '/b')
+        self.assertEqual(links, [self.base_url + '/a'])
+
+    def test_crawl_finishes_with_invalid_link(self):
+        stats = self.crawl()
+        self.assertEqual(stats['pages'], 2)
+
+    def test_redirect_to_other_site_is_not_indexed(self):
+        indexed = []
+        crawler = SiteCrawler(lambda url, documents, **meta: indexed.append(url) or (1, 'miss'), concurrency=2, rate=0)
+        stats = self.crawl(crawler)
+        self.assertEqual(stats['offsite'], 1)
+        self.assertEqual(sorted(indexed), [self.base_url + '/', self.base_url + '/a'])
+
+    def test_worker_error_is_counted(self):
+        # error selain httpx.HTTPError dicatat dan crawl tetap selesai
+        crawler = SiteCrawler(lambda url, documents, **meta: (1, 'miss'), concurrency=2, rate=0)
+
+        async def broken_fetch(client, limiter, url, stats):
+            raise ValueError('Invalid IPv6 URL')
+
+        crawler._fetch = broken_fetch
+        stats = self.crawl(crawler)
+        self.assertEqual(stats['pages'], 0)
+        self.assertEqual(stats['errors'], 1)
+
+class FakeDriver:
+    def __init__(self, fail):
+        self.fail = fail
+        self.closed = False
+        self.current_url = None
+        self.page_source = '<p>render</p>'
+
+    def get(self, url):
+        if self.fail:
+            raise TimeoutError('page load timeout')
+        self.current_url = url
+
+    def quit(self):
+        self.closed = True
+
+class FakeBrowserPool(BrowserPool):
+    def __init__(self, fail_first):
+        super().__init__(size=1)
+        self.created = []
+        self.fail_first = fail_first
+
+    def _create(self):
+        driver = FakeDriver(fail=self.fail_first and not self.created)
+        self.created.append(driver)
+        return driver
+
+class BrowserPoolTest(unittest.TestCase):
+    def test_failed_driver_is_replaced(self):
+        pool = FakeBrowserPool(fail_first=True)
+        with self.assertRaises(TimeoutError):
+            pool.page_source('http://example.com/')
+        self.assertTrue(pool.created[0].closed)
+        self.assertEqual(pool.page_source('http://example.com/'), ('http://example.com/', '<p>render</p>'))
+        self.assertEqual(len(pool.created), 2)
+        # browser yang sehat dipakai ulang
+        pool.page_source('http://example.com/b')
+        self.assertEqual(len(pool.created), 2)
+        pool.close()
+
+if __name__ == '__main__':
+    unittest.main()
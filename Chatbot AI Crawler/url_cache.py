@@ -0,0 +1,188 @@
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+import httpx
+import numpy as np
+from vector_index import normalize
+
+URL_CACHE_TTL = int(os.getenv('URL_CACHE_TTL', '3600'))
+URL_CACHE_MAX_ENTRIES = int(os.getenv('URL_CACHE_MAX_ENTRIES', '200'))
+REVALIDATE_TIMEOUT = float(os.getenv('URL_CACHE_REVALIDATE_TIMEOUT', '10'))
+
+def sha256(data):
+    if isinstance(data, str):
+        data = data.encode('utf-8')
+    return hashlib.sha256(data).hexdigest()
+
+# Hasil crawl satu URL: teks, chunk (dengan start_index) dan embeddings chunk (ternormalisasi).
+# Matriks vektor read-only karena dipakai bersama oleh semua session.
+class CachedPage:
+    def __init__(self, url, documents, chunks, vectors, text_hash, body_hash=None, etag=None, last_modified=None):
+        self.url = url
+        self.documents = documents
+        self.chunks = chunks
+        self.vectors = vectors
+        self.vectors.setflags(write=False)
+        self.text_hash = text_hash
+        self.body_hash = body_hash
+        self.etag = etag
+        self.last_modified = last_modified
+        self.validated_at = time.time()
+
+    @property
+    def key(self):
+        return sha256(f'{self.url}\0{self.text_hash}')[:16]
+
+    def nbytes(self):
+        return self.vectors.nbytes + sum(len(chunk.page_content) for chunk in self.chunks)
+
+# Cache crawl + embed per URL yang dipakai bersama semua session:
+# - dalam TTL halaman langsung dipakai tanpa request apa pun
+# - URL baru langsung dimuat (Selenium) tanpa request tambahan
+# - setelah TTL, halaman divalidasi ulang dengan GET (conditional dengan ETag/Last-Modified jika sudah
+#   diketahui); 304 atau isi HTML yang sama berarti Selenium tidak perlu dijalankan lagi
+# - jika halaman dimuat ulang tapi teks hasil ekstraksinya sama, embeddings lama tetap dipakai
+# Request bersamaan untuk URL yang sama menunggu satu proses load saja.
+class UrlCache:
+    def __init__(self, load, split, embed, ttl=URL_CACHE_TTL, max_entries=URL_CACHE_MAX_ENTRIES):
+        self.load = load
+        self.split = split
+        self.embed = embed
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._pages = OrderedDict()
+        self._url_locks = {}
+        self._lock = threading.Lock()
+        self._client = httpx.Client(timeout=REVALIDATE_TIMEOUT, follow_redirects=True)
+        self._stats = {'hit': 0, 'revalidated': 0, 'unchanged': 0, 'reembedded': 0, 'miss': 0, 'embedded_chunks': 0}
+
+    # lock per URL hanya ada selama dipakai: dihapus oleh pemakai terakhir, bukan saat halaman di-evict,
+    # sehingga request yang sedang memuat dan yang menunggu selalu memegang lock yang sama
+    @contextmanager
+    def _url_lock(self, url):
+        with self._lock:
+            entry = self._url_locks.setdefault(url, [threading.Lock(), 0])
+            entry[1] += 1
+        try:
+            with entry[0]:
+                yield
+        finally:
+            with self._lock:
+                entry[1] -= 1
+                if not entry[1]:
+                    del self._url_locks[url]
+
+    def _fetch(self, url, page):
+        # GET validasi ulang (conditional jika validator halaman diketahui), mengembalikan
+        # (status, body_hash, etag, last_modified) atau None jika gagal
+        headers = {}
+        if page.etag:
+            headers['If-None-Match'] = page.etag
+        if page.last_modified:
+            headers['If-Modified-Since'] = page.last_modified
+        try:
+            response = self._client.get(url, headers=headers)
+        except httpx.HTTPError:
+            return None
+        if response.status_code == 304:
+            return 304, page.body_hash, page.etag, page.last_modified
+        if response.status_code != 200:
+            return None
+        return 200, sha256(response.content), response.headers.get('etag'), response.headers.get('last-modified')
+
+    def _count(self, name):
+        with self._lock:
+            self._stats[name] += 1
+
+    def _store(self, page):
+        with self._lock:
+            self._pages[page.url] = page
+            self._pages.move_to_end(page.url)
+            while len(self._pages) > self.max_entries:
+                self._pages.popitem(last=False)
+
+    # mengembalikan (CachedPage, status) dengan status 'hit', 'revalidated', 'unchanged', 'reembedded' atau 'miss'
+    def get(self, url):
+        with self._url_lock(url):
+            with self._lock:
+                page = self._pages.get(url)
+                if page is not None:
+                    self._pages.move_to_end(url)
+
+            if page is not None and time.time() - page.validated_at <= self.ttl:
+                self._count('hit')
+                return page, 'hit'
+
+            # URL baru: satu kali load saja; validator HTTP dicatat saat validasi ulang pertama
+            fetched = self._fetch(url, page) if page is not None else None
+            if fetched is not None and fetched[1] == page.body_hash:
+                page.etag, page.last_modified = fetched[2], fetched[3]
+                page.validated_at = time.time()
+                status = 'revalidated' if fetched[0] == 304 else 'unchanged'
+                self._count(status)
+                return page, status
+
+            documents = self.load(url)
+            body_hash, etag, last_modified = fetched[1:] if fetched else (None, None, None)
+            return self._index(url, page, documents, body_hash, etag, last_modified)
+
+    def _index(self, url, page, documents, body_hash, etag, last_modified, reuse=True):
+        text_hash = sha256('\0'.join(document.page_content for document in documents))
+        if reuse and page is not None and text_hash == page.text_hash:
+            # HTML berubah tapi teksnya sama (mis. token atau iklan), chunk dan embeddings dipakai ulang
+            new_page = CachedPage(url, documents, page.chunks, page.vectors, text_hash, body_hash, etag, last_modified)
+            status = 'unchanged'
+        else:
+            chunks = self.split(documents)
+            if chunks:
+                vectors = normalize(self.embed([chunk.page_content for chunk in chunks]))
+            else:
+                vectors = np.empty((0, 0), dtype='float32')
+            new_page = CachedPage(url, documents, chunks, vectors, text_hash, body_hash, etag, last_modified)
+            status = 'reembedded' if page is not None else 'miss'
+            with self._lock:
+                self._stats['embedded_chunks'] += len(chunks)
+        self._count(status)
+        self._store(new_page)
+        return new_page, status
+
+    # halaman yang sudah diambil di luar cache (mis. oleh crawler.py); embeddings dipakai ulang jika
+    # HTML atau teksnya sama dengan versi yang tersimpan
+    def put(self, url, documents, body_hash=None, etag=None, last_modified=None):
+        with self._url_lock(url):
+            with self._lock:
+                page = self._pages.get(url)
+            if page is not None and body_hash is not None and body_hash == page.body_hash:
+                page.etag, page.last_modified = etag, last_modified
+                page.validated_at = time.time()
+                self._count('unchanged')
+                return page, 'unchanged'
+            return self._index(url, page, documents, body_hash, etag, last_modified)
+
+    # split dan embeddings ulang halaman tersimpan dari dokumen aslinya, untuk halaman yang hasil
+    # split-nya berubah walaupun teksnya sama (boilerplate yang baru dikenali setelah halaman diproses);
+    # mengembalikan pasangan (halaman lama, halaman baru) untuk diganti di vector store session
+    def restrip(self, urls):
+        replaced = []
+        for url in urls:
+            with self._url_lock(url):
+                with self._lock:
+                    page = self._pages.get(url)
+                if page is None:
+                    continue
+                new_page, _ = self._index(url, page, page.documents, page.body_hash, page.etag,
+                                          page.last_modified, reuse=False)
+                replaced.append((page, new_page))
+        return replaced
+
+    def stats(self):
+        with self._lock:
+            return {
+                **self._stats,
+                'pages': len(self._pages),
+                'bytes': sum(page.nbytes() for page in self._pages.values()),
+                'ttl': self.ttl,
+            }
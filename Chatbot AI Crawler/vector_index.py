@@ -0,0 +1,277 @@
+import json
+import math
+import os
+import re
+import threading
+from collections import Counter
+import numpy as np
+import faiss
+from langchain_core.documents import Document
+
+RETRIEVER_K = int(os.getenv('RETRIEVER_K', '4'))
+# skor cosine minimal agar chunk dipakai sebagai konteks, 0 berarti tanpa batas
+RETRIEVER_SCORE_THRESHOLD = float(os.getenv('RETRIEVER_SCORE_THRESHOLD', '0'))
+# gabungkan hasil vektor dengan pencarian kata kunci BM25 (reciprocal rank fusion)
+RETRIEVER_HYBRID = os.getenv('RETRIEVER_HYBRID', '0') == '1'
+# di atas jumlah chunk ini pencarian memakai index FAISS HNSW, di bawahnya satu matmul (exact)
+ANN_MIN_VECTORS = int(os.getenv('RETRIEVER_ANN_MIN_VECTORS', '50000'))
+RRF_K = 60
+
+def normalize(vectors):
+    vectors = np.asarray(vectors, dtype='float32')
+    if vectors.ndim == 1:
+        norm = np.linalg.norm(vectors)
+        return vectors / norm if norm else vectors
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return vectors / norms
+
+def tokenize(text):
+    return re.findall(r'\w+', text.lower())
+
+def top_k(scores, k):
+    if k < len(scores):
+        ids = np.argpartition(-scores, k - 1)[:k]
+    else:
+        ids = np.arange(len(scores))
+    return ids[np.argsort(-scores[ids], kind='stable')]
+
+# BM25 dengan inverted index: tiap term menyimpan id dokumen dan frekuensinya sebagai array numpy
+class BM25:
+    def __init__(self, texts, k1=1.5, b=0.75):
+        self.size = len(texts)
+        self.k1 = k1
+        postings = {}
+        lengths = np.zeros(len(texts), dtype='float32')
+        for doc_id, text in enumerate(texts):
+            counts = Counter(tokenize(text))
+            lengths[doc_id] = sum(counts.values())
+            for term, count in counts.items():
+                postings.setdefault(term, ([], []))
+                postings[term][0].append(doc_id)
+                postings[term][1].append(count)
+        self.postings = {
+            term: (np.array(ids, dtype='int64'), np.array(counts, dtype='float32'))
+            for term, (ids, counts) in postings.items()
+        }
+        self.norm = k1 * (1 - b + b * lengths / max(float(lengths.mean()) if len(texts) else 0.0, 1.0))
+
+    def scores(self, query):
+        scores = np.zeros(self.size, dtype='float32')
+        for term in set(tokenize(query)):
+            if term not in self.postings:
+                continue
+            ids, tf = self.postings[term]
+            idf = math.log(1 + (self.size - len(ids) + 0.5) / (len(ids) + 0.5))
+            scores[ids] += idf * tf * (self.k1 + 1) / (tf + self.norm[ids])
+        return scores
+
+# Retriever per session: vektor ternormalisasi dalam matriks float32, pencarian exact dengan satu
+# matmul atau FAISS HNSW untuk crawl besar, opsional hybrid dengan BM25.
+# Halaman dari url_cache ditambahkan sebagai segmen read-only yang dipakai bersama; matriks
+# gabungan baru dibuat (sekali, saat pencarian berikutnya) jika session punya lebih dari satu segmen.
+class VectorIndex:
+    def __init__(self, embedding, k=RETRIEVER_K, score_threshold=RETRIEVER_SCORE_THRESHOLD,
+                 hybrid=RETRIEVER_HYBRID, ann_min_vectors=ANN_MIN_VECTORS):
+        self.embedding = embedding
+        self.k = k
+        self.score_threshold = score_threshold
+        self.hybrid = hybrid
+        self.ann_min_vectors = ann_min_vectors
+        self._segments = []
+        self._keys = set()
+        self._chunk_keys = set()
+        self._lock = threading.Lock()
+        self._ann_thread = None
+        self._invalidate()
+
+    def _invalidate(self):
+        self._matrix = None
+        self._documents = None
+        self._ann = None
+        self._bm25 = None
+
+    def _add_segment(self, vectors, documents, shared, key=None):
+        with self._lock:
+            if key is not None:
+                if key in self._keys:
+                    return 0
+                self._keys.add(key)
+            # chunk dengan 'chunk_key' (dari dedup.py) yang sudah ada di session tidak ditambahkan lagi;
+            # vektor segmen bersama hanya disalin jika memang ada chunk yang dibuang
+            keep = []
+            for i, document in enumerate(documents):
+                chunk_key = document.metadata.get('chunk_key')
+                if chunk_key is None or chunk_key not in self._chunk_keys:
+                    keep.append(i)
+                    if chunk_key is not None:
+                        self._chunk_keys.add(chunk_key)
+            if not keep:
+                return 0
+            if len(keep) < len(documents):
+                vectors = vectors[keep]
+                documents = [documents[i] for i in keep]
+                shared = False
+            self._segments.append({'vectors': vectors, 'documents': list(documents), 'shared': shared, 'key': key})
+            self._invalidate()
+        return len(documents)
+
+    # ganti segmen halaman lama dengan versi baru dari url_cache (lihat UrlCache.restrip); 0 jika
+    # halaman lama tidak ada di index ini
+    def replace_page(self, old_page, new_page):
+        with self._lock:
+            segment = next((segment for segment in self._segments if segment['key'] == old_page.key), None)
+            if segment is None:
+                return 0
+            self._segments.remove(segment)
+            self._keys.discard(old_page.key)
+            self._chunk_keys.difference_update(document.metadata.get('chunk_key') for document in segment['documents'])
+            self._invalidate()
+        return self.add_page(new_page)
+
+    # halaman dari url_cache: vektor sudah ternormalisasi dan hanya direferensikan, tidak disalin
+    def add_page(self, page):
+        return self._add_segment(page.vectors, page.chunks, shared=True, key=page.key)
+
+    def add_documents(self, documents):
+        documents = list(documents)
+        if not documents:
+            return 0
+        return self.add_vectors(self.embedding.embed_documents([document.page_content for document in documents]), documents)
+
+    # dokumen dengan embeddings yang sudah dihitung
+    def add_vectors(self, vectors, documents):
+        return self._add_segment(normalize(vectors), documents, shared=False)
+
+    def __len__(self):
+        return sum(len(segment['documents']) for segment in self._segments)
+
+    # matriks dan dokumen gabungan semua segmen, dipanggil dengan self._lock dipegang
+    def _merged(self):
+        if self._matrix is not None:
+            return self._matrix, self._documents
+        if len(self._segments) == 1:
+            matrix = self._segments[0]['vectors']
+        elif self._segments:
+            matrix = np.concatenate([segment['vectors'] for segment in self._segments])
+        else:
+            matrix = np.empty((0, 0), dtype='float32')
+        return matrix, [document for segment in self._segments for document in segment['documents']]
+
+    def _build(self):
+        with self._lock:
+            if self._matrix is not None:
+                return self._matrix, self._documents
+            self._matrix, self._documents = self._merged()
+            matrix = self._matrix
+            if len(self._documents) >= self.ann_min_vectors:
+                # index HNSW dibangun di background, sampai selesai pencarian tetap exact
+                self._ann_thread = threading.Thread(target=self._build_ann, args=(matrix,), name='hnsw-build', daemon=True)
+                self._ann_thread.start()
+            return self._matrix, self._documents
+
+    def _build_ann(self, matrix):
+        ann = faiss.IndexHNSWFlat(matrix.shape[1], 32, faiss.METRIC_INNER_PRODUCT)
+        ann.add(np.ascontiguousarray(matrix))
+        with self._lock:
+            # abaikan jika dokumen baru ditambahkan selama index dibangun
+            if self._matrix is matrix:
+                self._ann = ann
+
+    def wait_for_ann(self, timeout=None):
+        if self._ann_thread is not None:
+            self._ann_thread.join(timeout)
+        return self._ann is not None
+
+    def _bm25_index(self, documents):
+        with self._lock:
+            if self._bm25 is None:
+                self._bm25 = BM25([document.page_content for document in documents])
+            return self._bm25
+
+    def _vector_search(self, matrix, query_vector, k):
+        ann = self._ann
+        if ann is not None:
+            ann.hnsw.efSearch = max(64, k * 2)
+            scores, ids = ann.search(query_vector.reshape(1, -1), k)
+            keep = ids[0] >= 0
+            return ids[0][keep], scores[0][keep]
+        scores = matrix @ query_vector
+        ids = top_k(scores, k)
+        return ids, scores[ids]
+
+    # list (Document, skor); skor adalah cosine, atau skor RRF jika hybrid
+    def similarity_search_with_score(self, query, k=None, score_threshold=None, hybrid=None):
+        k = k or self.k
+        score_threshold = self.score_threshold if score_threshold is None else score_threshold
+        hybrid = self.hybrid if hybrid is None else hybrid
+        matrix, documents = self._build()
+        if not documents:
+            return []
+
+        query_vector = normalize(self.embedding.embed_query(query))
+        # ambil kandidat lebih banyak saat hybrid agar fusion punya pilihan
+        candidates = min(len(documents), k * 4 if hybrid else k)
+        ids, scores = self._vector_search(matrix, query_vector, candidates)
+        keep = scores >= score_threshold if score_threshold else np.ones(len(ids), dtype=bool)
+        ids, scores = ids[keep], scores[keep]
+
+        if not hybrid:
+            return [(documents[i], float(score)) for i, score in zip(ids, scores)]
+
+        keyword_scores = self._bm25_index(documents).scores(query)
+        keyword_ids = [i for i in top_k(keyword_scores, candidates) if keyword_scores[i] > 0]
+        fused = Counter()
+        for rank, i in enumerate(ids):
+            fused[int(i)] += 1 / (RRF_K + rank + 1)
+        for rank, i in enumerate(keyword_ids):
+            fused[int(i)] += 1 / (RRF_K + rank + 1)
+        return [(documents[i], score) for i, score in fused.most_common(k)]
+
+    def similarity_search(self, query, k=None, **kwargs):
+        return [document for document, _ in self.similarity_search_with_score(query, k, **kwargs)]
+
+    def nbytes(self):
+        # vektor milik session sendiri ditambah teksnya, plus matriks gabungan yang dibuat pencarian
+        # berikutnya jika ada lebih dari satu segmen (dihitung sebelum dibuat, agar batas memori
+        # SessionStore sudah berlaku saat dokumen ditambahkan); segmen bersama dari url_cache dihitung
+        # di cache tersebut
+        size = sum(
+            segment['vectors'].nbytes + sum(len(document.page_content) for document in segment['documents'])
+            for segment in self._segments if not segment['shared']
+        )
+        if len(self._segments) > 1:
+            size += sum(segment['vectors'].nbytes for segment in self._segments)
+        return size
+
+    # tanpa _build: store yang disimpan ke disk akan dibuang dari memori, jadi index HNSW tidak dibangun.
+    # Key halaman dan jumlah chunk per segmen ikut disimpan agar replace_page tetap bekerja setelah load.
+    def save(self, directory):
+        with self._lock:
+            matrix, documents = self._merged()
+            segments = [{'key': segment['key'], 'size': len(segment['documents'])} for segment in self._segments]
+        os.makedirs(directory, exist_ok=True)
+        np.save(os.path.join(directory, 'vectors.npy'), matrix)
+        with open(os.path.join(directory, 'documents.json'), 'w', encoding='utf-8') as file:
+            json.dump({
+                'segments': segments,
+                'documents': [{'id': document.id, 'text': document.page_content, 'metadata': document.metadata}
+                              for document in documents]
+            }, file)
+
+    @classmethod
+    def load(cls, directory, embedding):
+        index = cls(embedding)
+        # mmap: vektor baru dibaca dari disk saat benar-benar dipakai untuk pencarian
+        vectors = np.load(os.path.join(directory, 'vectors.npy'), mmap_mode='r')
+        with open(os.path.join(directory, 'documents.json'), 'r', encoding='utf-8') as file:
+            data = json.load(file)
+        documents = [Document(id=item['id'], page_content=item['text'], metadata=item['metadata'])
+                     for item in data['documents']]
+        # segmen dipulihkan sebagai potongan (view) dari matriks yang sama, lengkap dengan key halamannya
+        start = 0
+        for segment in data['segments']:
+            stop = start + segment['size']
+            index._add_segment(vectors[start:stop], documents[start:stop], shared=False, key=segment['key'])
+            start = stop
+        return index
@@ -1,15 +1,20 @@
-from flask import Flask, render_template, request, jsonify, send_file
-from langchain_ollama.llms import OllamaLLM
+from flask import Flask, render_template, request, jsonify, send_file, Response, stream_with_context
 from langchain_core.prompts import ChatPromptTemplate
-from io import BytesIO
-from fpdf import FPDF
+from pdf_export import generate_pdf, render_batch_pdf, render_batch_zip, preload_fonts, pdf_cache, MAX_BATCH
 import os
+import sys
 import json
 
+# gateway Ollama dan antrian job dipakai bersama app lain, ada di paket shared/ di root repo
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from shared.llm_gateway import gateway, GatewayBusy
+from shared.job_queue import job_queue, QueueFull, JOB_WEBHOOKS, JOB_SLOT_TIMEOUT
+from shared.llm_flow import Invoke, Stream, StreamTimer, run, events
+
 app = Flask(__name__)
 
-# Inisialisasi model
-llm = OllamaLLM(model='llama3', temperature=0.7)
+# Inisialisasi model lewat gateway (koneksi ke Ollama dipakai ulang, request dibatasi dan diantrikan)
+llm = gateway.llm(model='llama3', temperature=0.7)
 
 # Setup prompt template
 def create_chat_prompt(style, length):
@@ -23,59 +28,172 @@ def create_chat_prompt(style, length):
         ("human", "{user}")
     ])
 
-# Fungsi PDF Generator
-def generate_pdf(text, title="Essay"):
-    pdf = FPDF()
-    pdf.add_page()
-    pdf.set_auto_page_break(auto=True, margin=15)
-    
-    # Title
-    pdf.set_font("Arial", "B", 16)
-    pdf.cell(0, 10, title, ln=True, align="C")
-    pdf.ln(10)
-    
-    # Content
-    pdf.set_font("Arial", size=12)
-    for line in text.split("\n"):
-        if line.strip():
-            pdf.multi_cell(0, 8, line.encode('latin-1', 'replace').decode('latin-1'))
-            pdf.ln(2)
-
-    # Output as bytes
-    pdf_bytes = pdf.output(dest='S').encode('latin-1')
-    buffer = BytesIO(pdf_bytes)
-    buffer.seek(0)
-    return buffer
+# Font PDF dibaca dan di-parse sekali saat start, bukan saat download pertama
+preload_fonts()
+
+def sse(event, data):
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+# Antrian model/job penuh (429) atau terlalu lama menunggu (503), client diminta mencoba lagi
+def busy_response(error):
+    response = jsonify({'error': str(error)})
+    response.headers['Retry-After'] = str(error.retry_after)
+    return response, error.status
 
 @app.route('/')
 def home():
     return render_template('index.html')
 
-@app.route('/generate', methods=['POST'])
-def generate_essay():
+# Logika /generate dan /generate/stream ditulis sekali di bawah ini dan dipakai route Flask di
+# file ini maupun route async di asgi.py (lihat shared/llm_flow.py)
+def parse_essay_request(data):
+    if not isinstance(data, dict):
+        return None, ({'error': 'Body request harus berupa objek JSON'}, 400)
+    user_prompt = data.get('prompt', '')
+    essay_style = data.get('style', 'Akademik')
+    essay_length = data.get('length', 'Menengah (~300 kata)')
+    if not all(isinstance(value, str) for value in (user_prompt, essay_style, essay_length)):
+        return None, ({'error': 'prompt, style dan length harus berupa teks'}, 400)
+    if not user_prompt.strip():
+        return None, ({'error': 'Topik tidak boleh kosong'}, 400)
+    return {
+        'prompt': user_prompt.strip(),
+        'style': essay_style,
+        'length': essay_length
+    }, None
+
+def essay_chain_for(essay):
+    return create_chat_prompt(essay['style'], essay['length']) | llm
+
+def essay_flow(essay):
+    response = yield Invoke(essay_chain_for(essay), {"user": essay['prompt']})
+    return {'success': True, 'essay': response, 'topic': essay['prompt']}, 200
+
+def essay_stream_flow(essay):
+    timer = StreamTimer()
+
+    def on_chunk(chunk):
+        timer.token()
+        return sse('token', {'text': chunk})
+
     try:
-        data = request.get_json()
-        user_prompt = data.get('prompt', '').strip()
-        essay_style = data.get('style', 'Akademik')
-        essay_length = data.get('length', 'Menengah (~300 kata)')
-        
-        if not user_prompt:
-            return jsonify({'error': 'Topik tidak boleh kosong'}), 400
-        
-        # Generate essay
-        chat_prompt = create_chat_prompt(essay_style, essay_length)
-        essay_chain = chat_prompt | llm
-        response = essay_chain.invoke({"user": user_prompt})
-        
-        return jsonify({
+        text = yield Stream(essay_chain_for(essay), {"user": essay['prompt']}, on_chunk)
+        yield sse('done', {
             'success': True,
-            'essay': response,
-            'topic': user_prompt
+            'topic': essay['prompt'],
+            'words': len(text.split()),
+            'first_token_ms': timer.first_token_ms,
+            'total_ms': timer.elapsed_ms()
         })
-        
+    except Exception as e:
+        yield sse('error', {'error': str(e)})
+
+@app.route('/generate', methods=['POST'])
+def generate_essay():
+    essay, error = parse_essay_request(request.get_json(silent=True))
+    if error:
+        return jsonify(error[0]), error[1]
+
+    try:
+        body, status = run(essay_flow(essay))
+        return jsonify(body), status
+    except GatewayBusy as e:
+        return busy_response(e)
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+@app.route('/generate/stream', methods=['POST'])
+def generate_essay_stream():
+    # Body yang bukan JSON dijawab dengan bentuk error JSON yang sama, bukan halaman HTML 400
+    essay, error = parse_essay_request(request.get_json(silent=True))
+    if error:
+        return jsonify(error[0]), error[1]
+
+    # Slot model diambil sebelum response dimulai, sehingga antrian penuh masih dijawab 429/503
+    try:
+        reservation = gateway.reserve()
+    except GatewayBusy as e:
+        return busy_response(e)
+
+    # Client yang memutus koneksi menutup generator sehingga stream ke Ollama ikut berhenti,
+    # slot dilepas saat response ditutup meskipun generator belum sempat berjalan
+    response = Response(
+        stream_with_context(events(essay_stream_flow(essay), reservation)),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+    response.call_on_close(reservation.release)
+    return response
+
+@app.route('/jobs', methods=['POST'])
+def submit_essay_job():
+    data = request.get_json(silent=True)
+    essay, error = parse_essay_request(data)
+    if error:
+        return jsonify(error[0]), error[1]
+
+    webhook = data.get('webhook')
+    if webhook and not (JOB_WEBHOOKS and isinstance(webhook, str) and webhook.startswith(('http://', 'https://'))):
+        return jsonify({'error': 'Webhook tidak diizinkan atau URL tidak valid'}), 400
+
+    essay_chain = essay_chain_for(essay)
+    try:
+        # Job dengan topik, gaya dan panjang yang sama yang masih berjalan dipakai bersama; worker
+        # menunggu slot model dengan batas JOB_SLOT_TIMEOUT, bukan batas request interaktif
+        job, created = job_queue.submit(
+            'essay',
+            essay,
+            lambda: gateway.stream(essay_chain, {"user": essay['prompt']}, queue_timeout=JOB_SLOT_TIMEOUT),
+            meta={'topic': essay['prompt']},
+            webhook=webhook
+        )
+    except QueueFull as e:
+        return busy_response(e)
+
+    return jsonify({
+        **job.to_dict(),
+        'deduplicated': not created,
+        'status_url': f'/jobs/{job.id}',
+        'events_url': f'/jobs/{job.id}/events'
+    }), 202
+
+@app.route('/jobs/<job_id>')
+def get_job(job_id):
+    job = job_queue.get(job_id)
+    if job is None:
+        return jsonify({'error': 'Job tidak ditemukan atau sudah kedaluwarsa'}), 404
+
+    # ?wait=<detik> untuk long-polling sampai job selesai
+    wait = min(request.args.get('wait', 0, type=float), 30)
+    if wait > 0:
+        job.wait(wait)
+    return jsonify(job.to_dict()), 200 if job.done else 202
+
+@app.route('/jobs/<job_id>/events')
+def job_events(job_id):
+    job = job_queue.get(job_id)
+    if job is None:
+        return jsonify({'error': 'Job tidak ditemukan atau sudah kedaluwarsa'}), 404
+
+    def events():
+        for event, data in job.events():
+            yield ': keep-alive\n\n' if event == 'ping' else sse(event, data)
+
+    # Memutus koneksi hanya menghentikan langganan, job tetap berjalan sampai selesai
+    return Response(
+        stream_with_context(events()),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+
+@app.route('/jobs/stats')
+def jobs_stats():
+    return jsonify(job_queue.stats())
+
+@app.route('/llm/stats')
+def llm_stats():
+    return jsonify(gateway.stats())
+
 @app.route('/download-pdf', methods=['POST'])
 def download_pdf():
     try:
@@ -99,5 +217,44 @@ def download_pdf():
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+@app.route('/download-pdf/batch', methods=['POST'])
+def download_pdf_batch():
+    try:
+        data = request.get_json()
+        # essays: [{'essay': ..., 'topic': ...}], format: 'zip' (satu PDF per essay) atau 'pdf' (digabung)
+        essays = [
+            {'essay': item.get('essay', ''), 'title': item.get('topic', 'Essay')}
+            for item in data.get('essays', []) if item.get('essay')
+        ]
+        export_format = data.get('format', 'zip')
+        
+        if not essays:
+            return jsonify({'error': 'Tidak ada konten untuk diunduh'}), 400
+        if len(essays) > MAX_BATCH:
+            return jsonify({'error': f'Maksimal {MAX_BATCH} essay per unduhan'}), 400
+        if export_format not in ('zip', 'pdf'):
+            return jsonify({'error': "format harus 'zip' atau 'pdf'"}), 400
+        
+        if export_format == 'pdf':
+            return send_file(
+                render_batch_pdf(essays),
+                as_attachment=True,
+                download_name=f'essays_{len(essays)}.pdf',
+                mimetype='application/pdf'
+            )
+        return send_file(
+            render_batch_zip(essays),
+            as_attachment=True,
+            download_name=f'essays_{len(essays)}.zip',
+            mimetype='application/zip'
+        )
+        
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/download-pdf/stats')
+def pdf_stats():
+    return jsonify(pdf_cache.stats())
+
 if __name__ == '__main__':
     app.run(debug=True)
\ No newline at end of file
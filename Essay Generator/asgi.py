@@ -0,0 +1,48 @@
+from a2wsgi import WSGIMiddleware
+from starlette.applications import Starlette
+from starlette.responses import JSONResponse
+from starlette.routing import Mount, Route
+# app.py menambahkan root repo ke sys.path, jadi diimpor sebelum paket shared
+from app import app as flask_app, parse_essay_request, essay_flow, essay_stream_flow
+from shared.asgi import ReservedStreamingResponse, busy_response, read_json
+from shared.llm_flow import arun, aevents
+from shared.llm_gateway import gateway, GatewayBusy
+
+# Mode ASGI (opsional): generate essay dijalankan async dengan ainvoke/astream, sehingga ratusan
+# request yang menunggu Ollama cukup dilayani satu worker tanpa satu thread per request.
+# Jumlah generate ke Ollama tetap dibatasi gateway (OLLAMA_MAX_CONCURRENCY/OLLAMA_MAX_QUEUE).
+# Validasi dan isi response sama dengan route Flask (parse_essay_request, essay_flow di app.py),
+# di sini hanya cara menunggunya yang async. Route lain (jobs, PDF) diteruskan ke app Flask.
+#   uvicorn asgi:app --workers 1
+
+async def generate_essay(request):
+    essay, error = parse_essay_request(await read_json(request))
+    if error:
+        return JSONResponse(error[0], status_code=error[1])
+
+    try:
+        body, status = await arun(essay_flow(essay))
+        return JSONResponse(body, status_code=status)
+    except GatewayBusy as e:
+        return busy_response(e)
+    except Exception as e:
+        return JSONResponse({'error': str(e)}, status_code=500)
+
+async def generate_essay_stream(request):
+    essay, error = parse_essay_request(await read_json(request))
+    if error:
+        return JSONResponse(error[0], status_code=error[1])
+
+    try:
+        reservation = await gateway.areserve()
+    except GatewayBusy as e:
+        return busy_response(e)
+
+    # Client yang memutus koneksi membatalkan generator, slot gateway dan stream ke Ollama ikut dilepas
+    return ReservedStreamingResponse(aevents(essay_stream_flow(essay), reservation), reservation)
+
+app = Starlette(routes=[
+    Route('/generate', generate_essay, methods=['POST']),
+    Route('/generate/stream', generate_essay_stream, methods=['POST']),
+    Mount('/', app=WSGIMiddleware(flask_app)),
+])
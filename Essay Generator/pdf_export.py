@@ -0,0 +1,174 @@
+import copy
+import hashlib
+import io
+import os
+import threading
+import zipfile
+from collections import OrderedDict
+from fontTools import ttLib
+from fpdf import FPDF, XPos, YPos
+from fpdf.fonts import SubsetMap
+from werkzeug.utils import secure_filename
+
+# Font Unicode (TTF) agar huruf di luar latin-1 tidak hilang. ESSAY_FONT_PATH/ESSAY_FONT_BOLD_PATH
+# bisa diisi path font sendiri, jika tidak ada font yang ditemukan dipakai Helvetica bawaan FPDF.
+FONT_CANDIDATES = [
+    (os.getenv('ESSAY_FONT_PATH'), os.getenv('ESSAY_FONT_BOLD_PATH')),
+    ('/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf', '/usr/share/fonts/truetype/dejavu/DejaVuSans-Bold.ttf'),
+    ('/usr/share/fonts/TTF/DejaVuSans.ttf', '/usr/share/fonts/TTF/DejaVuSans-Bold.ttf'),
+    ('/Library/Fonts/Arial Unicode.ttf', None),
+    ('C:/Windows/Fonts/arial.ttf', 'C:/Windows/Fonts/arialbd.ttf'),
+]
+FONT_FAMILY = 'essay'
+
+PDF_CACHE_ENTRIES = int(os.getenv('PDF_CACHE_ENTRIES', '256'))
+PDF_CACHE_BYTES = int(os.getenv('PDF_CACHE_BYTES', str(64 * 1024 * 1024)))
+MAX_BATCH = int(os.getenv('PDF_MAX_BATCH', '100'))
+
+_fonts = None
+_fonts_lock = threading.Lock()
+
+# font dibaca dan di-parse sekali per proses: {style: (TTFFont hasil parse, isi file font)},
+# {} jika tidak ada font Unicode
+def preload_fonts():
+    global _fonts
+    with _fonts_lock:
+        if _fonts is None:
+            fonts = {}
+            for regular, bold in FONT_CANDIDATES:
+                if regular and os.path.exists(regular):
+                    bold = bold if bold and os.path.exists(bold) else regular
+                    template = FPDF()
+                    for style, path in (('', regular), ('B', bold)):
+                        template.add_font(FONT_FAMILY, style, path)
+                        with open(path, 'rb') as file:
+                            fonts[style] = (template.fonts[FONT_FAMILY + style], file.read())
+                    break
+            _fonts = fonts
+    return _fonts
+
+# salinan font hasil parse untuk satu dokumen. Metrik (cmap, lebar glyph, descriptor) dipakai bersama,
+# tetapi saat output fpdf2 men-subset ttfont di tempat, jadi tiap dokumen mendapat ttfont sendiri
+# (lazy, dibuka dari bytes di memori) dan SubsetMap sendiri.
+def _attach_font(pdf, style, template, data):
+    font = copy.copy(template)
+    font.i = len(pdf.fonts) + 1
+    font.ttfont = ttLib.TTFont(io.BytesIO(data), recalcTimestamp=False, lazy=True)
+    font.cw = template.cw.copy()
+    font.missing_glyphs = []
+    font.biggest_size_pt = 0
+    font._hbfont = None
+    font.subset = SubsetMap(font)
+    pdf.fonts[FONT_FAMILY + style] = font
+
+def _new_document():
+    pdf = FPDF()
+    pdf.set_auto_page_break(auto=True, margin=15)
+    fonts = preload_fonts()
+    for style, (template, data) in fonts.items():
+        _attach_font(pdf, style, template, data)
+    return pdf, bool(fonts)
+
+def _write_essay(pdf, unicode_font, text, title):
+    family = FONT_FAMILY if unicode_font else 'Helvetica'
+    clean = (lambda value: value) if unicode_font else (lambda value: value.encode('latin-1', 'replace').decode('latin-1'))
+    pdf.add_page()
+
+    # Title
+    pdf.set_font(family, 'B', 16)
+    pdf.cell(0, 10, clean(title), new_x=XPos.LMARGIN, new_y=YPos.NEXT, align='C')
+    pdf.ln(10)
+
+    # Content
+    pdf.set_font(family, '', 12)
+    for line in text.split("\n"):
+        if line.strip():
+            pdf.multi_cell(0, 8, clean(line), new_x=XPos.LMARGIN, new_y=YPos.NEXT)
+            pdf.ln(2)
+
+# PDF ditulis langsung ke stream tujuan (file, BytesIO, entry zip), tanpa string perantara
+def _output(pdf, stream):
+    pdf.output(stream)
+    return stream
+
+# cache LRU PDF yang sudah dirender, key: hash (judul, isi essay), dibatasi jumlah entry dan total byte
+class PdfCache:
+    def __init__(self, max_entries=PDF_CACHE_ENTRIES, max_bytes=PDF_CACHE_BYTES):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            data = self._entries.get(key)
+            if data is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return data
+
+    def put(self, key, data):
+        with self._lock:
+            if key in self._entries:
+                return
+            self._entries[key] = data
+            self.size += len(data)
+            while self._entries and (len(self._entries) > self.max_entries or self.size > self.max_bytes):
+                _, evicted = self._entries.popitem(last=False)
+                self.size -= len(evicted)
+
+    def stats(self):
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'bytes': self.size,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / total if total else 0.0,
+            }
+
+pdf_cache = PdfCache()
+
+def pdf_key(text, title):
+    return hashlib.sha256(f'{title}\0{text}'.encode('utf-8')).hexdigest()
+
+# PDF satu essay dalam bytes, diambil dari cache jika essay dan judulnya sama
+def render_pdf(text, title="Essay"):
+    key = pdf_key(text, title)
+    data = pdf_cache.get(key)
+    if data is None:
+        pdf, unicode_font = _new_document()
+        _write_essay(pdf, unicode_font, text, title)
+        data = _output(pdf, io.BytesIO()).getvalue()
+        pdf_cache.put(key, data)
+    return data
+
+# stream PDF siap dikirim; BytesIO dari bytes tidak menyalin isi selama tidak ditulis
+def generate_pdf(text, title="Essay"):
+    return io.BytesIO(render_pdf(text, title))
+
+# banyak essay dalam satu PDF, tiap essay mulai di halaman baru
+def render_batch_pdf(essays):
+    pdf, unicode_font = _new_document()
+    for essay in essays:
+        _write_essay(pdf, unicode_font, essay['essay'], essay['title'])
+    buffer = _output(pdf, io.BytesIO())
+    buffer.seek(0)
+    return buffer
+
+# banyak essay sebagai zip berisi satu PDF per essay, PDF yang pernah dirender diambil dari cache
+def render_batch_zip(essays):
+    buffer = io.BytesIO()
+    # PDF sudah terkompresi, jadi disimpan tanpa kompresi ulang
+    with zipfile.ZipFile(buffer, 'w', compression=zipfile.ZIP_STORED) as archive:
+        for number, essay in enumerate(essays, start=1):
+            name = f"{number:02d}_{secure_filename(essay['title'][:30]) or 'essay'}.pdf"
+            archive.writestr(name, render_pdf(essay['essay'], essay['title']))
+    buffer.seek(0)
+    return buffer
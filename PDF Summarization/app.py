@@ -1,57 +1,56 @@
+import os
+import sys
 import streamlit as st
-from transformers import BertTokenizer, EncoderDecoderModel, EncoderDecoderConfig
-import PyPDF2
-
-model_ckpt = 'ardavey/bert2gpt-indosum'
-tokenizer = BertTokenizer.from_pretrained(model_ckpt)
-tokenizer.bos_token = tokenizer.cls_token
-tokenizer.eos_token = tokenizer.sep_token
-
-config = EncoderDecoderConfig.from_pretrained(model_ckpt)
-config.early_stopping = True
-
-model = EncoderDecoderModel.from_pretrained(model_ckpt, config=config)
-
-def extract_text_pdf(pdf_file):
-    pdf_reader = PyPDF2.PdfReader(pdf_file)
-    text = ''
-    for page in pdf_reader.pages:
-        text += page.extract_text()
-    return text
-
-def summarize_text(text):
-    inputs = tokenizer(text, return_tensors='pt', max_length=512, truncation=True)
-    summary_ids = model.generate(
-        inputs['input_ids'],
-        max_length=150,
-        num_beams=4,
-        early_stopping=True
-    )
-    summary = tokenizer.decode(summary_ids[0], skip_special_tokens=True)
-    return summary
+from summarizer import BACKEND, fallback_backends, summarize
+
+# registry model dan ekstraksi PDF dipakai bersama app lain, ada di paket shared/ di root repo
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from shared import model_registry
+from shared.pdf_extraction import iter_pages
+
+# mulai memuat model di background selagi UI dirender
+model_registry.warm_up('summarizer')
 
 st.title('Text Summarization Pdf')
 
+if model_registry.is_loaded('summarizer'):
+    backend = fallback_backends.get(BACKEND, BACKEND)
+    st.caption(f"Model dimuat dalam {model_registry.load_time('summarizer'):.1f} detik (backend {backend})")
+    if backend != BACKEND:
+        st.warning(f"Backend {BACKEND} gagal dimuat, ringkasan dibuat dengan backend {backend}.")
+else:
+    st.caption('Memuat model di background...')
+
 option = st.selectbox('Select input type', ('PDF', 'Text'))
+mode = st.radio('Summary mode', ('Whole document', 'First 512 tokens only'), horizontal=True)
+max_windows = 16
+if mode == 'Whole document':
+    max_windows = st.slider('Maximum sections to summarize', min_value=1, max_value=64, value=16)
+
+def show_summary(text):
+    with st.spinner('Summarizing...'):
+        summary, cached = summarize(text, whole_document=mode == 'Whole document', max_windows=max_windows)
+    st.header('Summary Result:')
+    if cached:
+        st.caption('⚡ Served from cache')
+    st.write(summary)
 
 if option == 'PDF':
     uploaded_file = st.file_uploader('Upload PDF files', type='pdf')
+    page_limit = st.number_input('Maximum pages (0 = all)', min_value=0, value=0)
     if uploaded_file is not None:
-        pdf_text = extract_text_pdf(uploaded_file)
         st.header('Text extracted from PDF:')
-        st.write(pdf_text)
+        # halaman ditampilkan begitu selesai diekstrak, teks lengkapnya dipakai untuk ringkasan
+        pages = iter_pages(uploaded_file, page_limit=page_limit or None, engine='pypdf2')
+        pdf_text = st.write_stream(page if i == 0 else '\n' + page for i, page in enumerate(pages))
         
         if st.button('Compact PDF'):
-            summary = summarize_text(pdf_text)
-            st.header('Summary Result:')
-            st.write(summary)
+            show_summary(pdf_text)
 
 elif option == 'Text':
     text_input = st.text_area('Enter the text you want to summary')
     if st.button('Concise text'):
         if len(text_input) > 0:
-            summary = summarize_text(text_input)
-            st.header('Summary Result:')
-            st.write(summary)
+            show_summary(text_input)
         else:
             st.warning('Enter the text first!')
@@ -0,0 +1,115 @@
+import argparse
+import sys
+import time
+from collections import Counter
+# summarizer menambahkan root repo ke sys.path, jadi diimpor sebelum paket shared
+from summarizer import BACKENDS, load_summarizer, generate_batch, split_windows, fallback_backends, MAX_INPUT_TOKENS
+from shared.pdf_extraction import extract_text
+
+# benchmark backend inferensi summarizer: latency, throughput, dan ROUGE drift terhadap fp32.
+# Juga cek kesamaan (parity) hasil tiap backend dengan fp32: exit code 1 jika ada backend yang
+# ROUGE-L-nya di bawah --min-rouge atau yang jatuh kembali ke fp32 (mis. export ONNX gagal).
+
+def rouge_n(reference, candidate, n=1):
+    def ngrams(tokens):
+        return Counter(tuple(tokens[i:i + n]) for i in range(len(tokens) - n + 1))
+    ref, cand = ngrams(reference.lower().split()), ngrams(candidate.lower().split())
+    overlap = sum((ref & cand).values())
+    if not overlap:
+        return 0.0
+    precision, recall = overlap / sum(cand.values()), overlap / sum(ref.values())
+    return 2 * precision * recall / (precision + recall)
+
+def rouge_l(reference, candidate):
+    ref, cand = reference.lower().split(), candidate.lower().split()
+    if not ref or not cand:
+        return 0.0
+    # panjang longest common subsequence dengan dynamic programming satu baris
+    lcs = [0] * (len(cand) + 1)
+    for r in ref:
+        prev = 0
+        for j, c in enumerate(cand, start=1):
+            prev, lcs[j] = lcs[j], prev + 1 if r == c else max(lcs[j], lcs[j - 1])
+    if not lcs[-1]:
+        return 0.0
+    precision, recall = lcs[-1] / len(cand), lcs[-1] / len(ref)
+    return 2 * precision * recall / (precision + recall)
+
+def load_inputs(paths):
+    texts = []
+    for path in paths:
+        if path.lower().endswith('.pdf'):
+            texts.append(extract_text(path, engine='pypdf2'))
+        else:
+            with open(path, 'r', encoding='utf-8') as file:
+                texts.append(file.read())
+    return texts
+
+def run_backend(backend, texts, batch_size, num_threads, num_beams):
+    start = time.perf_counter()
+    tokenizer, model = load_summarizer(backend, num_threads)
+    load_time = time.perf_counter() - start
+    fallback = fallback_backends.pop(backend, None)
+
+    size = MAX_INPUT_TOKENS - tokenizer.num_special_tokens_to_add()
+    windows = [split_windows(tokenizer(text, add_special_tokens=False)['input_ids'], size, 0)[0] for text in texts]
+
+    # latency: satu request per generate
+    latencies = []
+    for window in windows:
+        start = time.perf_counter()
+        generate_batch(tokenizer, model, [window], 1, num_beams=num_beams)
+        latencies.append(time.perf_counter() - start)
+
+    # throughput: request di-batch bersama
+    start = time.perf_counter()
+    summaries = generate_batch(tokenizer, model, windows, batch_size, num_beams=num_beams)
+    elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    return {
+        'backend': backend,
+        'fallback': fallback,
+        'load_s': load_time,
+        'p50_s': latencies[len(latencies) // 2],
+        'max_s': latencies[-1],
+        'docs_per_s': len(windows) / elapsed,
+        'summaries': summaries,
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark summarizer backends (fp32, int8, onnx).')
+    parser.add_argument('inputs', nargs='+', help='PDF or text files to summarize')
+    parser.add_argument('--backends', nargs='+', default=['fp32', 'int8'], choices=BACKENDS)
+    parser.add_argument('--batch-size', type=int, default=4)
+    parser.add_argument('--threads', type=int, default=0)
+    parser.add_argument('--num-beams', type=int, default=4)
+    parser.add_argument('--min-rouge', type=float, default=0.9,
+                        help='minimum ROUGE-L against fp32 for a backend to pass the parity check')
+    args = parser.parse_args()
+
+    texts = load_inputs(args.inputs)
+    backends = ['fp32'] + [backend for backend in args.backends if backend != 'fp32']
+    results = [run_backend(backend, texts, args.batch_size, args.threads, args.num_beams) for backend in backends]
+
+    reference = results[0]['summaries']
+    failed = False
+    print(f"{'backend':<8} {'load_s':>8} {'p50_s':>8} {'max_s':>8} {'docs/s':>8} {'rouge1':>8} {'rougeL':>8} {'exact':>8}  parity")
+    for result in results:
+        rouge1 = sum(rouge_n(ref, cand) for ref, cand in zip(reference, result['summaries'])) / len(reference)
+        rougel = sum(rouge_l(ref, cand) for ref, cand in zip(reference, result['summaries'])) / len(reference)
+        exact = sum(ref == cand for ref, cand in zip(reference, result['summaries'])) / len(reference)
+        if result['fallback']:
+            parity = f"FALLBACK to {result['fallback']}"
+        elif rougel < args.min_rouge:
+            parity = f'DRIFT (rougeL < {args.min_rouge:g})'
+        else:
+            parity = 'ok'
+        failed = failed or parity != 'ok'
+        print(f"{result['backend']:<8} {result['load_s']:>8.2f} {result['p50_s']:>8.2f} {result['max_s']:>8.2f} "
+              f"{result['docs_per_s']:>8.2f} {rouge1:>8.3f} {rougel:>8.3f} {exact:>8.2f}  {parity}")
+    if failed:
+        sys.exit(1)
+
+if __name__ == '__main__':
+    main()
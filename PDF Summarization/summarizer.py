@@ -0,0 +1,214 @@
+import logging
+import os
+import queue
+import sys
+import threading
+import time
+from concurrent.futures import Future
+from summary_cache import SummaryCache, make_key
+
+# registry model dipakai bersama app lain, ada di paket shared/ di root repo
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from shared import model_registry
+
+logger = logging.getLogger(__name__)
+
+model_ckpt = 'ardavey/bert2gpt-indosum'
+
+MAX_INPUT_TOKENS = 512
+
+# backend inferensi: 'fp32' (default), 'int8' (dynamic quantization) atau 'onnx' (ONNX Runtime via optimum)
+BACKEND = os.getenv('SUMMARIZER_BACKEND', 'fp32')
+NUM_THREADS = int(os.getenv('SUMMARIZER_THREADS', '0'))
+BATCH_SIZE = int(os.getenv('SUMMARIZER_BATCH_SIZE', '4'))
+BATCH_WAIT = float(os.getenv('SUMMARIZER_BATCH_WAIT', '0.02'))
+
+BACKENDS = ('fp32', 'int8', 'onnx')
+# backend yang benar-benar dipakai jika berbeda dari yang diminta, mis. {'onnx': 'fp32'} saat export gagal
+fallback_backends = {}
+
+def load_summarizer(backend=BACKEND, num_threads=NUM_THREADS):
+    # import di sini karena transformers (dan torch) lambat di-import
+    import torch
+    from transformers import BertTokenizer, EncoderDecoderModel, EncoderDecoderConfig
+
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown summarizer backend '{backend}', expected one of {BACKENDS}")
+    if num_threads:
+        torch.set_num_threads(num_threads)
+
+    tokenizer = BertTokenizer.from_pretrained(model_ckpt)
+    tokenizer.bos_token = tokenizer.cls_token
+    tokenizer.eos_token = tokenizer.sep_token
+
+    config = EncoderDecoderConfig.from_pretrained(model_ckpt)
+    config.early_stopping = True
+
+    if backend == 'onnx':
+        try:
+            from optimum.onnxruntime import ORTModelForSeq2SeqLM
+            model = ORTModelForSeq2SeqLM.from_pretrained(model_ckpt, config=config, export=True)
+            return tokenizer, model
+        except Exception as e:
+            # exporter optimum belum tentu mendukung EncoderDecoderModel (bert2gpt), jadi pakai fp32;
+            # cek kesamaan hasil ONNX dengan fp32 lewat benchmark.py sebelum memakainya
+            logger.warning("ONNX export of %s failed, falling back to fp32: %s", model_ckpt, e)
+            fallback_backends[backend] = 'fp32'
+            backend = 'fp32'
+
+    model = EncoderDecoderModel.from_pretrained(model_ckpt, config=config)
+    model.eval()
+    if backend == 'int8':
+        model = torch.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+    return tokenizer, model
+
+model_registry.register('summarizer', load_summarizer)
+
+# ringkas banyak window sekaligus dengan batched beam search (padding + attention mask)
+def generate_batch(tokenizer, model, windows, batch_size=BATCH_SIZE, max_length=150, num_beams=4):
+    import torch
+
+    summaries = []
+    for start in range(0, len(windows), batch_size):
+        batch = [tokenizer.build_inputs_with_special_tokens(window) for window in windows[start:start + batch_size]]
+        inputs = tokenizer.pad({'input_ids': batch}, return_tensors='pt')
+        with torch.inference_mode():
+            summary_ids = model.generate(
+                inputs['input_ids'],
+                attention_mask=inputs['attention_mask'],
+                max_length=max_length,
+                num_beams=num_beams,
+                early_stopping=True
+            )
+        summaries.extend(tokenizer.batch_decode(summary_ids, skip_special_tokens=True))
+    return summaries
+
+# antrian generate: window dari request yang datang bersamaan (session Streamlit berbeda)
+# digabung menjadi satu batch oleh satu worker thread
+class GenerationQueue:
+    def __init__(self, batch_size=BATCH_SIZE, max_wait=BATCH_WAIT):
+        self.batch_size = batch_size
+        self.max_wait = max_wait
+        self._queue = queue.Queue()
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def submit(self, windows, max_length=150, num_beams=4):
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='summarizer-batcher', daemon=True)
+                self._thread.start()
+        futures = []
+        for window in windows:
+            future = Future()
+            self._queue.put((window, (max_length, num_beams), future))
+            futures.append(future)
+        return futures
+
+    def _next_batch(self):
+        batch = [self._queue.get()]
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.batch_size:
+            remaining = deadline - time.monotonic()
+            try:
+                if remaining > 0:
+                    batch.append(self._queue.get(timeout=remaining))
+                else:
+                    batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._next_batch()
+            # hanya window dengan parameter generate yang sama yang bisa di-batch bersama
+            groups = {}
+            for window, params, future in batch:
+                groups.setdefault(params, []).append((window, future))
+            for (max_length, num_beams), items in groups.items():
+                try:
+                    tokenizer, model = model_registry.get('summarizer')
+                    summaries = generate_batch(tokenizer, model, [window for window, _ in items],
+                                               len(items), max_length, num_beams)
+                    for (_, future), summary in zip(items, summaries):
+                        future.set_result(summary)
+                except Exception as e:
+                    for _, future in items:
+                        future.set_exception(e)
+
+generation_queue = GenerationQueue()
+
+def generate(windows, max_length=150, num_beams=4):
+    futures = generation_queue.submit(windows, max_length, num_beams)
+    return [future.result() for future in futures]
+
+def window_size():
+    tokenizer, _ = model_registry.get('summarizer')
+    return MAX_INPUT_TOKENS - tokenizer.num_special_tokens_to_add()
+
+def summarize_text(text, max_length=150, num_beams=4):
+    tokenizer, _ = model_registry.get('summarizer')
+    token_ids = tokenizer(text, add_special_tokens=False)['input_ids'][:window_size()]
+    return generate([token_ids], max_length, num_beams)[0]
+
+# potong token dokumen menjadi window yang saling overlap (tanpa special token)
+def split_windows(token_ids, window_size, overlap):
+    stride = window_size - overlap
+    last_start = max(len(token_ids) - overlap, 1)
+    return [token_ids[start:start + window_size] for start in range(0, last_start, stride)]
+
+# pilih window tersebar merata di seluruh dokumen jika jumlahnya melebihi batas
+def sample_windows(windows, max_windows):
+    if not max_windows or len(windows) <= max_windows:
+        return windows
+    if max_windows == 1:
+        return windows[:1]
+    step = (len(windows) - 1) / (max_windows - 1)
+    return [windows[round(i * step)] for i in range(max_windows)]
+
+# ringkasan dokumen panjang secara map-reduce: ringkas tiap window lalu ringkas gabungan ringkasannya
+def summarize_long_text(text, overlap=64, max_windows=16, max_length=150, num_beams=4, max_depth=3):
+    tokenizer, _ = model_registry.get('summarizer')
+    size = window_size()
+
+    # tokenisasi sekali, window diambil dari hasil tokenisasi yang sama
+    token_ids = tokenizer(text, add_special_tokens=False)['input_ids']
+    windows = sample_windows(split_windows(token_ids, size, overlap), max_windows)
+    summaries = generate(windows, max_length, num_beams)
+
+    if len(summaries) == 1:
+        return summaries[0]
+    combined = ' '.join(summaries)
+    if max_depth <= 1:
+        # batas kedalaman tercapai, ringkas bagian awal gabungan ringkasan saja
+        window = tokenizer(combined, add_special_tokens=False)['input_ids'][:size]
+        return generate([window], max_length, num_beams)[0]
+    return summarize_long_text(combined, overlap, max_windows, max_length, num_beams, max_depth - 1)
+
+summary_cache = SummaryCache()
+
+def summary_key(text, whole_document, max_windows, max_length, num_beams):
+    return make_key(
+        text,
+        model=model_ckpt,
+        # backend yang benar-benar menghasilkan ringkasan (diketahui setelah model dimuat)
+        backend=fallback_backends.get(BACKEND, BACKEND),
+        mode='map-reduce' if whole_document else 'truncate',
+        max_windows=max_windows if whole_document else None,
+        max_length=max_length,
+        num_beams=num_beams
+    )
+
+# ringkas dengan cache; mengembalikan (ringkasan, True jika diambil dari cache)
+def summarize(text, whole_document=True, max_windows=16, max_length=150, num_beams=4):
+    summary = summary_cache.get(summary_key(text, whole_document, max_windows, max_length, num_beams))
+    if summary is not None:
+        return summary, True
+
+    if whole_document:
+        summary = summarize_long_text(text, max_windows=max_windows, max_length=max_length, num_beams=num_beams)
+    else:
+        summary = summarize_text(text, max_length=max_length, num_beams=num_beams)
+    summary_cache.put(summary_key(text, whole_document, max_windows, max_length, num_beams), summary)
+    return summary, False
@@ -0,0 +1,106 @@
+import atexit
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+CACHE_PATH = os.getenv('SUMMARY_CACHE_PATH', os.path.join('cache', 'summaries.sqlite'))
+MAX_ENTRIES = int(os.getenv('SUMMARY_CACHE_MAX_ENTRIES', '5000'))
+MEMORY_ENTRIES = 256
+# waktu akses terakhir dari cache hit ditulis ke SQLite per batch, bukan satu commit per hit
+TOUCH_BATCH = 64
+
+def normalize_text(text):
+    return re.sub(r'\s+', ' ', text).strip()
+
+# key cache: sha256 teks yang sudah dinormalisasi + checkpoint model + parameter generate
+def make_key(text, **params):
+    text_hash = hashlib.sha256(normalize_text(text).encode('utf-8')).hexdigest()
+    return hashlib.sha256(json.dumps({'text': text_hash, **params}, sort_keys=True).encode('utf-8')).hexdigest()
+
+# cache ringkasan dua tingkat: LRU di memori dan SQLite di disk dengan eviksi berdasarkan waktu akses terakhir.
+# File SQLite baru dibuat saat cache pertama kali dipakai, sehingga import summarizer (mis. oleh
+# benchmark.py) tidak membuat folder cache.
+class SummaryCache:
+    def __init__(self, path=CACHE_PATH, max_entries=MAX_ENTRIES, memory_entries=MEMORY_ENTRIES,
+                 touch_batch=TOUCH_BATCH):
+        self.path = path
+        self.max_entries = max_entries
+        self.memory_entries = memory_entries
+        self.touch_batch = touch_batch
+        self.hits = 0
+        self.misses = 0
+        self._memory = OrderedDict()
+        self._touched = {}
+        self._db = None
+        self._lock = threading.Lock()
+        atexit.register(self.flush)
+
+    def _connect(self):
+        if self._db is None:
+            os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+            self._db = sqlite3.connect(self.path, check_same_thread=False)
+            self._db.execute('CREATE TABLE IF NOT EXISTS summaries (key TEXT PRIMARY KEY, summary TEXT, last_used REAL)')
+            self._db.execute('CREATE INDEX IF NOT EXISTS summaries_last_used ON summaries (last_used)')
+            self._db.commit()
+        return self._db
+
+    def _flush_touched(self):
+        if self._touched:
+            self._connect().executemany('UPDATE summaries SET last_used = ? WHERE key = ?',
+                                        [(used, key) for key, used in self._touched.items()])
+            self._touched = {}
+
+    # tulis waktu akses yang masih tertunda (dipanggil juga saat proses selesai)
+    def flush(self):
+        with self._lock:
+            if self._touched:
+                self._flush_touched()
+                self._db.commit()
+
+    def _remember(self, key, summary):
+        self._memory[key] = summary
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_entries:
+            self._memory.popitem(last=False)
+
+    def get(self, key):
+        with self._lock:
+            summary = self._memory.get(key)
+            if summary is None:
+                row = self._connect().execute('SELECT summary FROM summaries WHERE key = ?', (key,)).fetchone()
+                summary = row[0] if row else None
+            if summary is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._remember(key, summary)
+            # hit hanya dicatat di memori; ditulis bersama hit lain saat batch penuh atau saat put
+            self._touched[key] = time.time()
+            if len(self._touched) >= self.touch_batch:
+                self._flush_touched()
+                self._db.commit()
+            return summary
+
+    def put(self, key, summary):
+        with self._lock:
+            self._remember(key, summary)
+            # waktu akses yang tertunda ditulis dulu agar eviksi di bawah memakai urutan yang benar
+            self._flush_touched()
+            self._touched.pop(key, None)
+            self._connect().execute('INSERT OR REPLACE INTO summaries VALUES (?, ?, ?)', (key, summary, time.time()))
+            self._db.execute(
+                'DELETE FROM summaries WHERE key IN '
+                '(SELECT key FROM summaries ORDER BY last_used DESC LIMIT -1 OFFSET ?)',
+                (self.max_entries,)
+            )
+            self._db.commit()
+
+    def stats(self):
+        with self._lock:
+            stored = self._connect().execute('SELECT COUNT(*) FROM summaries').fetchone()[0]
+        return {'hits': self.hits, 'misses': self.misses, 'memory': len(self._memory), 'stored': stored}
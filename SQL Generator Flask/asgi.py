@@ -0,0 +1,56 @@
+import asyncio
+from a2wsgi import WSGIMiddleware
+from starlette.applications import Starlette
+from starlette.responses import JSONResponse
+from starlette.routing import Mount, Route
+# main.py menambahkan root repo ke sys.path, jadi diimpor sebelum paket shared
+from main import (app as flask_app, cache_get, parse_generate_request, generate_flow,
+                  generate_stream_flow, stream_needs_model)
+from shared.asgi import ReservedStreamingResponse, busy_response, read_json
+from shared.llm_flow import arun, aevents
+from shared.llm_gateway import gateway, GatewayBusy
+
+# Mode ASGI (opsional): route yang memanggil model dijalankan async dengan ainvoke/astream, sehingga
+# ratusan request yang menunggu Ollama cukup dilayani satu worker tanpa satu thread per request.
+# Jumlah generate ke Ollama tetap dibatasi gateway (OLLAMA_MAX_CONCURRENCY/OLLAMA_MAX_QUEUE).
+# Logika request sama dengan route Flask (flow di main.py), di sini hanya I/O-nya yang async.
+# Route lain diteruskan ke app Flask di main.py.
+#   uvicorn asgi:app --workers 1
+
+async def generate_sql(request):
+    params, error = parse_generate_request(await read_json(request))
+    if error:
+        return JSONResponse(error[0], status_code=error[1])
+
+    try:
+        body, status = await arun(generate_flow(*params))
+        return JSONResponse(body, status_code=status)
+    except GatewayBusy as e:
+        return busy_response(e)
+    except Exception as e:
+        return JSONResponse({'error': f'Terjadi kesalahan: {str(e)}'}, status_code=500)
+
+async def generate_sql_stream(request):
+    params, error = parse_generate_request(await read_json(request))
+    if error:
+        return JSONResponse(error[0], status_code=error[1])
+    text_input, explain = params
+
+    try:
+        # cache semantik memanggil model embeddings (blocking), jadi dijalankan di thread
+        cached = await asyncio.to_thread(cache_get, text_input)
+        reservation = await gateway.areserve() if stream_needs_model(cached, explain) else None
+    except GatewayBusy as e:
+        return busy_response(e)
+    except Exception as e:
+        return JSONResponse({'error': f'Terjadi kesalahan: {str(e)}'}, status_code=500)
+
+    # Client yang memutus koneksi membatalkan generator, slot gateway dan stream ke Ollama ikut dilepas
+    return ReservedStreamingResponse(aevents(generate_stream_flow(text_input, explain, cached), reservation),
+                                     reservation)
+
+app = Starlette(routes=[
+    Route('/generate', generate_sql, methods=['POST']),
+    Route('/generate/stream', generate_sql_stream, methods=['POST']),
+    Mount('/', app=WSGIMiddleware(flask_app)),
+])
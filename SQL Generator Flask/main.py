@@ -1,65 +1,288 @@
-from flask import Flask, render_template, request, jsonify
+from flask import Flask, render_template, request, jsonify, Response, stream_with_context
 import os
-from langchain_ollama.llms import OllamaLLM
+import sys
+import json
+import time
+import uuid
+import threading
+from concurrent.futures import ThreadPoolExecutor, TimeoutError
 from langchain_core.prompts import ChatPromptTemplate
+from response_cache import ResponseCache
 
-# Initialize Ollama with Llama3 model
-model = OllamaLLM(model="llama3",
-                  temperature=0.8
-                  )
+# gateway Ollama dipakai bersama app lain, ada di paket shared/ di root repo
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from shared.llm_gateway import gateway, GatewayBusy
+from shared.llm_flow import Call, Invoke, Stream, StreamTimer, run, events
+
+MODEL_NAME = "llama3"
+
+# Cache respons (opt-in): SQL_CACHE=1, SQL_CACHE_SEMANTIC=1 untuk pencocokan kalimat yang mirip
+CACHE_ENABLED = os.getenv('SQL_CACHE', '0') == '1'
+SEMANTIC_CACHE_ENABLED = CACHE_ENABLED and os.getenv('SQL_CACHE_SEMANTIC', '0') == '1'
+
+# Initialize Ollama with Llama3 model, temperature 0 saat cache aktif agar hasilnya reproducible.
+# Model diambil dari gateway agar koneksi ke Ollama dipakai ulang dan jumlah request dibatasi.
+model = gateway.llm(model=MODEL_NAME,
+                    temperature=0 if CACHE_ENABLED else 0.8
+                    )
+
+response_cache = None
+if CACHE_ENABLED:
+    response_cache = ResponseCache(
+        max_entries=int(os.getenv('SQL_CACHE_MAX_ENTRIES', '1000')),
+        ttl=int(os.getenv('SQL_CACHE_TTL', '3600')),
+        embeddings=gateway.embeddings(model="nomic-embed-text") if SEMANTIC_CACHE_ENABLED else None,
+        similarity_threshold=float(os.getenv('SQL_CACHE_SIMILARITY', '0.95'))
+    )
 
 app = Flask(__name__)
 
+# Template untuk generate SQL
+sql_template = ChatPromptTemplate.from_template("""
+    Buatlah kueri SQL berdasarkan teks berikut. Jika teks tidak relevan, jawab dengan pesan:
+    "Error: Input tidak relevan untuk membuat query SQL."
+
+    Teks input: {text_input}
+
+    Saya hanya ingin generate output nya kueri SQL saja, tanpa penjelasan tambahan!
+""")
+
+# Template untuk explain SQL
+explain_template = ChatPromptTemplate.from_template("""
+    Jelaskan kueri SQL dibawah ini dengan bahasa yang sederhana dan mudah dipahami:
+
+    SQL Query: {sql_query}
+
+    Berikan penjelasan yang singkat dan jelas tentang apa yang dilakukan query ini!
+""")
+
+sql_chain = sql_template | model
+explain_chain = explain_template | model
+
+# Penjelasan yang dibuat di background (mode explain='async'), diambil lewat /explanation/<id>
+EXPLANATION_TTL = 600
+explain_executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix='explain')
+explanations = {}
+explanations_lock = threading.Lock()
+
+def cache_get(text_input):
+    if response_cache is None:
+        return None
+    cached, _ = response_cache.get(text_input, MODEL_NAME, model.temperature)
+    return cached
+
+def cache_put(text_input, sql_query, explanation=None):
+    if response_cache is None:
+        return
+    response_cache.put(text_input, MODEL_NAME, model.temperature,
+                       {'sql_query': sql_query, 'explanation': explanation})
+
+def cache_put_explanation(text_input, explanation):
+    if response_cache is not None:
+        response_cache.update(text_input, MODEL_NAME, model.temperature, explanation=explanation)
+
+def submit_explanation(sql_query, text_input=None):
+    now = time.time()
+    explanation_id = uuid.uuid4().hex
+    future = explain_executor.submit(gateway.invoke, explain_chain, {"sql_query": sql_query})
+    if text_input is not None:
+        future.add_done_callback(
+            lambda done: cache_put_explanation(text_input, done.result()) if not done.exception() else None
+        )
+    with explanations_lock:
+        # Buang penjelasan lama yang tidak pernah diambil
+        for key in [key for key, (_, created) in explanations.items() if now - created > EXPLANATION_TTL]:
+            del explanations[key]
+        explanations[explanation_id] = (future, now)
+    return explanation_id
+
+def sse(event, data):
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+# Antrian model penuh (429) atau terlalu lama menunggu (503), client diminta mencoba lagi
+def busy_response(error):
+    response = jsonify({'error': str(error)})
+    response.headers['Retry-After'] = str(error.retry_after)
+    return response, error.status
+
+# Logika /generate dan /generate/stream ditulis sekali di bawah ini dan dipakai route Flask di
+# file ini maupun route async di asgi.py (lihat shared/llm_flow.py). Semua mengembalikan
+# (body, status) atau event SSE; route hanya membaca request dan menulis response.
+
+# explain: 'sync' (default), 'async' (penjelasan diambil lewat /explanation/<id>) atau 'none'
+def parse_generate_request(data):
+    if not isinstance(data, dict):
+        return None, ({'error': 'Body request harus berupa objek JSON'}, 400)
+    text_input = data.get('query', '').strip()
+    explain = data.get('explain', 'sync')
+    if not text_input:
+        return None, ({'error': 'Masukkan deskripsi Query terlebih dahulu!'}, 400)
+    if explain not in ('sync', 'async', 'none'):
+        return None, ({'error': "explain harus 'sync', 'async' atau 'none'"}, 400)
+    return (text_input, explain), None
+
+def explanation_pending(explanation_id):
+    return {'explanation_id': explanation_id, 'explanation_url': f'/explanation/{explanation_id}'}
+
+def generate_flow(text_input, explain):
+    cached = yield Call(cache_get, text_input)
+
+    # Generate SQL query
+    if cached:
+        sql_response = cached['sql_query']
+    else:
+        sql_response = yield Invoke(sql_chain, {"text_input": text_input})
+
+        if "Error:" in sql_response:
+            return {'error': sql_response}, 400
+        yield Call(cache_put, text_input, sql_response)
+
+    if explain == 'none':
+        return {'sql_query': sql_response, 'cached': bool(cached)}, 200
+
+    explanation_response = cached['explanation'] if cached else None
+
+    if explain == 'async' and explanation_response is None:
+        explanation_id = submit_explanation(sql_response, text_input)
+        return {'sql_query': sql_response, **explanation_pending(explanation_id), 'cached': bool(cached)}, 202
+
+    # Generate explanation
+    if explanation_response is None:
+        explanation_response = yield Invoke(explain_chain, {"sql_query": sql_response})
+        yield Call(cache_put_explanation, text_input, explanation_response)
+
+    return {'sql_query': sql_response, 'explanation': explanation_response, 'cached': bool(cached)}, 200
+
+# Slot model untuk stream diambil sebelum response dimulai, sehingga antrian penuh masih dijawab
+# 429/503 dengan Retry-After; tidak perlu slot jika SQL (dan penjelasannya) sudah ada di cache
+def stream_needs_model(cached, explain):
+    return not cached or (explain == 'sync' and cached['explanation'] is None)
+
+def generate_stream_flow(text_input, explain, cached):
+    timer = StreamTimer()
+
+    def on_chunk(section):
+        def event(chunk):
+            if section == 'sql':
+                timer.token()
+            return sse('token', {'section': section, 'text': chunk})
+        return event
+
+    try:
+        if cached:
+            sql_response = cached['sql_query']
+            yield sse('token', {'section': 'sql', 'text': sql_response})
+        else:
+            # Stream SQL query
+            sql_response = yield Stream(sql_chain, {"text_input": text_input}, on_chunk('sql'))
+
+            if "Error:" in sql_response:
+                yield sse('error', {'error': sql_response})
+                return
+            yield Call(cache_put, text_input, sql_response)
+
+        # Query sudah lengkap, client bisa langsung memakainya sebelum penjelasan selesai
+        yield sse('sql', {'sql_query': sql_response, 'sql_ms': timer.elapsed_ms()})
+
+        # Stream explanation
+        explanation_response = cached['explanation'] if cached and explain != 'none' else None
+        explanation_id = None
+        if explanation_response is not None:
+            yield sse('token', {'section': 'explanation', 'text': explanation_response})
+        elif explain == 'async':
+            explanation_id = submit_explanation(sql_response, text_input)
+        elif explain == 'sync':
+            explanation_response = yield Stream(explain_chain, {"sql_query": sql_response}, on_chunk('explanation'))
+            yield Call(cache_put_explanation, text_input, explanation_response)
+
+        done = {
+            'sql_query': sql_response,
+            'explanation': explanation_response,
+            'cached': bool(cached),
+            'first_token_ms': timer.first_token_ms,
+            'total_ms': timer.elapsed_ms()
+        }
+        if explanation_id is not None:
+            done.update(explanation_pending(explanation_id))
+        yield sse('done', done)
+    except Exception as e:
+        yield sse('error', {'error': f'Terjadi kesalahan: {str(e)}'})
+
 @app.route('/')
 def index():
     return render_template('index.html')
 
 @app.route('/generate', methods=['POST'])
 def generate_sql():
+    # Body yang bukan JSON dijawab dengan bentuk error JSON yang sama, bukan halaman HTML 400
+    params, error = parse_generate_request(request.get_json(silent=True))
+    if error:
+        return jsonify(error[0]), error[1]
+
     try:
-        data = request.get_json()
-        text_input = data.get('query', '').strip()
-        
-        if not text_input:
-            return jsonify({'error': 'Masukkan deskripsi Query terlebih dahulu!'}), 400
-        
-        # Template untuk generate SQL
-        sql_template = ChatPromptTemplate.from_template("""
-            Buatlah kueri SQL berdasarkan teks berikut. Jika teks tidak relevan, jawab dengan pesan:
-            "Error: Input tidak relevan untuk membuat query SQL."
-
-            Teks input: {text_input}
-
-            Saya hanya ingin generate output nya kueri SQL saja, tanpa penjelasan tambahan!
-        """)
-        
-        # Generate SQL query
-        sql_chain = sql_template | model
-        sql_response = sql_chain.invoke({"text_input": text_input})
-        
-        if "Error:" in sql_response:
-            return jsonify({'error': sql_response}), 400
-        
-        # Template untuk explain SQL
-        explain_template = ChatPromptTemplate.from_template("""
-            Jelaskan kueri SQL dibawah ini dengan bahasa yang sederhana dan mudah dipahami:
-
-            SQL Query: {sql_query}
-
-            Berikan penjelasan yang singkat dan jelas tentang apa yang dilakukan query ini!
-        """)
-        
-        # Generate explanation
-        explain_chain = explain_template | model
-        explanation_response = explain_chain.invoke({"sql_query": sql_response})
-        
-        return jsonify({
-            'sql_query': sql_response,
-            'explanation': explanation_response
-        })
-        
+        body, status = run(generate_flow(*params))
+        return jsonify(body), status
+    except GatewayBusy as e:
+        return busy_response(e)
     except Exception as e:
         return jsonify({'error': f'Terjadi kesalahan: {str(e)}'}), 500
 
+@app.route('/explanation/<explanation_id>')
+def get_explanation(explanation_id):
+    with explanations_lock:
+        entry = explanations.get(explanation_id)
+    if entry is None:
+        return jsonify({'error': 'Penjelasan tidak ditemukan atau sudah kedaluwarsa'}), 404
+    
+    future, _ = entry
+    # ?wait=<detik> untuk long-polling sampai penjelasan siap
+    wait = min(request.args.get('wait', 0, type=float), 30)
+    try:
+        explanation_response = future.result(timeout=wait)
+    except TimeoutError:
+        return jsonify({'status': 'pending'}), 202
+    except GatewayBusy as e:
+        return busy_response(e)
+    except Exception as e:
+        return jsonify({'status': 'error', 'error': f'Terjadi kesalahan: {str(e)}'}), 500
+    
+    return jsonify({'status': 'ready', 'explanation': explanation_response})
+
+@app.route('/generate/stream', methods=['POST'])
+def generate_sql_stream():
+    params, error = parse_generate_request(request.get_json(silent=True))
+    if error:
+        return jsonify(error[0]), error[1]
+    text_input, explain = params
+
+    try:
+        cached = cache_get(text_input)
+        reservation = gateway.reserve() if stream_needs_model(cached, explain) else None
+    except GatewayBusy as e:
+        return busy_response(e)
+    except Exception as e:
+        return jsonify({'error': f'Terjadi kesalahan: {str(e)}'}), 500
+
+    # Jika client memutus koneksi, generator ditutup dan stream ke Ollama ikut berhenti. Slot juga
+    # dilepas saat response ditutup, termasuk jika generator belum sempat berjalan.
+    response = Response(
+        stream_with_context(events(generate_stream_flow(text_input, explain, cached), reservation)),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+    if reservation is not None:
+        response.call_on_close(reservation.release)
+    return response
+
+@app.route('/cache/stats')
+def cache_stats():
+    if response_cache is None:
+        return jsonify({'enabled': False})
+    return jsonify({'enabled': True, 'model': MODEL_NAME, 'temperature': model.temperature, **response_cache.stats()})
+
+@app.route('/llm/stats')
+def llm_stats():
+    return jsonify(gateway.stats())
+
 if __name__ == '__main__':
     app.run(debug=True)
\ No newline at end of file
@@ -0,0 +1,108 @@
+import math
+import re
+import threading
+import time
+from collections import OrderedDict
+
+# Samakan spasi dan huruf besar/kecil agar request yang hampir identik berbagi satu key
+def normalize_query(text):
+    return re.sub(r'\s+', ' ', text).strip().casefold()
+
+def _normalize_vector(vector):
+    norm = math.sqrt(sum(value * value for value in vector)) or 1.0
+    return [value / norm for value in vector]
+
+# Cache LRU + TTL untuk SQL dan penjelasan, key: (input ternormalisasi, nama model, temperature).
+# Jika embeddings diberikan, miss dicoba lagi dengan input cache paling mirip (model dan
+# temperature sama) di atas similarity_threshold.
+class ResponseCache:
+    def __init__(self, max_entries=1000, ttl=3600, embeddings=None, similarity_threshold=0.95):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.embeddings = embeddings
+        self.similarity_threshold = similarity_threshold
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = {'hits': 0, 'semantic_hits': 0, 'misses': 0, 'evictions': 0, 'expired': 0}
+
+    def _expired(self, entry, now):
+        return now - entry['created'] > self.ttl
+
+    def _embed(self, normalized):
+        if self.embeddings is None:
+            return None
+        return _normalize_vector(self.embeddings.embed_query(normalized))
+
+    def _semantic_lookup(self, vector, model_name, temperature, now):
+        best_key, best_score = None, self.similarity_threshold
+        for key, entry in self._entries.items():
+            if key[1:] != (model_name, temperature) or entry['vector'] is None or self._expired(entry, now):
+                continue
+            score = sum(a * b for a, b in zip(vector, entry['vector']))
+            if score >= best_score:
+                best_key, best_score = key, score
+        return best_key
+
+    # Mengembalikan (value, 'exact' | 'semantic') atau (None, None) jika miss
+    def get(self, text, model_name, temperature):
+        normalized = normalize_query(text)
+        key = (normalized, model_name, temperature)
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and self._expired(entry, now):
+                del self._entries[key]
+                self._stats['expired'] += 1
+                entry = None
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self._stats['hits'] += 1
+                return dict(entry['value']), 'exact'
+
+        if self.embeddings is not None:
+            # Embedding dihitung di luar lock karena memanggil Ollama
+            vector = self._embed(normalized)
+            with self._lock:
+                similar_key = self._semantic_lookup(vector, model_name, temperature, now)
+                if similar_key is not None:
+                    self._entries.move_to_end(similar_key)
+                    self._stats['semantic_hits'] += 1
+                    return dict(self._entries[similar_key]['value']), 'semantic'
+
+        with self._lock:
+            self._stats['misses'] += 1
+        return None, None
+
+    def put(self, text, model_name, temperature, value):
+        normalized = normalize_query(text)
+        key = (normalized, model_name, temperature)
+        with self._lock:
+            existing = self._entries.get(key)
+        vector = existing['vector'] if existing else self._embed(normalized)
+
+        with self._lock:
+            self._entries[key] = {'value': dict(value), 'vector': vector, 'created': time.time()}
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self._stats['evictions'] += 1
+
+    # Tambahkan field ke entry yang sudah ada tanpa mereset TTL
+    def update(self, text, model_name, temperature, **fields):
+        key = (normalize_query(text), model_name, temperature)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                entry['value'].update(fields)
+
+    def stats(self):
+        with self._lock:
+            lookups = self._stats['hits'] + self._stats['semantic_hits'] + self._stats['misses']
+            return {
+                **self._stats,
+                'entries': len(self._entries),
+                'max_entries': self.max_entries,
+                'ttl_seconds': self.ttl,
+                'semantic': self.embeddings is not None,
+                'hit_rate': (lookups - self._stats['misses']) / lookups if lookups else 0.0,
+            }
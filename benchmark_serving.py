@@ -0,0 +1,229 @@
+import argparse
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+import httpx
+
+# Benchmark beban mode sync (Flask, satu thread per request) vs async (ASGI/uvicorn, satu worker)
+# untuk app Flask yang memakai Ollama. Ollama diganti server tiruan lokal yang men-stream token
+# dengan jeda tetap, sehingga yang diukur adalah biaya server app, bukan model.
+#   python benchmark_serving.py --app sql --concurrency 10 50 100 200
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+CV_TEXT = b'Nama saya Budi, backend engineer dengan pengalaman 3 tahun di Python dan Flask.\n'
+
+APPS = {
+    'sql': {'dir': 'SQL Generator Flask', 'module': 'main', 'path': '/generate',
+            'json': {'query': 'tampilkan semua user', 'explain': 'none'}},
+    'essay': {'dir': 'Essay Generator', 'module': 'app', 'path': '/generate',
+              'json': {'prompt': 'Kecerdasan buatan'}},
+    'cv': {'dir': 'CV Roasting Flask', 'module': 'app', 'path': '/upload',
+           'files': {'file': ('cv.txt', CV_TEXT, 'text/plain')}},
+    'chatbot': {'dir': 'Chatbot AI Crawler', 'module': 'app', 'path': '/ask',
+                'json': {'question': 'What is this page about?'}, 'setup': '/crawl'},
+}
+
+PAGE = ('<html><head><title>Docs</title></head><body><p>'
+        + 'This page explains how the crawler answers questions about a website. ' * 20
+        + '</p></body></html>').encode('utf-8')
+
+# Ollama tiruan: /api/generate dan /api/chat men-stream token dengan jeda, /api/embed mengembalikan
+# vektor kecil, /site/ menyajikan satu halaman HTML untuk di-crawl oleh chatbot
+def fake_ollama(port, tokens, token_delay):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+
+        def log_message(self, *args):
+            pass
+
+        def _send(self, body, content_type):
+            self.send_response(200)
+            self.send_header('Content-Type', content_type)
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self):
+            if self.path.startswith('/site/'):
+                self._send(PAGE, 'text/html')
+            else:
+                self._send(json.dumps({'models': [{'name': 'llama3:latest'}, {'name': 'llama3'}]}).encode(), 'application/json')
+
+        def do_POST(self):
+            body = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))) or b'{}')
+            if self.path.startswith('/api/embed'):
+                texts = [body['input']] if isinstance(body.get('input'), str) else body.get('input', [])
+                vectors = [[float(len(text) % 7), 1.0, float(sum(map(ord, text)) % 5)] for text in texts]
+                return self._send(json.dumps({'model': body.get('model'), 'embeddings': vectors}).encode(), 'application/json')
+
+            chat = self.path.startswith('/api/chat')
+            self.send_response(200)
+            self.send_header('Content-Type', 'application/x-ndjson')
+            self.send_header('Transfer-Encoding', 'chunked')
+            self.end_headers()
+            for i in range(tokens + 1):
+                done = i == tokens
+                if not done:
+                    time.sleep(token_delay)
+                text = '' if done else f'token{i} '
+                part = {'model': body.get('model'), 'created_at': '2024-01-01T00:00:00Z', 'done': done}
+                if done:
+                    part['done_reason'] = 'stop'
+                if chat:
+                    part['message'] = {'role': 'assistant', 'content': text}
+                else:
+                    part['response'] = text
+                line = (json.dumps(part) + '\n').encode()
+                self.wfile.write(b'%x\r\n%s\r\n' % (len(line), line))
+            self.wfile.write(b'0\r\n\r\n')
+
+    ThreadingHTTPServer.daemon_threads = True
+    ThreadingHTTPServer.request_queue_size = 1024
+    ThreadingHTTPServer(('127.0.0.1', port), Handler).serve_forever()
+
+def start_server(app, mode, port, env):
+    spec = APPS[app]
+    if mode == 'sync':
+        # server bawaan Flask (app.run threaded=True): satu thread per request yang sedang berjalan
+        code = f"from {spec['module']} import app; app.run(host='127.0.0.1', port={port}, threaded=True)"
+        command = [sys.executable, '-c', code]
+    else:
+        command = [sys.executable, '-m', 'uvicorn', 'asgi:app', '--host', '127.0.0.1', '--port', str(port),
+                   '--workers', '1', '--log-level', 'warning', '--backlog', '4096']
+    return subprocess.Popen(command, cwd=os.path.join(ROOT, spec['dir']), env=env,
+                            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+def process_usage(pid):
+    # jumlah thread dan RSS (MB) proses server dari /proc (Linux)
+    try:
+        with open(f'/proc/{pid}/status') as file:
+            fields = dict(line.split(':', 1) for line in file if ':' in line)
+        return int(fields['Threads']), int(fields['VmRSS'].split()[0]) / 1024
+    except (OSError, KeyError):
+        return 0, 0.0
+
+async def wait_ready(base_url, timeout=60):
+    deadline = time.monotonic() + timeout
+    async with httpx.AsyncClient() as client:
+        while time.monotonic() < deadline:
+            try:
+                await client.get(base_url + '/llm/stats')
+                return
+            except httpx.HTTPError:
+                await asyncio.sleep(0.2)
+    raise RuntimeError(f'Server {base_url} tidak siap dalam {timeout} detik')
+
+async def run_level(base_url, spec, concurrency, requests, pid, cookies):
+    latencies = []
+    errors = 0
+    peak = [0, 0.0]
+    stop = asyncio.Event()
+
+    async def sample():
+        while not stop.is_set():
+            threads, rss = process_usage(pid)
+            peak[0], peak[1] = max(peak[0], threads), max(peak[1], rss)
+            await asyncio.sleep(0.05)
+
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(base_url=base_url, timeout=600, limits=limits, cookies=cookies) as client:
+        pending = iter(range(requests))
+
+        async def worker():
+            nonlocal errors
+            for _ in pending:
+                start = time.perf_counter()
+                try:
+                    response = await client.post(spec['path'], json=spec.get('json'), files=spec.get('files'))
+                    ok = response.status_code == 200 and 'error' not in response.json() \
+                        and response.json().get('success', True)
+                except httpx.HTTPError:
+                    ok = False
+                latencies.append(time.perf_counter() - start)
+                errors += not ok
+
+        sampler = asyncio.create_task(sample())
+        started = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - started
+        stop.set()
+        await sampler
+
+    latencies.sort()
+    return {
+        'p50_ms': latencies[len(latencies) // 2] * 1000,
+        'p95_ms': latencies[int(len(latencies) * 0.95)] * 1000,
+        'rps': len(latencies) / elapsed,
+        'errors': errors,
+        'threads': peak[0],
+        'rss_mb': peak[1],
+    }
+
+async def benchmark(args):
+    spec = APPS[args.app]
+    ollama_port = args.port
+    fake = subprocess.Popen([sys.executable, os.path.abspath(__file__), '--fake-ollama', str(ollama_port),
+                             '--tokens', str(args.tokens), '--token-delay', str(args.token_delay)])
+    workdir = tempfile.mkdtemp(prefix='bench-serving-')
+    env = {
+        **os.environ,
+        'OLLAMA_BASE_URL': f'http://127.0.0.1:{ollama_port}',
+        'OLLAMA_MAX_CONCURRENCY': str(args.backend_concurrency),
+        'OLLAMA_MAX_QUEUE': '100000',
+        'OLLAMA_QUEUE_TIMEOUT': '600',
+        'HEALTH_DEEP_INTERVAL': '0',
+        'CHAT_DB_PATH': os.path.join(workdir, 'chat.db'),
+        'CRAWL_RATE': '0',
+        'CRAWL_BROWSERS': '0',
+    }
+    generation_ms = args.tokens * args.token_delay * 1000
+    print(f"app={args.app} backend_concurrency={args.backend_concurrency} generation~{generation_ms:.0f}ms")
+    print(f"{'mode':<6} {'conc':>5} {'p50_ms':>8} {'p95_ms':>8} {'req/s':>7} {'errors':>6} {'threads':>7} {'rss_mb':>7}")
+    try:
+        for offset, mode in enumerate(args.modes):
+            port = args.port + 1 + offset
+            server = start_server(args.app, mode, port, env)
+            base_url = f'http://127.0.0.1:{port}'
+            try:
+                await wait_ready(base_url)
+                cookies = None
+                if spec.get('setup'):
+                    async with httpx.AsyncClient(base_url=base_url, timeout=120) as client:
+                        await client.post(spec['setup'], json={'url': f'http://127.0.0.1:{ollama_port}/site/', 'max_pages': 1})
+                        cookies = dict(client.cookies)
+                for concurrency in args.concurrency:
+                    result = await run_level(base_url, spec, concurrency, concurrency * args.rounds, server.pid, cookies)
+                    print(f"{mode:<6} {concurrency:>5} {result['p50_ms']:>8.0f} {result['p95_ms']:>8.0f} "
+                          f"{result['rps']:>7.1f} {result['errors']:>6} {result['threads']:>7} {result['rss_mb']:>7.1f}")
+            finally:
+                server.terminate()
+                server.wait()
+    finally:
+        fake.terminate()
+        fake.wait()
+
+def main():
+    parser = argparse.ArgumentParser(description='Load benchmark: sync Flask vs async ASGI serving against a fake Ollama.')
+    parser.add_argument('--app', choices=sorted(APPS), default='sql')
+    parser.add_argument('--modes', nargs='+', choices=['sync', 'async'], default=['sync', 'async'])
+    parser.add_argument('--concurrency', nargs='+', type=int, default=[10, 50, 100, 200])
+    parser.add_argument('--rounds', type=int, default=2, help='request per client di setiap level')
+    parser.add_argument('--backend-concurrency', type=int, default=32, help='OLLAMA_MAX_CONCURRENCY untuk app')
+    parser.add_argument('--tokens', type=int, default=20)
+    parser.add_argument('--token-delay', type=float, default=0.02)
+    parser.add_argument('--port', type=int, default=18400)
+    parser.add_argument('--fake-ollama', type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.fake_ollama:
+        fake_ollama(args.fake_ollama, args.tokens, args.token_delay)
+    else:
+        asyncio.run(benchmark(args))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,3 @@
+# Modul yang dipakai bersama oleh beberapa app di repo ini (gateway Ollama, antrian job, dll).
+# Setiap app menambahkan root repo ke sys.path sebelum mengimpor paket ini, sehingga app tetap
+# dijalankan dari foldernya sendiri (python app.py / streamlit run app.py / uvicorn asgi:app).
@@ -0,0 +1,32 @@
+from starlette.responses import JSONResponse, StreamingResponse
+
+# Helper untuk mode ASGI (asgi.py di setiap app)
+
+# Response SSE yang memegang slot gateway (Reservation) dari sebelum response dimulai sampai
+# response selesai. Slot dilepas apa pun akhirnya: stream selesai, error, client memutus koneksi,
+# atau client sudah pergi sebelum generator sempat berjalan.
+class ReservedStreamingResponse(StreamingResponse):
+    def __init__(self, content, reservation=None, **kwargs):
+        kwargs.setdefault('media_type', 'text/event-stream')
+        kwargs.setdefault('headers', {'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+        super().__init__(content, **kwargs)
+        self.reservation = reservation
+
+    async def __call__(self, scope, receive, send):
+        try:
+            await super().__call__(scope, receive, send)
+        finally:
+            if self.reservation is not None:
+                self.reservation.release()
+
+# Antrian model/job penuh (429) atau terlalu lama menunggu (503), client diminta mencoba lagi
+def busy_response(error):
+    return JSONResponse({'error': str(error)}, status_code=error.status,
+                        headers={'Retry-After': str(error.retry_after)})
+
+# body JSON request; None jika bukan JSON yang valid (route menjawab 400 dengan error JSON)
+async def read_json(request):
+    try:
+        return await request.json()
+    except ValueError:
+        return None
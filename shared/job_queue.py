@@ -0,0 +1,190 @@
+import hashlib
+import json
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+import httpx
+
+# Antrian job di background untuk generate LLM yang lama, dipakai Essay Generator dan CV Roasting:
+# submit langsung mengembalikan job ID, worker pool menjalankan chain, hasil disimpan selama
+# JOB_TTL detik dan bisa diambil dengan polling, SSE, atau dikirim ke webhook. Job identik yang
+# masih berjalan dipakai bersama (webhook dari request yang ikut memakai job juga dipanggil). Worker berupa thread karena pekerjaannya menunggu HTTP ke Ollama
+# (jumlah generate yang benar-benar berjalan tetap dibatasi shared/llm_gateway.py), dan token
+# parsial bisa dibagikan ke SSE.
+
+JOB_WORKERS = int(os.getenv('JOB_WORKERS', '4'))
+JOB_TTL = int(os.getenv('JOB_TTL', '900'))
+JOB_MAX_PENDING = int(os.getenv('JOB_MAX_PENDING', '100'))
+# batas menunggu slot gateway untuk worker job (queue_timeout gateway.stream), terpisah dari
+# OLLAMA_QUEUE_TIMEOUT request interaktif; 0 berarti menunggu sampai slot didapat
+JOB_SLOT_TIMEOUT = float(os.getenv('JOB_SLOT_TIMEOUT', '0'))
+# webhook hanya aktif jika diizinkan, karena server akan melakukan request ke URL dari client
+JOB_WEBHOOKS = os.getenv('JOB_WEBHOOKS', '0') == '1'
+WEBHOOK_TIMEOUT = float(os.getenv('JOB_WEBHOOK_TIMEOUT', '5'))
+
+class QueueFull(Exception):
+    status = 429
+
+    def __init__(self, message, retry_after=5):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+def job_key(kind, inputs):
+    payload = json.dumps([kind, inputs], sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+class Job:
+    def __init__(self, kind, key, meta=None, webhook=None):
+        self.id = uuid.uuid4().hex
+        self.kind = kind
+        self.key = key
+        self.meta = meta or {}
+        self.webhooks = [webhook] if webhook else []
+        self.status = 'queued'
+        self.created = time.time()
+        self.started = None
+        self.finished = None
+        self.chunks = []
+        self.result = None
+        self.error = None
+        self._cond = threading.Condition()
+
+    @property
+    def done(self):
+        return self.status in ('done', 'error')
+
+    def _update(self, **changes):
+        with self._cond:
+            for name, value in changes.items():
+                setattr(self, name, value)
+            self._cond.notify_all()
+
+    def _append(self, chunk):
+        with self._cond:
+            self.chunks.append(chunk)
+            self._cond.notify_all()
+
+    def wait(self, timeout=None):
+        with self._cond:
+            self._cond.wait_for(lambda: self.done, timeout=timeout)
+            return self.done
+
+    def to_dict(self):
+        data = {
+            'job_id': self.id,
+            'kind': self.kind,
+            'status': self.status,
+            'created_at': self.created,
+            'started_at': self.started,
+            'finished_at': self.finished,
+            'queue_ms': round((self.started - self.created) * 1000) if self.started else None,
+            'run_ms': round((self.finished - self.started) * 1000) if self.finished and self.started else None,
+            **self.meta,
+        }
+        if self.status == 'done':
+            data['result'] = self.result
+        elif self.status == 'error':
+            data['error'] = self.error
+        return data
+
+    # generator event (nama, data): token yang sudah ada diputar ulang lalu diikuti token baru
+    # sampai job selesai; ('ping', None) dikirim berkala agar koneksi SSE tidak dianggap mati
+    def events(self, keepalive=15):
+        sent = 0
+        while True:
+            with self._cond:
+                self._cond.wait_for(lambda: len(self.chunks) > sent or self.done, timeout=keepalive)
+                chunks = self.chunks[sent:]
+                done = self.done
+            for chunk in chunks:
+                yield 'token', {'text': chunk}
+            sent += len(chunks)
+            if done:
+                yield ('done', self.to_dict()) if self.status == 'done' else ('error', {'error': self.error})
+                return
+            if not chunks:
+                yield 'ping', None
+
+class JobQueue:
+    def __init__(self, workers=JOB_WORKERS, ttl=JOB_TTL, max_pending=JOB_MAX_PENDING):
+        self.workers = workers
+        self.ttl = ttl
+        self.max_pending = max_pending
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='job')
+        self._jobs = {}
+        self._in_flight = {}
+        self._lock = threading.Lock()
+        self._stats = {'submitted': 0, 'deduplicated': 0, 'completed': 0, 'failed': 0, 'rejected': 0, 'expired': 0}
+
+    def _purge(self, now):
+        for job_id in [job_id for job_id, job in self._jobs.items() if job.done and now - job.finished > self.ttl]:
+            del self._jobs[job_id]
+            self._stats['expired'] += 1
+
+    # run: callable tanpa argumen yang mengembalikan iterator potongan teks (mis. gateway.stream),
+    # finish: fungsi opsional untuk merapikan hasil akhir. Mengembalikan (job, True jika job baru).
+    def submit(self, kind, inputs, run, finish=None, meta=None, webhook=None):
+        key = job_key(kind, inputs)
+        with self._lock:
+            self._purge(time.time())
+            job_id = self._in_flight.get(key)
+            if job_id is not None:
+                self._stats['deduplicated'] += 1
+                job = self._jobs[job_id]
+                # dipanggil setelah job selesai karena _run melepas _in_flight di bawah lock yang sama
+                if webhook and webhook not in job.webhooks:
+                    job.webhooks.append(webhook)
+                return job, False
+            if len(self._in_flight) >= self.max_pending:
+                self._stats['rejected'] += 1
+                raise QueueFull('Terlalu banyak job dalam antrian, coba lagi nanti.')
+            job = Job(kind, key, meta, webhook)
+            self._jobs[job.id] = job
+            self._in_flight[key] = job.id
+            self._stats['submitted'] += 1
+        self._executor.submit(self._run, job, run, finish)
+        return job, True
+
+    def _run(self, job, run, finish):
+        job._update(status='running', started=time.time())
+        try:
+            for chunk in run():
+                if chunk:
+                    job._append(chunk)
+            result = ''.join(job.chunks)
+            job._update(result=finish(result) if finish else result, status='done', finished=time.time())
+        except Exception as e:
+            job._update(error=str(e), status='error', finished=time.time())
+        finally:
+            with self._lock:
+                self._in_flight.pop(job.key, None)
+                self._stats['completed' if job.status == 'done' else 'failed'] += 1
+        for webhook in job.webhooks:
+            self._notify(job, webhook)
+
+    def _notify(self, job, webhook):
+        try:
+            httpx.post(webhook, json=job.to_dict(), timeout=WEBHOOK_TIMEOUT)
+        except httpx.HTTPError:
+            # webhook bersifat best-effort, hasil tetap bisa diambil dengan polling
+            pass
+
+    def get(self, job_id):
+        with self._lock:
+            self._purge(time.time())
+            return self._jobs.get(job_id)
+
+    def stats(self):
+        with self._lock:
+            statuses = [job.status for job in self._jobs.values()]
+            return {
+                **self._stats,
+                'workers': self.workers,
+                'queued': statuses.count('queued'),
+                'running': statuses.count('running'),
+                'stored': len(statuses),
+            }
+
+job_queue = JobQueue()
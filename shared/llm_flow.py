@@ -0,0 +1,151 @@
+import asyncio
+import time
+from .llm_gateway import gateway
+
+# Logika sebuah request ditulis sekali sebagai generator ("flow"), lalu dijalankan oleh driver
+# sync (route Flask, satu thread per request) atau async (route Starlette di asgi.py). Flow tidak
+# memanggil I/O sendiri, tetapi meminta lewat yield dan menerima hasilnya kembali:
+#   text = yield Invoke(chain, inputs)     -> gateway.invoke / gateway.ainvoke
+#   value = yield Call(fn, *args)          -> fn(*args) / asyncio.to_thread(fn, *args)
+#   text = yield Stream(chain, inputs, on_chunk)
+#                                          -> chain.stream / chain.astream, setiap potongan diteruskan
+#                                             sebagai event SSE hasil on_chunk(chunk); dipakai selama
+#                                             slot gateway sudah dipegang (Reservation)
+#   yield 'event: ...'                     -> string diteruskan apa adanya ke response SSE
+# Error dari permintaan dilempar kembali ke dalam flow di titik yield-nya, jadi flow bisa
+# menangkapnya sendiri. Nilai return flow adalah hasil run/arun. events/aevents melepas
+# Reservation yang diberikan begitu stream selesai, dan mencatatnya gagal jika Stream error.
+
+class Invoke:
+    def __init__(self, runnable, inputs):
+        self.runnable = runnable
+        self.inputs = inputs
+
+    def run(self):
+        return gateway.invoke(self.runnable, self.inputs)
+
+    async def arun(self):
+        return await gateway.ainvoke(self.runnable, self.inputs)
+
+# panggilan blocking (SQLite, embeddings, cache), di mode async dijalankan di thread
+class Call:
+    def __init__(self, fn, *args):
+        self.fn = fn
+        self.args = args
+
+    def run(self):
+        return self.fn(*self.args)
+
+    async def arun(self):
+        return await asyncio.to_thread(self.fn, *self.args)
+
+class Stream:
+    def __init__(self, runnable, inputs, on_chunk):
+        self.runnable = runnable
+        self.inputs = inputs
+        self.on_chunk = on_chunk
+
+# waktu sejak request dimulai dan waktu sampai token pertama, untuk event done di SSE
+class StreamTimer:
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.first_token_ms = None
+
+    def elapsed_ms(self):
+        return round((time.perf_counter() - self.start) * 1000)
+
+    def token(self):
+        if self.first_token_ms is None:
+            self.first_token_ms = self.elapsed_ms()
+
+def _advance(flow, value, error):
+    return flow.send(value) if error is None else flow.throw(error)
+
+def run(flow):
+    value, error = None, None
+    while True:
+        try:
+            step = _advance(flow, value, error)
+        except StopIteration as stop:
+            return stop.value
+        value, error = None, None
+        try:
+            value = step.run()
+        except Exception as e:
+            error = e
+
+async def arun(flow):
+    value, error = None, None
+    while True:
+        try:
+            step = _advance(flow, value, error)
+        except StopIteration as stop:
+            return stop.value
+        value, error = None, None
+        try:
+            value = await step.arun()
+        except Exception as e:
+            error = e
+
+def events(flow, reservation=None):
+    value, error = None, None
+    try:
+        while True:
+            try:
+                step = _advance(flow, value, error)
+            except StopIteration:
+                return
+            value, error = None, None
+            if isinstance(step, str):
+                yield step
+                continue
+            try:
+                if isinstance(step, Stream):
+                    parts = []
+                    for chunk in step.runnable.stream(step.inputs):
+                        if chunk:
+                            parts.append(chunk)
+                            yield step.on_chunk(chunk)
+                    value = ''.join(parts)
+                else:
+                    value = step.run()
+            except Exception as e:
+                error = e
+                if reservation is not None and isinstance(step, Stream):
+                    reservation.failed = True
+    finally:
+        # juga saat client memutus koneksi: flow ditutup dan slot dilepas
+        flow.close()
+        if reservation is not None:
+            reservation.release()
+
+async def aevents(flow, reservation=None):
+    value, error = None, None
+    try:
+        while True:
+            try:
+                step = _advance(flow, value, error)
+            except StopIteration:
+                return
+            value, error = None, None
+            if isinstance(step, str):
+                yield step
+                continue
+            try:
+                if isinstance(step, Stream):
+                    parts = []
+                    async for chunk in step.runnable.astream(step.inputs):
+                        if chunk:
+                            parts.append(chunk)
+                            yield step.on_chunk(chunk)
+                    value = ''.join(parts)
+                else:
+                    value = await step.arun()
+            except Exception as e:
+                error = e
+                if reservation is not None and isinstance(step, Stream):
+                    reservation.failed = True
+    finally:
+        flow.close()
+        if reservation is not None:
+            reservation.release()
@@ -0,0 +1,320 @@
+import asyncio
+import os
+import threading
+import time
+from collections import deque
+from contextlib import asynccontextmanager, contextmanager
+import httpx
+from langchain_core.embeddings import Embeddings
+from langchain_ollama import OllamaEmbeddings
+from langchain_ollama.llms import OllamaLLM
+
+# Gateway ke server Ollama yang dipakai bersama oleh semua request di satu proses Flask
+# (dipakai app SQL Generator, Essay Generator, CV Roasting dan Chatbot AI Crawler):
+# - instance OllamaLLM/OllamaEmbeddings di-cache per konfigurasi, sehingga koneksi HTTP
+#   (keep-alive pool milik httpx) dipakai ulang dan tidak dibuat baru di setiap request
+# - jumlah generate dan embed yang berjalan bersamaan dibatasi slot, sisanya menunggu di antrian
+# - antrian penuh -> GatewayOverloaded (429), terlalu lama menunggu -> GatewayTimeout (503)
+# - ainvoke/astream untuk mode ASGI memakai batas yang sama tanpa memblokir event loop
+# - reserve/areserve mengambil slot sebelum response streaming dimulai, sehingga request yang
+#   tidak kebagian slot masih bisa dijawab 429/503 dengan Retry-After
+# - slot/stream menerima queue_timeout per panggilan; 0 berarti menunggu slot tanpa batas, dipakai
+#   worker job di background (shared/job_queue.py) yang memang ada untuk menampung antrian panjang
+
+OLLAMA_BASE_URL = os.getenv('OLLAMA_BASE_URL', 'http://localhost:11434')
+MAX_CONCURRENCY = int(os.getenv('OLLAMA_MAX_CONCURRENCY', '2'))
+MAX_QUEUE = int(os.getenv('OLLAMA_MAX_QUEUE', '16'))
+QUEUE_TIMEOUT = float(os.getenv('OLLAMA_QUEUE_TIMEOUT', '30'))
+REQUEST_TIMEOUT = float(os.getenv('OLLAMA_REQUEST_TIMEOUT', '300'))
+
+class GatewayBusy(Exception):
+    status = 503
+
+    def __init__(self, message, retry_after=1):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+class GatewayOverloaded(GatewayBusy):
+    status = 429
+
+class GatewayTimeout(GatewayBusy):
+    status = 503
+
+# Satu request yang menunggu slot: thread (Event) atau coroutine (future di event loop-nya)
+class _Waiter:
+    def __init__(self, loop=None):
+        self.granted = False
+        self.loop = loop
+        if loop is None:
+            self.event = threading.Event()
+        else:
+            self.future = loop.create_future()
+
+    def wake(self):
+        if self.loop is None:
+            self.event.set()
+        else:
+            self.loop.call_soon_threadsafe(lambda: self.future.done() or self.future.set_result(None))
+
+# Slot yang sudah diambil lebih dulu (lihat LLMGateway.reserve). Selama slot dipegang, runnable
+# dipanggil langsung (runnable.stream/astream) tanpa mengantri lagi. Slot dilepas tepat sekali:
+# di akhir blok with atau stream (shared/llm_flow.py), atau lewat release() dari callback penutup
+# response jika generator SSE tidak pernah dijalankan (client memutus koneksi sebelum byte pertama).
+class Reservation:
+    def __init__(self, gateway, waited):
+        self.gateway = gateway
+        self.waited = waited
+        self.failed = False
+        self._released = False
+        self._lock = threading.Lock()
+
+    def release(self, failed=False):
+        with self._lock:
+            if self._released:
+                return
+            self._released = True
+        self.gateway._release(failed or self.failed)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, traceback):
+        self.release(failed=exc_type is not None and issubclass(exc_type, Exception))
+        return False
+
+# Embeddings yang setiap panggilannya memegang slot gateway, sehingga embed (crawl, retriever,
+# cache semantik) ikut dibatasi dan diantrikan bersama generate
+class _GatedEmbeddings(Embeddings):
+    def __init__(self, gateway, embeddings):
+        self.gateway = gateway
+        self.embeddings = embeddings
+
+    def embed_documents(self, texts):
+        with self.gateway.slot():
+            return self.embeddings.embed_documents(texts)
+
+    def embed_query(self, text):
+        with self.gateway.slot():
+            return self.embeddings.embed_query(text)
+
+    async def aembed_documents(self, texts):
+        async with self.gateway.aslot():
+            return await self.embeddings.aembed_documents(texts)
+
+    async def aembed_query(self, text):
+        async with self.gateway.aslot():
+            return await self.embeddings.aembed_query(text)
+
+class LLMGateway:
+    def __init__(self, base_url=OLLAMA_BASE_URL, max_concurrency=MAX_CONCURRENCY, max_queue=MAX_QUEUE,
+                 queue_timeout=QUEUE_TIMEOUT, request_timeout=REQUEST_TIMEOUT):
+        self.base_url = base_url
+        self.max_concurrency = max_concurrency
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.request_timeout = request_timeout
+        # slot generate: dibagikan berurutan (FIFO) ke thread maupun coroutine yang menunggu
+        self._available = max_concurrency
+        self._waiters = deque()
+        self._lock = threading.Lock()
+        self._clients = {}
+        self._waiting = 0
+        self._in_flight = 0
+        self._wait_times = deque(maxlen=1000)
+        self._stats = {'requests': 0, 'completed': 0, 'errors': 0, 'rejected': 0, 'timed_out': 0, 'max_queue_depth': 0}
+
+    def _client_kwargs(self):
+        # koneksi keep-alive cukup sebanyak generate yang boleh berjalan bersamaan
+        return {
+            'timeout': httpx.Timeout(self.request_timeout, connect=10.0),
+            'limits': httpx.Limits(max_connections=self.max_concurrency * 2,
+                                   max_keepalive_connections=self.max_concurrency),
+        }
+
+    def _cached(self, cls, kwargs, wrap=None):
+        key = (cls.__name__, tuple(sorted(kwargs.items())))
+        with self._lock:
+            if key not in self._clients:
+                client = cls(base_url=self.base_url, client_kwargs=self._client_kwargs(), **kwargs)
+                self._clients[key] = wrap(client) if wrap else client
+            return self._clients[key]
+
+    def llm(self, **kwargs):
+        return self._cached(OllamaLLM, kwargs)
+
+    def embeddings(self, **kwargs):
+        return self._cached(OllamaEmbeddings, kwargs, wrap=lambda client: _GatedEmbeddings(self, client))
+
+    def _enqueue(self):
+        with self._lock:
+            self._stats['requests'] += 1
+            if self._waiting >= self.max_queue:
+                self._stats['rejected'] += 1
+                raise GatewayOverloaded('Antrian model penuh, coba lagi sebentar lagi.')
+            self._waiting += 1
+            self._stats['max_queue_depth'] = max(self._stats['max_queue_depth'], self._waiting)
+
+    def _dequeue(self, waited, acquired, timeout):
+        with self._lock:
+            self._waiting -= 1
+            self._wait_times.append(waited)
+            if not acquired:
+                self._stats['timed_out'] += 1
+            else:
+                self._in_flight += 1
+        if not acquired:
+            raise GatewayTimeout(f'Menunggu model lebih dari {timeout:.0f} detik.',
+                                 retry_after=int(timeout))
+        return waited
+
+    def _take_slot(self, waiter):
+        # dipanggil dengan self._lock: ambil slot kosong jika tidak ada yang antri lebih dulu
+        if self._available and not self._waiters:
+            self._available -= 1
+            return True
+        self._waiters.append(waiter)
+        return False
+
+    def _give_slot(self):
+        # slot yang dilepas langsung diberikan ke waiter terlama
+        with self._lock:
+            while self._waiters:
+                waiter = self._waiters.popleft()
+                try:
+                    waiter.wake()
+                except RuntimeError:
+                    # event loop waiter sudah ditutup
+                    continue
+                waiter.granted = True
+                return
+            self._available += 1
+
+    def _abandon(self, waiter):
+        # waiter berhenti menunggu (timeout/dibatalkan); True jika slot ternyata sudah diberikan
+        with self._lock:
+            if waiter.granted:
+                return True
+            self._waiters.remove(waiter)
+            return False
+
+    def _acquire(self, timeout):
+        waiter = _Waiter()
+        with self._lock:
+            if self._take_slot(waiter):
+                return True
+        # timeout 0: tunggu sampai slot diberikan
+        if waiter.event.wait(timeout or None):
+            return True
+        return self._abandon(waiter)
+
+    async def _aacquire(self):
+        waiter = _Waiter(asyncio.get_running_loop())
+        with self._lock:
+            if self._take_slot(waiter):
+                return True
+        try:
+            await asyncio.wait_for(asyncio.shield(waiter.future), self.queue_timeout)
+            return True
+        except asyncio.TimeoutError:
+            return self._abandon(waiter)
+        except asyncio.CancelledError:
+            # request dibatalkan (client memutus koneksi) selagi menunggu
+            if self._abandon(waiter):
+                self._give_slot()
+            raise
+
+    def _release(self, failed):
+        with self._lock:
+            self._in_flight -= 1
+            if failed:
+                self._stats['errors'] += 1
+            else:
+                self._stats['completed'] += 1
+        self._give_slot()
+
+    def _hold(self, queue_timeout=None):
+        timeout = self.queue_timeout if queue_timeout is None else queue_timeout
+        self._enqueue()
+        start = time.perf_counter()
+        acquired = self._acquire(timeout)
+        return self._dequeue(time.perf_counter() - start, acquired, timeout)
+
+    async def _ahold(self):
+        self._enqueue()
+        start = time.perf_counter()
+        try:
+            acquired = await self._aacquire()
+        except BaseException:
+            with self._lock:
+                self._waiting -= 1
+            raise
+        return self._dequeue(time.perf_counter() - start, acquired, self.queue_timeout)
+
+    @contextmanager
+    def slot(self, queue_timeout=None):
+        waited = self._hold(queue_timeout)
+        failed = False
+        try:
+            yield waited
+        except Exception:
+            failed = True
+            raise
+        finally:
+            self._release(failed)
+
+    # versi async dari slot(): menunggu di antrian yang sama tanpa memblokir event loop, sehingga
+    # request sync (thread) dan async berbagi batas dan urutan yang sama
+    @asynccontextmanager
+    async def aslot(self):
+        waited = await self._ahold()
+        failed = False
+        try:
+            yield waited
+        except Exception:
+            failed = True
+            raise
+        finally:
+            self._release(failed)
+
+    # ambil slot sekarang (GatewayBusy dilempar di sini, sebelum response dimulai) dan pegang
+    # sampai Reservation dilepas; dipakai route streaming
+    def reserve(self):
+        return Reservation(self, self._hold())
+
+    async def areserve(self):
+        return Reservation(self, await self._ahold())
+
+    def invoke(self, runnable, inputs):
+        with self.slot():
+            return runnable.invoke(inputs)
+
+    # slot dipegang selama stream berjalan dan dilepas saat generator selesai atau ditutup
+    # (mis. client memutus koneksi SSE)
+    def stream(self, runnable, inputs, queue_timeout=None):
+        with self.slot(queue_timeout):
+            yield from runnable.stream(inputs)
+
+    async def ainvoke(self, runnable, inputs):
+        async with self.aslot():
+            return await runnable.ainvoke(inputs)
+
+    async def astream(self, runnable, inputs):
+        async with self.aslot():
+            async for chunk in runnable.astream(inputs):
+                yield chunk
+
+    def stats(self):
+        with self._lock:
+            waits = sorted(self._wait_times)
+            return {
+                **self._stats,
+                'in_flight': self._in_flight,
+                'queue_depth': self._waiting,
+                'max_concurrency': self.max_concurrency,
+                'max_queue': self.max_queue,
+                'wait_ms_avg': round(sum(waits) / len(waits) * 1000, 1) if waits else 0.0,
+                'wait_ms_p95': round(waits[int(len(waits) * 0.95)] * 1000, 1) if waits else 0.0,
+                'wait_ms_max': round(waits[-1] * 1000, 1) if waits else 0.0,
+            }
+
+gateway = LLMGateway()
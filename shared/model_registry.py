@@ -0,0 +1,46 @@
+import logging
+import threading
+import time
+
+# registry model yang dimuat secara lazy saat pertama kali dipakai (AI Resume Screening dan
+# PDF Summarization). Modul ini tetap ada di sys.modules selama proses Streamlit hidup, jadi
+# model dipakai ulang antar rerun dan session.
+
+logger = logging.getLogger(__name__)
+
+_loaders = {}
+_models = {}
+_load_times = {}
+_locks = {}
+_registry_lock = threading.Lock()
+
+def register(name, loader):
+    with _registry_lock:
+        _loaders.setdefault(name, loader)
+        _locks.setdefault(name, threading.Lock())
+
+def get(name):
+    if name in _models:
+        return _models[name]
+    with _locks[name]:
+        if name not in _models:
+            start = time.perf_counter()
+            _models[name] = _loaders[name]()
+            _load_times[name] = time.perf_counter() - start
+            logger.info("Model %s dimuat dalam %.2f detik", name, _load_times[name])
+    return _models[name]
+
+def is_loaded(name):
+    return name in _models
+
+def load_time(name):
+    return _load_times.get(name)
+
+# mulai memuat model di background thread agar UI bisa tampil lebih dulu
+def warm_up(*names):
+    pending = [name for name in names if name not in _models and not _locks[name].locked()]
+    if not pending:
+        return None
+    thread = threading.Thread(target=lambda: [get(name) for name in pending], name='model-warm-up', daemon=True)
+    thread.start()
+    return thread
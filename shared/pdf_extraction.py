@@ -0,0 +1,148 @@
+import atexit
+import hashlib
+import io
+import os
+import threading
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+# Ekstraksi teks PDF yang dipakai bersama AI Resume Screening (pdfplumber, layout CV lebih rapi) dan
+# PDF Summarization (PyPDF2, lebih cepat untuk dokumen panjang). Library dipilih per app lewat
+# parameter engine dan baru di-import saat dipakai, jadi tiap app cukup memasang library-nya sendiri.
+# Dokumen besar diekstrak paralel di process pool yang dibuat sekali per proses dan dipakai ulang
+# (juga antar rerun Streamlit), halaman dikembalikan berurutan begitu rentangnya selesai.
+
+# dokumen dengan halaman lebih banyak dari ini diekstrak paralel per rentang halaman
+PARALLEL_MIN_PAGES = int(os.getenv('PDF_PARALLEL_MIN_PAGES', '40'))
+# jumlah halaman per tugas di process pool; kecil agar halaman awal cepat sampai ke UI
+RANGE_PAGES = int(os.getenv('PDF_RANGE_PAGES', '16'))
+PDF_WORKERS = int(os.getenv('PDF_WORKERS', '0')) or os.cpu_count() or 1
+CACHE_SIZE = int(os.getenv('PDF_CACHE_SIZE', '64'))
+
+_cache = OrderedDict()
+_cache_lock = threading.Lock()
+_pool = None
+_pool_lock = threading.Lock()
+
+# baca isi PDF sebagai bytes dari path, bytes, atau file-like object (mis. UploadedFile Streamlit)
+def read_bytes(pdf_file):
+    if isinstance(pdf_file, bytes):
+        return pdf_file
+    if isinstance(pdf_file, (str, os.PathLike)):
+        with open(pdf_file, 'rb') as file:
+            return file.read()
+    if hasattr(pdf_file, 'getvalue'):
+        return pdf_file.getvalue()
+    pdf_file.seek(0)
+    return pdf_file.read()
+
+def _pypdf2_count(data):
+    import PyPDF2
+    return len(PyPDF2.PdfReader(io.BytesIO(data)).pages)
+
+def _pypdf2_pages(data, start, stop):
+    import PyPDF2
+    pdf_reader = PyPDF2.PdfReader(io.BytesIO(data))
+    for i in range(start, min(stop, len(pdf_reader.pages))):
+        yield pdf_reader.pages[i].extract_text() or ''
+
+def _pdfplumber_count(data):
+    import pdfplumber
+    with pdfplumber.open(io.BytesIO(data)) as pdf:
+        return len(pdf.pages)
+
+def _pdfplumber_pages(data, start, stop):
+    import pdfplumber
+    with pdfplumber.open(io.BytesIO(data)) as pdf:
+        for page in pdf.pages[start:stop]:
+            yield page.extract_text() or ''
+            # bebaskan cache objek halaman agar memori tidak tumbuh untuk dokumen besar
+            page.flush_cache()
+
+# engine: (jumlah halaman, generator teks halaman start..stop)
+ENGINES = {
+    'pypdf2': (_pypdf2_count, _pypdf2_pages),
+    'pdfplumber': (_pdfplumber_count, _pdfplumber_pages),
+}
+
+def _extract_range(args):
+    data, engine, start, stop = args
+    return list(ENGINES[engine][1](data, start, stop))
+
+def _get_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ProcessPoolExecutor(max_workers=PDF_WORKERS)
+            atexit.register(_pool.shutdown, wait=False, cancel_futures=True)
+        return _pool
+
+def count_pages(pdf_file, engine='pypdf2'):
+    return ENGINES[engine][0](read_bytes(pdf_file))
+
+# generator teks per halaman (halaman tanpa teks menghasilkan string kosong), hasil lengkap disimpan
+# di cache berdasarkan hash isi file; workers=1 berarti tanpa process pool (mis. di dalam worker)
+def iter_pages(pdf_file, page_limit=None, engine='pypdf2', workers=None):
+    data = read_bytes(pdf_file)
+    key = (hashlib.sha256(data).hexdigest(), page_limit, engine)
+    with _cache_lock:
+        pages = _cache.get(key)
+        if pages is not None:
+            _cache.move_to_end(key)
+    if pages is not None:
+        yield from pages
+        return
+
+    count, extract = ENGINES[engine]
+    num_pages = count(data)
+    if page_limit is not None:
+        num_pages = min(num_pages, page_limit)
+
+    pages = []
+    workers = workers or PDF_WORKERS
+    if workers > 1 and num_pages >= PARALLEL_MIN_PAGES:
+        # rentang halaman dikerjakan bersamaan, hasilnya diteruskan sesuai urutan halaman
+        step = max(1, min(-(-num_pages // workers), RANGE_PAGES))
+        pool = _get_pool()
+        futures = [pool.submit(_extract_range, (data, engine, start, min(start + step, num_pages)))
+                   for start in range(0, num_pages, step)]
+        try:
+            for future in futures:
+                for page in future.result():
+                    pages.append(page)
+                    yield page
+        finally:
+            # pembaca berhenti di tengah jalan (mis. rerun Streamlit): sisa rentang tidak dikerjakan
+            for future in futures:
+                future.cancel()
+    else:
+        for page in extract(data, 0, num_pages):
+            pages.append(page)
+            yield page
+
+    with _cache_lock:
+        _cache[key] = tuple(pages)
+        while len(_cache) > CACHE_SIZE:
+            _cache.popitem(last=False)
+
+def extract_text(pdf_file, page_limit=None, engine='pypdf2', workers=None):
+    return '\n'.join(iter_pages(pdf_file, page_limit, engine, workers))
+
+def _extract_item(args):
+    name, source, engine = args
+    try:
+        # tanpa process pool bersarang karena sudah berjalan di dalam worker
+        return name, extract_text(source, engine=engine, workers=1), None
+    except Exception as e:
+        return name, '', str(e)
+
+# banyak PDF (list (nama, path atau bytes)) di process pool yang sama, menghasilkan
+# (nama, teks, error) per file segera setelah file tersebut selesai
+def extract_many(items, engine='pypdf2'):
+    futures = [_get_pool().submit(_extract_item, (name, source, engine)) for name, source in items]
+    try:
+        for future in as_completed(futures):
+            yield future.result()
+    finally:
+        for future in futures:
+            future.cancel()